@@ -0,0 +1,392 @@
+"""Suite de benchmarks reproducibles del intérprete y del generador de código.
+
+Cada caso es un programa generado con entradas fijas (sin read() interactivo)
+que escala una de estas dimensiones: iteraciones de los ciclos, profundidad
+de anidamiento, cantidad de variables, longitud de las expresiones y
+longitud del programa. Por cada caso se mide por separado el tiempo de
+compilación, el de generación de ensamblador y el de ejecución, además de
+las sentencias ejecutadas por segundo, la memoria pico y el tamaño del
+ensamblador. Con --simular se agregan las instrucciones ejecutadas y los
+ciclos estimados del ensamblador en el simulador RISC-V.
+
+Uso desde la línea de comandos:
+
+    python benchmarks.py --salida actual.json
+    python benchmarks.py --rapido --filtro anidado
+    python benchmarks.py --rapido --optimizar --simular --salida optimizado.json
+    python benchmarks.py --comparar base.json actual.json --umbral 0.1
+
+Con --comparar se muestran las diferencias entre dos reportes y el proceso
+termina con código 1 si alguna métrica empeoró más que el umbral.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from interpretepascal import InterpreteUnificado, Perfil, contar_instrucciones
+from simulador_riscv import simular
+
+
+# Métricas comparables y si un valor mayor es mejor
+METRICAS = {
+    'compilacion': False,
+    'ensamblador': False,
+    'ejecucion': False,
+    'sentencias_por_segundo': True,
+    'memoria_pico': False,
+    'instrucciones_ensamblador': False,
+    'instrucciones_dinamicas': False,
+    'ciclos_estimados': False,
+}
+
+
+class Caso:
+    """Un programa de benchmark con sus entradas y los parámetros que lo generaron"""
+
+    def __init__(self, nombre, parametros, codigo, entradas=()):
+        self.nombre = nombre
+        self.parametros = parametros
+        self.codigo = codigo
+        self.entradas = list(entradas)
+
+    @property
+    def clave(self):
+        return _clave(self.nombre, self.parametros)
+
+
+class _SalidaDescartada:
+    """Sumidero de salida que no guarda nada"""
+    __slots__ = ()
+
+    def write(self, texto):
+        pass
+
+
+def caso_for(n):
+    """El programa de ejemplo con for (suma, factorial e impresión por iteración)"""
+    codigo = """var n, i, suma, factorial;
+read(n);
+suma := 0;
+factorial := 1;
+for i := 1 to n do
+    suma := suma i +;
+    factorial := factorial i *;
+    print("i=");
+    print(i);
+    print(" suma=");
+    println(suma);
+endfor
+println(suma);
+println(factorial);"""
+    return Caso('for', {'n': n}, codigo, [str(n)])
+
+
+def caso_while(n):
+    """El programa de ejemplo con while, reiniciando la potencia para no desbordar"""
+    codigo = """var n, contador, potencia;
+read(n);
+contador := 1;
+potencia := 1;
+while contador n <= do
+    potencia := potencia 2 *;
+    if potencia > 1000000 then
+        potencia := 1;
+    endif
+    contador := contador 1 +;
+endwhile
+println(potencia);"""
+    return Caso('while', {'n': n}, codigo, [str(n)])
+
+
+def caso_entero(n):
+    """El ciclo de caso_while con variables integer, sobre registros enteros en el ensamblador"""
+    codigo = """var n, contador, potencia : integer;
+read(n);
+contador := 1;
+potencia := 1;
+while contador n <= do
+    potencia := potencia 2 *;
+    if potencia 1000000 > then
+        potencia := 1;
+    endif
+    contador := contador 1 +;
+endwhile
+println(potencia);"""
+    return Caso('entero', {'n': n}, codigo, [str(n)])
+
+
+def caso_completo(n):
+    """El programa combinado de ejemplo, evaluando la cuadrática en n puntos"""
+    codigo = """var a, b, c, n, discriminante, x, resultado, i;
+read(a);
+read(b);
+read(c);
+read(n);
+discriminante := b b * 4 a * c * -;
+println(discriminante);
+for i := 1 to n do
+    x := i;
+    resultado := a x * x * b x * + c +;
+endfor
+println(resultado);
+if discriminante > 0 then
+    resultado := discriminante sin;
+    println(resultado);
+endif"""
+    return Caso('completo', {'n': n}, codigo, ['1', '5', '2', str(n)])
+
+
+def caso_anidado(profundidad, n):
+    """Ciclos for anidados con una acumulación que depende de todos los índices"""
+    indices = [f"i{k}" for k in range(profundidad)]
+    lineas = [f"var n, s, {', '.join(indices)};", "read(n);", "s := 0;"]
+    for k, indice in enumerate(indices):
+        lineas.append("    " * k + f"for {indice} := 1 to n do")
+    lineas.append("    " * profundidad + f"s := s {' '.join(indices)} {'+ ' * (profundidad - 1)}sin +;")
+    for k in reversed(range(profundidad)):
+        lineas.append("    " * k + "endfor")
+    lineas.append("println(s);")
+    return Caso('anidado', {'profundidad': profundidad, 'n': n}, "\n".join(lineas), [str(n)])
+
+
+def caso_variables(cantidad, n):
+    """Un ciclo que actualiza muchas variables distintas en cada iteración"""
+    nombres = [f"v{k}" for k in range(cantidad)]
+    lineas = [f"var n, i, {', '.join(nombres)};", "read(n);"]
+    lineas += [f"{nombre} := {k};" for k, nombre in enumerate(nombres)]
+    lineas.append("i := 0;")
+    lineas.append("while i n < do")
+    for k, nombre in enumerate(nombres):
+        lineas.append(f"    {nombre} := {nombres[k - 1]} i + 0.5 *;")
+    lineas.append("    i := i 1 +;")
+    lineas.append("endwhile")
+    lineas.append(f"println({nombres[-1]});")
+    return Caso('variables', {'cantidad': cantidad, 'n': n}, "\n".join(lineas), [str(n)])
+
+
+def caso_expresion(longitud, n):
+    """Una expresión postfija de la longitud dada evaluada en cada iteración"""
+    terminos = ["x", "i", "2", "y"]
+    operadores = ["+", "*", "-", "+"]
+    partes = ["x"]
+    for k in range(longitud):
+        partes.append(terminos[k % len(terminos)])
+        partes.append(operadores[k % len(operadores)])
+    expresion = " ".join(partes)
+    codigo = f"""var n, i, x, y, r;
+read(n);
+x := 0.5;
+y := 3;
+r := 0;
+i := 0;
+while i n < do
+    r := {expresion} sin;
+    x := r 0.001 *;
+    i := i 1 +;
+endwhile
+println(r);"""
+    return Caso('expresion', {'longitud': longitud, 'n': n}, codigo, [str(n)])
+
+
+def caso_largo(lineas):
+    """Un programa sin ciclos de muchas líneas, dominado por la compilación"""
+    fuente = ["var a, b, c, d;", "a := 1;", "b := 2;", "c := 3;", "d := 0;"]
+    plantillas = ["d := a b * c +;", "a := d 3 /;", "b := a c + 2 /;", "c := b d - 5 /;"]
+    fuente += [plantillas[k % len(plantillas)] for k in range(lineas)]
+    fuente.append("println(d);")
+    return Caso('largo', {'lineas': lineas}, "\n".join(fuente))
+
+
+def suite(rapido=False):
+    """Casos de la suite; con rapido=True se reducen los tamaños"""
+    escala = 1 if rapido else 10
+    casos = []
+    for n in (100, 1000):
+        casos.append(caso_for(n * escala))
+        casos.append(caso_while(n * escala))
+        casos.append(caso_entero(n * escala))
+        casos.append(caso_completo(n * escala))
+    for profundidad in (1, 2, 3):
+        casos.append(caso_anidado(profundidad, round((2000 * escala) ** (1 / profundidad))))
+    for cantidad in (4, 16, 64):
+        casos.append(caso_variables(cantidad, 200 * escala // cantidad * 4))
+    for longitud in (4, 16, 64):
+        casos.append(caso_expresion(longitud, 100 * escala))
+    for lineas in (100, 1000, 5000 if not rapido else 2000):
+        casos.append(caso_largo(lineas))
+    return casos
+
+
+def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), statistics.median(tiempos)
+
+
+def medir_caso(caso, repeticiones=5, optimizar=False, simular_ensamblador=False):
+    """Mide un caso y devuelve un diccionario con sus métricas"""
+    def compilar():
+        interprete = InterpreteUnificado(optimizar=optimizar)
+        interprete.compilar_codigo(caso.codigo)
+        return interprete
+
+    def generar():
+        interprete = compilar()
+        interprete.generar_codigo()
+        return interprete
+
+    programa = compilar().exportar_programa()
+
+    def ejecutar():
+        interprete = InterpreteUnificado(entrada=caso.entradas, salida=_SalidaDescartada())
+        return interprete.ejecutar_programa(programa, generar_ensamblador=False)
+
+    compilacion, compilacion_mediana = _medir(compilar, repeticiones)
+    generacion, generacion_mediana = _medir(generar, repeticiones)
+    # La generación de ensamblador se mide restando la compilación que la precede
+    ensamblador = max(0.0, generacion - compilacion)
+    ensamblador_mediana = max(0.0, generacion_mediana - compilacion_mediana)
+    ejecucion, ejecucion_mediana = _medir(ejecutar, repeticiones)
+
+    # Conteo de sentencias con el perfilador, en una corrida que no se cronometra
+    perfil = Perfil()
+    resultado = InterpreteUnificado(entrada=caso.entradas, salida=_SalidaDescartada()) \
+        .ejecutar_programa(programa, generar_ensamblador=False, perfil=perfil)
+    sentencias = sum(perfil.conteos)
+
+    # Memoria pico de compilar, generar el ensamblador y ejecutar
+    tracemalloc.start()
+    try:
+        InterpreteUnificado(entrada=caso.entradas, salida=_SalidaDescartada(), optimizar=optimizar) \
+            .ejecutar_programa(caso.codigo)
+        _, memoria_pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    metricas = {
+        'caso': caso.nombre,
+        'parametros': caso.parametros,
+        'lineas': len(caso.codigo.split('\n')),
+        'compilacion': compilacion,
+        'compilacion_mediana': compilacion_mediana,
+        'ensamblador': ensamblador,
+        'ensamblador_mediana': ensamblador_mediana,
+        'ejecucion': ejecucion,
+        'ejecucion_mediana': ejecucion_mediana,
+        'sentencias': sentencias,
+        'sentencias_por_segundo': sentencias / ejecucion if ejecucion else None,
+        'memoria_pico': memoria_pico,
+        'instrucciones_ensamblador': contar_instrucciones(generar().codigo_ensamblador),
+        'errores': resultado.errores,
+    }
+    if simular_ensamblador:
+        simulacion = simular(generar().codigo_ensamblador, caso.entradas)
+        metricas['instrucciones_dinamicas'] = simulacion.instrucciones
+        metricas['ciclos_estimados'] = simulacion.ciclos
+    return metricas
+
+
+def ejecutar_suite(casos, repeticiones=5, optimizar=False, progreso=None, simular_ensamblador=False):
+    """Mide todos los casos y arma el reporte completo"""
+    resultados = []
+    for caso in casos:
+        resultado = medir_caso(caso, repeticiones, optimizar, simular_ensamblador)
+        resultados.append(resultado)
+        if progreso:
+            progreso(caso, resultado)
+    return {
+        'python': platform.python_version(),
+        'implementacion': platform.python_implementation(),
+        'plataforma': platform.platform(),
+        'repeticiones': repeticiones,
+        'optimizar': optimizar,
+        'casos': resultados,
+    }
+
+
+def _clave(nombre, parametros):
+    return nombre + ''.join(f" {k}={v}" for k, v in sorted(parametros.items()))
+
+
+def comparar(base, actual, umbral=0.1):
+    """Compara dos reportes; devuelve (filas, regresiones).
+
+    Cada fila es (caso, métrica, valor base, valor actual, cambio relativo),
+    con el cambio positivo cuando la métrica empeora. Es una regresión si el
+    cambio supera el umbral.
+    """
+    anteriores = {_clave(r['caso'], r['parametros']): r for r in base['casos']}
+    filas = []
+    regresiones = []
+    for resultado in actual['casos']:
+        clave = _clave(resultado['caso'], resultado['parametros'])
+        anterior = anteriores.get(clave)
+        if anterior is None:
+            continue
+        for metrica, mayor_es_mejor in METRICAS.items():
+            antes, despues = anterior.get(metrica), resultado.get(metrica)
+            if not antes or despues is None:
+                continue
+            cambio = (despues - antes) / antes
+            if mayor_es_mejor:
+                cambio = -cambio
+            fila = (clave, metrica, antes, despues, cambio)
+            filas.append(fila)
+            if cambio > umbral:
+                regresiones.append(fila)
+    return filas, regresiones
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del intérprete Pascal")
+    parser.add_argument('--salida', help="archivo JSON donde guardar el reporte (por defecto, la salida estándar)")
+    parser.add_argument('--repeticiones', type=int, default=5, help="corridas por medición (se toma la mejor)")
+    parser.add_argument('--rapido', action='store_true', help="usar tamaños reducidos")
+    parser.add_argument('--filtro', help="medir sólo los casos cuyo nombre contenga este texto")
+    parser.add_argument('--optimizar', action='store_true', help="generar el ensamblador con el optimizador")
+    parser.add_argument('--simular', action='store_true',
+                        help="simular el ensamblador para contar instrucciones ejecutadas y ciclos")
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'ACTUAL'), help="comparar dos reportes JSON")
+    parser.add_argument('--umbral', type=float, default=0.1, help="empeoramiento relativo tolerado al comparar")
+    opciones = parser.parse_args(argumentos)
+
+    if opciones.comparar:
+        reportes = []
+        for ruta in opciones.comparar:
+            with open(ruta, encoding='utf-8') as archivo:
+                reportes.append(json.load(archivo))
+        filas, regresiones = comparar(reportes[0], reportes[1], opciones.umbral)
+        print(f"{'caso':<40} {'métrica':<26} {'base':>14} {'actual':>14} {'mejora':>9}")
+        for clave, metrica, antes, despues, cambio in filas:
+            marca = "  <-- regresión" if cambio > opciones.umbral else ""
+            print(f"{clave:<40} {metrica:<26} {antes:>14.6g} {despues:>14.6g} {-100 * cambio:>+8.1f}%{marca}")
+        print(f"\n{len(regresiones)} regresiones con umbral {opciones.umbral:.0%}")
+        return 1 if regresiones else 0
+
+    casos = suite(opciones.rapido)
+    if opciones.filtro:
+        casos = [caso for caso in casos if opciones.filtro in caso.nombre]
+
+    def progreso(caso, resultado):
+        sys.stderr.write(f"{caso.clave:<40} compilación {resultado['compilacion'] * 1000:8.2f} ms  "
+                         f"ejecución {resultado['ejecucion'] * 1000:8.2f} ms\n")
+
+    reporte = ejecutar_suite(casos, opciones.repeticiones, opciones.optimizar, progreso, opciones.simular)
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if opciones.salida:
+        with open(opciones.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto + "\n")
+    else:
+        sys.stdout.write(texto + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
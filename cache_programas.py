@@ -0,0 +1,212 @@
+"""Caché en disco de programas compilados, al estilo de los .pyc.
+
+Cada entrada guarda un ProgramaCompilado (líneas, instrucciones con sus
+saltos de bloque, ranuras de las variables y, si se pidió, el ensamblador
+ya generado) bajo el sha256 del código fuente, la versión del intérprete y
+las opciones de compilación. Los evaluadores de expresiones y condiciones
+se guardan como código de bytes (con marshal, como los .pyc; por eso la
+clave incluye también la versión de Python). Al encontrarlo, el programa se
+carga sin volver a separar, validar ni compilar las líneas.
+
+Las escrituras son atómicas (archivo temporal y os.replace), así varios
+procesos pueden compartir el mismo directorio. Cuando el directorio pasa de
+tamano_maximo bytes se borran primero las entradas usadas hace más tiempo.
+
+Uso desde la línea de comandos:
+
+    python cache_programas.py programa.pas otro.pas --optimizar
+    python cache_programas.py --limpiar
+"""
+import argparse
+import builtins
+import hashlib
+import io
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+import types
+
+from interpretepascal import FUNCIONES, OPCODES_CON_EVALUADOR, VERSION, Instruccion, compilar_programa
+
+
+# Directorio por omisión; la variable de entorno INTERPRETE_PASCAL_CACHE lo reemplaza
+DIRECTORIO_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'interpretepascal')
+
+# Bytes que puede ocupar la caché antes de borrar las entradas más viejas
+TAMANO_MAXIMO_CACHE = 64 * 1024 * 1024
+
+EXTENSION = '.ppc'
+
+
+def _restaurar_instruccion(opcode, operandos, numero_linea, salto):
+    return Instruccion(opcode, operandos, numero_linea, salto)
+
+
+def _restaurar_evaluador(codigo, anidados):
+    espacio = {f"_{nombre}": funcion for nombre, funcion in FUNCIONES.items()}
+    espacio.update(anidados)
+    espacio['__builtins__'] = builtins
+    return types.FunctionType(marshal.loads(codigo), espacio)
+
+
+def _es_evaluador(funcion):
+    return (isinstance(funcion, types.FunctionType)
+            and funcion.__code__.co_filename.startswith(('<expresion', '<condicion')))
+
+
+class _Serializador(pickle.Pickler):
+    """Guarda las instrucciones con sus evaluadores ya compilados; cada evaluador compartido se escribe una vez"""
+
+    def reducer_override(self, objeto):
+        if isinstance(objeto, Instruccion):
+            if objeto.opcode in OPCODES_CON_EVALUADOR and _es_evaluador(objeto.operandos[-1]):
+                return _restaurar_instruccion, (objeto.opcode, objeto.operandos, objeto.numero_linea, objeto.salto)
+        elif _es_evaluador(objeto):
+            # Las subexpresiones invariantes son otros evaluadores, guardados en su espacio global
+            anidados = {nombre: valor for nombre, valor in objeto.__globals__.items()
+                        if valor is not objeto and _es_evaluador(valor)}
+            return _restaurar_evaluador, (marshal.dumps(objeto.__code__), anidados)
+        return NotImplemented
+
+
+class CacheProgramas:
+    """Programas compilados guardados en un directorio, con escritura atómica y desalojo por tamaño"""
+
+    def __init__(self, directorio=None, tamano_maximo=TAMANO_MAXIMO_CACHE):
+        self.directorio = directorio or os.environ.get('INTERPRETE_PASCAL_CACHE') or DIRECTORIO_CACHE
+        self.tamano_maximo = tamano_maximo
+        self.aciertos = 0
+        self.fallos = 0
+
+    def clave(self, codigo, incluir_ensamblador=True, optimizar=False, limite_ensamblador=None):
+        """sha256 del código fuente, la versión del intérprete y las opciones que cambian el resultado.
+
+        limite_ensamblador es el de Presupuesto.ensamblador: un programa que
+        entra en un límite puede no entrar en otro, así que cada límite tiene
+        su propia entrada.
+        """
+        datos = (f"{VERSION}\0{sys.implementation.cache_tag}\0{int(incluir_ensamblador)}{int(optimizar)}"
+                 f"\0{limite_ensamblador}\0{codigo}")
+        return hashlib.sha256(datos.encode('utf-8')).hexdigest()
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, clave + EXTENSION)
+
+    def obtener(self, clave):
+        """ProgramaCompilado guardado con esa clave, o None; una entrada dañada se borra"""
+        ruta = self.ruta(clave)
+        try:
+            with open(ruta, 'rb') as archivo:
+                programa = pickle.load(archivo)
+        except FileNotFoundError:
+            self.fallos += 1
+            return None
+        except Exception:
+            self._borrar(ruta)
+            self.fallos += 1
+            return None
+        # La fecha de modificación marca el último uso para el desalojo
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        self.aciertos += 1
+        return programa
+
+    def guardar(self, clave, programa):
+        """Escribe la entrada de forma atómica y desaloja si la caché quedó demasiado grande"""
+        os.makedirs(self.directorio, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+        try:
+            buffer = io.BytesIO()
+            _Serializador(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(programa)
+            with os.fdopen(descriptor, 'wb') as archivo:
+                archivo.write(buffer.getvalue())
+            os.replace(temporal, self.ruta(clave))
+        except BaseException:
+            self._borrar(temporal)
+            raise
+        self.desalojar()
+
+    def compilar(self, codigo, incluir_ensamblador=True, optimizar=False, presupuesto=None):
+        """Como compilar_programa, pero pasando por la caché"""
+        limite = presupuesto.ensamblador if presupuesto is not None and incluir_ensamblador else None
+        clave = self.clave(codigo, incluir_ensamblador, optimizar, limite)
+        programa = self.obtener(clave)
+        if programa is None:
+            programa = compilar_programa(codigo, incluir_ensamblador, optimizar, presupuesto)
+            try:
+                self.guardar(clave, programa)
+            except OSError:
+                # Sin permiso o sin espacio: se sigue sin caché
+                pass
+        return programa
+
+    def entradas(self):
+        """(ruta, tamaño, fecha de modificación) de cada entrada"""
+        try:
+            nombres = os.listdir(self.directorio)
+        except FileNotFoundError:
+            return []
+        entradas = []
+        for nombre in nombres:
+            if not nombre.endswith(EXTENSION):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                datos = os.stat(ruta)
+            except FileNotFoundError:
+                continue
+            entradas.append((ruta, datos.st_size, datos.st_mtime))
+        return entradas
+
+    def desalojar(self):
+        """Borra las entradas usadas hace más tiempo hasta quedar dentro de tamano_maximo"""
+        entradas = self.entradas()
+        total = sum(tamano for _, tamano, _ in entradas)
+        if total <= self.tamano_maximo:
+            return
+        for ruta, tamano, _ in sorted(entradas, key=lambda entrada: entrada[2]):
+            self._borrar(ruta)
+            total -= tamano
+            if total <= self.tamano_maximo:
+                break
+
+    def limpiar(self):
+        for ruta, _, _ in self.entradas():
+            self._borrar(ruta)
+
+    @staticmethod
+    def _borrar(ruta):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Compila programas Pascal a la caché en disco")
+    parser.add_argument('archivos', nargs='*', help="programas .pas a compilar y guardar")
+    parser.add_argument('--directorio', default=None, help="directorio de la caché")
+    parser.add_argument('--optimizar', action='store_true', help="optimizar el ensamblador")
+    parser.add_argument('--limpiar', action='store_true', help="borrar todas las entradas")
+    opciones = parser.parse_args(argumentos)
+
+    cache = CacheProgramas(opciones.directorio)
+    if opciones.limpiar:
+        cache.limpiar()
+    for ruta in opciones.archivos:
+        with open(ruta, encoding='utf-8') as archivo:
+            codigo = archivo.read()
+        try:
+            cache.compilar(codigo, optimizar=opciones.optimizar)
+        except Exception as e:
+            print(f"{ruta}: Error: {e}")
+    entradas = cache.entradas()
+    print(f"{cache.directorio}: {len(entradas)} programas, {sum(tamano for _, tamano, _ in entradas)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Ejecutor por lotes multinúcleo para trabajos independientes (programa, entradas).
+
+Los trabajos se leen de a uno: cada programa distinto se compila una sola
+vez en el proceso principal cuando aparece por primera vez y viaja a los
+procesos trabajadores sólo con los bloques que lo usan. Cada trabajador
+guarda los programas que recibió; los trabajos viajan con la clave del
+programa y sus entradas, agrupados en bloques.
+
+Uso desde la línea de comandos:
+
+    python ejecutor_lotes.py trabajos.jsonl
+    python ejecutor_lotes.py carpeta_con_programas/ --procesos 8 --tiempo-limite 2
+
+En un archivo JSONL cada línea es un trabajo {"id": ..., "codigo": ...,
+"entradas": [...]} (o "archivo" con la ruta del programa en lugar de
+"codigo"). En una carpeta cada archivo .pas es un trabajo y sus entradas se
+leen, una por línea, del archivo .in con el mismo nombre si existe.
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+
+from cache_programas import CacheProgramas
+from interpretepascal import (InterpreteUnificado, Presupuesto, PresupuestoExcedido, ResultadoEjecucion,
+                              compilar_programa)
+
+
+# Programas compilados que guarda cada proceso trabajador; al llenarse se
+# descarta el más viejo, que se vuelve a enviar si otro bloque lo necesita
+TAMANO_CACHE_PROGRAMAS = 256
+
+_PROGRAMAS = {}
+
+
+class Trabajo:
+    """Un programa (código fuente) y el conjunto de entradas con el que se ejecuta"""
+
+    def __init__(self, id, codigo, entradas=()):
+        self.id = id
+        self.codigo = codigo
+        self.entradas = list(entradas)
+
+
+def clave_programa(codigo):
+    """Clave estable de un programa a partir de su código fuente"""
+    return hashlib.sha256(codigo.encode('utf-8')).hexdigest()
+
+
+def _ejecutar_bloque(bloque, programas, tiempo_limite, incluir_ensamblador, presupuesto=None):
+    """Ejecuta en el trabajador un bloque de (índice, clave, entradas).
+
+    programas trae los programas compilados que el bloque envía por primera
+    vez. Devuelve (resultados, faltantes): faltantes son los trabajos cuyo
+    programa este proceso no tiene, para que se reenvíen junto con él.
+    """
+    for clave, programa in programas.items():
+        if len(_PROGRAMAS) >= TAMANO_CACHE_PROGRAMAS:
+            del _PROGRAMAS[next(iter(_PROGRAMAS))]
+        _PROGRAMAS[clave] = programa
+    resultados = []
+    faltantes = []
+    for indice, clave, entradas in bloque:
+        programa = _PROGRAMAS.get(clave)
+        if programa is None:
+            faltantes.append((indice, clave, entradas))
+            continue
+        interprete = InterpreteUnificado(entrada=entradas, presupuesto=presupuesto)
+        resultado = interprete.ejecutar_programa(programa, generar_ensamblador=False,
+                                                 tiempo_limite=tiempo_limite)
+        if not incluir_ensamblador:
+            resultado.ensamblador = None
+        resultados.append((indice, resultado))
+    return resultados, faltantes
+
+
+def ejecutar_trabajos(trabajos, procesos=None, tam_bloque=16, tiempo_limite=None,
+                      en_orden=True, incluir_ensamblador=False, presupuesto=None, cache=None):
+    """Ejecuta los trabajos en un pool de procesos y produce (id, ResultadoEjecucion).
+
+    trabajos puede ser cualquier iterable, también un generador sin fin: se
+    consume a medida que hay lugar en el pool. Con en_orden=True los
+    resultados salen en el orden de los trabajos; si no, a medida que
+    terminan. En orden, mientras un trabajo lento retiene más de
+    tam_bloque * 4 * procesos resultados ya terminados, no se envían
+    trabajos nuevos. tiempo_limite (segundos) y el Presupuesto se aplican a
+    cada trabajo por separado y detienen ciclos while que no terminan sin
+    frenar al resto del lote. Con una CacheProgramas los programas ya
+    compilados en corridas anteriores se cargan del disco.
+    """
+    compilar = cache.compilar if cache is not None else compilar_programa
+    procesos = procesos or os.cpu_count() or 1
+    maximo_en_vuelo = procesos * 4
+    maximo_pendientes = maximo_en_vuelo * tam_bloque
+    programas = {}
+    errores_compilacion = {}
+    enviados = set()
+    ids = {}
+    pendientes_en_orden = {}
+    siguiente = 0
+
+    def entregar(indice, resultado):
+        nonlocal siguiente
+        if not en_orden:
+            yield ids.pop(indice), resultado
+            return
+        pendientes_en_orden[indice] = resultado
+        while siguiente in pendientes_en_orden:
+            yield ids.pop(siguiente), pendientes_en_orden.pop(siguiente)
+            siguiente += 1
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=procesos) as pool:
+        en_vuelo = set()
+
+        def enviar(bloque, adjuntos):
+            en_vuelo.add(pool.submit(_ejecutar_bloque, bloque, adjuntos, tiempo_limite, incluir_ensamblador,
+                                     presupuesto))
+
+        def recoger(listos):
+            for futuro in listos:
+                resultados, faltantes = futuro.result()
+                for indice, resultado in resultados:
+                    yield from entregar(indice, resultado)
+                if faltantes:
+                    enviar(faltantes, {clave: programas[clave] for _, clave, _ in faltantes})
+
+        bloque = []
+        adjuntos = {}
+        for indice, trabajo in enumerate(trabajos):
+            ids[indice] = trabajo.id
+            clave = clave_programa(trabajo.codigo)
+            if clave not in programas and clave not in errores_compilacion:
+                try:
+                    programas[clave] = compilar(trabajo.codigo, incluir_ensamblador, presupuesto=presupuesto)
+                except PresupuestoExcedido as e:
+                    errores_compilacion[clave] = f"Error en línea {e.linea}: {e}"
+                except Exception as e:
+                    errores_compilacion[clave] = f"Error: {e}"
+            if clave in errores_compilacion:
+                yield from entregar(indice, ResultadoEjecucion(None, {}, None, [errores_compilacion[clave]]))
+                continue
+
+            if clave not in enviados:
+                enviados.add(clave)
+                adjuntos[clave] = programas[clave]
+            bloque.append((indice, clave, trabajo.entradas))
+            if len(bloque) < tam_bloque:
+                continue
+            enviar(bloque, adjuntos)
+            bloque = []
+            adjuntos = {}
+            while en_vuelo and (len(en_vuelo) >= maximo_en_vuelo
+                                or len(pendientes_en_orden) >= maximo_pendientes):
+                listos, en_vuelo = concurrent.futures.wait(en_vuelo,
+                                                           return_when=concurrent.futures.FIRST_COMPLETED)
+                yield from recoger(listos)
+
+        if bloque:
+            enviar(bloque, adjuntos)
+        while en_vuelo:
+            listos, en_vuelo = concurrent.futures.wait(en_vuelo, return_when=concurrent.futures.FIRST_COMPLETED)
+            yield from recoger(listos)
+
+
+def leer_trabajos(ruta):
+    """Lee trabajos de un archivo JSONL o de una carpeta con archivos .pas"""
+    if os.path.isdir(ruta):
+        for nombre in sorted(os.listdir(ruta)):
+            if not nombre.endswith('.pas'):
+                continue
+            base = os.path.join(ruta, nombre[:-4])
+            with open(base + '.pas', encoding='utf-8') as archivo:
+                codigo = archivo.read()
+            entradas = []
+            if os.path.exists(base + '.in'):
+                with open(base + '.in', encoding='utf-8') as archivo:
+                    entradas = [linea for linea in archivo.read().split('\n') if linea.strip()]
+            yield Trabajo(nombre[:-4], codigo, entradas)
+        return
+
+    directorio = os.path.dirname(ruta)
+    with open(ruta, encoding='utf-8') as archivo:
+        for numero, linea in enumerate(archivo, 1):
+            if not linea.strip():
+                continue
+            datos = json.loads(linea)
+            codigo = datos.get('codigo')
+            if codigo is None:
+                with open(os.path.join(directorio, datos['archivo']), encoding='utf-8') as fuente:
+                    codigo = fuente.read()
+            yield Trabajo(datos.get('id', numero), codigo, datos.get('entradas', []))
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Ejecuta lotes de programas Pascal en varios procesos")
+    parser.add_argument('ruta', help="archivo JSONL de trabajos o carpeta con archivos .pas")
+    parser.add_argument('--procesos', type=int, default=None, help="procesos trabajadores (por defecto, uno por núcleo)")
+    parser.add_argument('--tam-bloque', type=int, default=16, help="trabajos enviados por tarea")
+    parser.add_argument('--tiempo-limite', type=float, default=None, help="segundos máximos por trabajo")
+    parser.add_argument('--max-sentencias', type=int, default=None, help="sentencias ejecutadas por trabajo")
+    parser.add_argument('--max-iteraciones', type=int, default=None, help="iteraciones de ciclos por trabajo")
+    parser.add_argument('--max-ensamblador', type=int, default=None,
+                        help="instrucciones de ensamblador generadas por programa")
+    parser.add_argument('--cache', nargs='?', const='', default=None,
+                        help="guardar los programas compilados en disco (directorio opcional)")
+    parser.add_argument('--sin-orden', action='store_true', help="emitir los resultados a medida que terminan")
+    parser.add_argument('--ensamblador', action='store_true', help="incluir el código ensamblador en la salida")
+    opciones = parser.parse_args(argumentos)
+
+    cache = CacheProgramas(opciones.cache or None) if opciones.cache is not None else None
+    presupuesto = None
+    if opciones.max_sentencias or opciones.max_iteraciones or opciones.max_ensamblador:
+        presupuesto = Presupuesto(opciones.max_sentencias, opciones.max_iteraciones,
+                                  ensamblador=opciones.max_ensamblador)
+    resultados = ejecutar_trabajos(leer_trabajos(opciones.ruta), opciones.procesos, opciones.tam_bloque,
+                                   opciones.tiempo_limite, not opciones.sin_orden, opciones.ensamblador,
+                                   presupuesto, cache)
+    for id, resultado in resultados:
+        registro = {
+            'id': id,
+            'salida': resultado.salida,
+            'variables': resultado.variables,
+            'errores': resultado.errores,
+        }
+        if opciones.ensamblador:
+            registro['ensamblador'] = resultado.ensamblador
+        sys.stdout.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+
+
+if __name__ == "__main__":
+    main()
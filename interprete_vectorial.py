@@ -0,0 +1,392 @@
+"""Modo por lotes vectorizado: ejecuta un mismo programa sobre N vectores de entrada.
+
+Cada read(x) toma una columna completa de NumPy y las expresiones se evalúan
+como operaciones sobre arreglos. Los ciclos y condicionales con número de
+vueltas distinto por fila se resuelven con máscaras: una fila sólo avanza
+mientras está activa y sus errores no detienen al resto del lote.
+
+Las variables integer usan arreglos int64: a diferencia del intérprete,
+que usa int de Python, sus operaciones desbordan pasados los 64 bits.
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sólo lo necesita este modo
+    np = None
+
+from interpretepascal import (
+    InterpreteUnificado,
+    OPERADORES_PYTHON,
+    OP_VAR, OP_READ, OP_PRINT, OP_PRINTLN, OP_WRITE,
+    OP_ASIGNAR_LITERAL, OP_ASIGNAR, OP_FOR, OP_ENDFOR, OP_WHILE,
+    OP_ENDWHILE, OP_IF, OP_ENDIF, OP_ERROR, OP_ASIGNAR_INVARIANTE, OP_FOR_CERRADO,
+    LIMITE_ENTERO_EXACTO, TIPO_ENTERO, es_literal_entero,
+)
+
+
+FUNCIONES_VECTORIALES = {
+    'sin': 'sin',
+    'cos': 'cos',
+    'tan': 'tan',
+}
+
+COMPARACIONES_VECTORIALES = {
+    '<': 'less',
+    '>': 'greater',
+    '<=': 'less_equal',
+    '>=': 'greater_equal',
+    '==': 'equal',
+    '!=': 'not_equal',
+}
+
+
+class ResultadoLote:
+    """Resultados por fila de una ejecución vectorizada"""
+
+    def __init__(self, filas, salidas, variables, asignadas, errores):
+        self.filas = filas
+        self.salidas = salidas
+        self.variables = variables
+        self.asignadas = asignadas
+        self.errores = errores
+
+    def fila(self, i):
+        """Devuelve salida, valores finales y error de una sola fila"""
+        return {
+            'salida': self.salidas[i] if self.salidas is not None else None,
+            'variables': {nombre: valores[i].item()
+                          for nombre, valores in self.variables.items()
+                          if self.asignadas[nombre][i]},
+            'error': self.errores[i],
+        }
+
+    def __len__(self):
+        return self.filas
+
+
+class InterpreteVectorial:
+    """Ejecuta un programa compilado sobre todas las filas de un lote a la vez"""
+
+    def __init__(self, capturar_salida=True):
+        if np is None:
+            raise Exception("El modo por lotes vectorizado requiere NumPy")
+        self.capturar_salida = capturar_salida
+
+    def ejecutar(self, codigo, entradas):
+        """Ejecuta el programa sobre el lote y devuelve un ResultadoLote.
+
+        entradas puede ser una matriz (filas x lecturas) cuyas columnas se
+        consumen en el orden en que se ejecutan los read(), o un diccionario
+        nombre -> columna (o matriz si la variable se lee varias veces).
+        """
+        compilador = InterpreteUnificado()
+        instrucciones = compilador.compilar_codigo(codigo)
+        self._preparar_entradas(entradas)
+        self._ejecutar_instrucciones(instrucciones)
+
+        salidas = None
+        if self.capturar_salida:
+            salidas = ["".join(partes) for partes in self.salidas]
+        return ResultadoLote(self.filas, salidas, self.valores, self.asignadas, self.errores)
+
+    def _preparar_entradas(self, entradas):
+        if isinstance(entradas, dict):
+            self.columnas = {}
+            for nombre, columna in entradas.items():
+                columna = np.asarray(columna, dtype=float)
+                if columna.ndim == 1:
+                    columna = columna.reshape(-1, 1)
+                self.columnas[nombre] = columna
+            self.filas = len(next(iter(self.columnas.values()))) if self.columnas else 1
+            self.cursores = {nombre: np.zeros(self.filas, dtype=int) for nombre in self.columnas}
+            self.matriz = None
+        else:
+            matriz = np.asarray(entradas, dtype=float)
+            if matriz.ndim == 1:
+                matriz = matriz.reshape(-1, 1)
+            self.matriz = matriz
+            self.filas = len(matriz)
+            self.cursor = np.zeros(self.filas, dtype=int)
+
+        self.valores = {}
+        self.asignadas = {}
+        self.declaradas = {}
+        self.vivas = np.ones(self.filas, dtype=bool)
+        self.errores = [None] * self.filas
+        self.salidas = [[] for _ in range(self.filas)] if self.capturar_salida else None
+        self.numero_linea = 0
+
+    def _fallar(self, filas, mensaje):
+        """Marca con error las filas vivas indicadas y las retira del lote"""
+        filas = filas & self.vivas
+        for i in np.flatnonzero(filas):
+            self.errores[i] = f"Error en línea {self.numero_linea}: {mensaje}"
+        self.vivas &= ~filas
+
+    def _declarada(self, nombre):
+        if nombre in self.declaradas:
+            return self.declaradas[nombre]
+        return np.zeros(self.filas, dtype=bool)
+
+    def _escribir(self, mascara, textos):
+        """Agrega texto a la salida de cada fila activa (textos: str o lista por fila)"""
+        if not self.capturar_salida:
+            return
+        if isinstance(textos, str):
+            for i in np.flatnonzero(mascara):
+                self.salidas[i].append(textos)
+        else:
+            for i in np.flatnonzero(mascara):
+                self.salidas[i].append(textos[i])
+
+    def _ejecutar_instrucciones(self, instrucciones):
+        total = len(instrucciones)
+        mascara = self.vivas.copy()
+        bloques = []
+        pc = 0
+
+        while pc < total:
+            mascara &= self.vivas
+            if not mascara.any():
+                if not bloques:
+                    break
+                # Ninguna fila activa dentro del bloque: saltar a su cierre
+                pc = instrucciones[bloques[-1][0]].salto
+
+            instr = instrucciones[pc]
+            self.numero_linea = instr.numero_linea
+            opcode = instr.opcode
+
+            if opcode == OP_VAR:
+                nombres, tipo = instr.operandos
+                for nombre in nombres:
+                    if nombre not in self.declaradas:
+                        self.declaradas[nombre] = np.zeros(self.filas, dtype=bool)
+                        self.valores[nombre] = np.zeros(self.filas, dtype=np.int64 if tipo == TIPO_ENTERO else float)
+                        self.asignadas[nombre] = np.zeros(self.filas, dtype=bool)
+                    self._fallar(mascara & self.declaradas[nombre],
+                                 f"Error: Variable '{nombre}' ya está declarada")
+                    self.declaradas[nombre] |= mascara & self.vivas
+
+            elif opcode == OP_READ:
+                nombre = instr.operandos[0]
+                self._fallar(mascara & ~self._declarada(nombre), f"Error: Variable '{nombre}' no declarada.")
+                self._leer(nombre, mascara & self.vivas)
+
+            elif opcode in (OP_PRINT, OP_PRINTLN, OP_WRITE):
+                self._imprimir(instr, mascara)
+
+            elif opcode == OP_ASIGNAR_LITERAL:
+                nombre, valor = instr.operandos[:2]
+                self._asignar(nombre, valor, mascara)
+
+            elif opcode in (OP_ASIGNAR, OP_ASIGNAR_INVARIANTE):
+                nombre, expr = instr.operandos[:2]
+                valor = self._evaluar_postfija(expr, mascara)
+                self._asignar(nombre, valor, mascara)
+
+            elif opcode in (OP_FOR, OP_FOR_CERRADO):
+                var, inicio, fin_var = instr.operandos[:3]
+                self._asignar(var, inicio, mascara)
+                self._fallar(mascara & ~self._declarada(fin_var),
+                             f"Variable '{fin_var}' no declarada en el for")
+                # El límite se fija al entrar: el cuerpo puede cambiar la variable
+                fin = np.array(self._valor(('var', fin_var), mascara), copy=True)
+                bloques.append((pc, mascara, fin))
+                mascara = mascara & self.vivas
+                if mascara.any():
+                    mascara &= self.valores[var] <= fin
+                if not mascara.any():
+                    mascara = self._cerrar_bloque(bloques)
+                    pc = instr.salto
+                pc += 1
+                continue
+
+            elif opcode == OP_ENDFOR:
+                var = instr.operandos[0]
+                mascara &= self.vivas
+                np.add(self.valores[var], 1, out=self.valores[var], where=mascara)
+                mascara &= self.valores[var] <= bloques[-1][2]
+                if mascara.any():
+                    pc = instr.salto + 1
+                else:
+                    mascara = self._cerrar_bloque(bloques)
+                    pc += 1
+                continue
+
+            elif opcode in (OP_WHILE, OP_IF):
+                bloques.append((pc, mascara, None))
+                mascara = mascara & self._evaluar_condicion(instr.operandos[0], mascara)
+                if not mascara.any():
+                    mascara = self._cerrar_bloque(bloques)
+                    pc = instr.salto
+                pc += 1
+                continue
+
+            elif opcode == OP_ENDWHILE:
+                mascara = mascara & self._evaluar_condicion(instr.operandos[0], mascara)
+                if mascara.any():
+                    pc = instr.salto + 1
+                else:
+                    mascara = self._cerrar_bloque(bloques)
+                    pc += 1
+                continue
+
+            elif opcode == OP_ENDIF:
+                mascara = self._cerrar_bloque(bloques)
+
+            elif opcode == OP_ERROR:
+                self._fallar(mascara, instr.operandos[0])
+
+            pc += 1
+
+    def _cerrar_bloque(self, bloques):
+        """Sale del bloque más interno y recupera la máscara exterior"""
+        _, exterior, _ = bloques.pop()
+        return exterior & self.vivas
+
+    def _leer(self, nombre, mascara):
+        filas = np.flatnonzero(mascara)
+        if self.matriz is not None:
+            matriz, cursor = self.matriz, self.cursor
+        elif nombre in self.columnas:
+            matriz, cursor = self.columnas[nombre], self.cursores[nombre]
+        else:
+            self._fallar(mascara, f"No hay entradas para '{nombre}'")
+            return
+
+        agotadas = cursor[filas] >= matriz.shape[1]
+        self._fallar(_mascara_de(self.filas, filas[agotadas]), f"Entrada agotada al leer '{nombre}'")
+        filas = filas[~agotadas]
+        if self.valores[nombre].dtype != float:
+            # Una variable integer sólo acepta valores enteros
+            leidos = matriz[filas, cursor[filas]]
+            with np.errstate(invalid='ignore'):
+                invalidas = ~(np.isfinite(leidos) & (leidos == np.floor(leidos))
+                              & (np.abs(leidos) < LIMITE_ENTERO_EXACTO))
+            self._fallar(_mascara_de(self.filas, filas[invalidas]), "Valor inválido ingresado")
+            filas = filas[~invalidas]
+        self.valores[nombre][filas] = matriz[filas, cursor[filas]]
+        self.asignadas[nombre][filas] = True
+        cursor[filas] += 1
+
+    def _imprimir(self, instr, mascara):
+        opcode = instr.opcode
+        nombre = instr.operandos[0]
+        declarada = mascara & self._declarada(nombre)
+        literal = mascara & ~declarada
+
+        if declarada.any():
+            valores = self._valor(('var', nombre), declarada).tolist()
+            declarada &= self.vivas
+            if opcode == OP_WRITE:
+                textos = [f"{nombre}: {valor}\n" for valor in valores]
+            elif opcode == OP_PRINTLN:
+                textos = [f"{valor}\n" for valor in valores]
+            else:
+                textos = [str(valor) for valor in valores]
+            self._escribir(declarada, textos)
+
+        if literal.any():
+            if opcode == OP_WRITE:
+                self._escribir(literal, f"{nombre}\n")
+            elif opcode == OP_PRINTLN:
+                self._escribir(literal, f"{instr.operandos[1]}\n")
+            else:
+                self._escribir(literal, instr.operandos[1])
+
+    def _asignar(self, nombre, valor, mascara):
+        self._fallar(mascara & ~self._declarada(nombre), f"Error: Variable '{nombre}' no declarada.")
+        mascara = mascara & self.vivas
+        if not mascara.any():
+            return
+        np.copyto(self.valores[nombre], valor, where=mascara)
+        self.asignadas[nombre] |= mascara
+
+    def _valor(self, operando, mascara):
+        """Valor vectorial de un operando, con error en las filas sin valor"""
+        tipo, dato = operando
+        if tipo != 'var':
+            return dato
+        if dato not in self.valores:
+            return np.zeros(self.filas)
+        self._fallar(mascara & ~self.asignadas[dato], f"Error: Variable '{dato}' no tiene valor.")
+        return self.valores[dato]
+
+    def _evaluar_postfija(self, expresion, mascara):
+        """Evalúa una expresión postfija sobre todas las filas activas a la vez"""
+        pila = []
+        with np.errstate(all='ignore'):
+            for token in expresion.split():
+                if token in OPERADORES_PYTHON:
+                    if len(pila) < 2:
+                        self._fallar(mascara, "pop from empty list")
+                        return 0.0
+                    b = pila.pop()
+                    a = pila.pop()
+                    val_a = self._valor(a, mascara)
+                    val_b = self._valor(b, mascara)
+                    if token in ('+', '-', '*') and not isinstance(val_a, np.ndarray) and not isinstance(val_b, np.ndarray):
+                        # Entre literales se opera en Python: NumPy desbordaría los int en silencio
+                        resultado = val_a + val_b if token == '+' else val_a - val_b if token == '-' else val_a * val_b
+                    elif token == '+':
+                        resultado = np.add(val_a, val_b)
+                    elif token == '-':
+                        resultado = np.subtract(val_a, val_b)
+                    elif token == '*':
+                        resultado = np.multiply(val_a, val_b)
+                    elif token == '/':
+                        self._fallar(mascara & (np.asarray(val_b) == 0), "Error: División por cero")
+                        resultado = np.divide(val_a, val_b)
+                    else:
+                        self._fallar(mascara & (np.asarray(val_a) == 0) & (np.asarray(val_b) < 0),
+                                     "0.0 cannot be raised to a negative power")
+                        # La base entera pasa a real, como en el intérprete
+                        resultado = np.power(np.asarray(val_a, dtype=float), val_b)
+                    pila.append(('val', resultado))
+
+                elif token.lower() in FUNCIONES_VECTORIALES:
+                    if not pila:
+                        self._fallar(mascara, "pop from empty list")
+                        return 0.0
+                    funcion = getattr(np, FUNCIONES_VECTORIALES[token.lower()])
+                    pila.append(('val', funcion(self._valor(pila.pop(), mascara))))
+
+                else:
+                    try:
+                        literal = float(token)
+                        # Los literales enteros no convierten a real una operación entre integer
+                        pila.append(('val', int(literal) if es_literal_entero(literal) else literal))
+                    except ValueError:
+                        self._fallar(mascara & ~self._declarada(token), f"Token no reconocido: {token}")
+                        pila.append(('var', token))
+
+            return self._valor(pila[0], mascara) if pila else 0.0
+
+    def _evaluar_condicion(self, condicion, mascara):
+        """Evalúa una condición 'a b op' y devuelve la máscara de filas que la cumplen"""
+        tokens = condicion.split()
+        if len(tokens) != 3 or tokens[2] not in COMPARACIONES_VECTORIALES:
+            return np.zeros(self.filas, dtype=bool)
+
+        valores = []
+        for token in tokens[:2]:
+            try:
+                valores.append(float(token))
+            except ValueError:
+                self._fallar(mascara & ~self._declarada(token),
+                             f"could not convert string to float: {token!r}")
+                valores.append(self._valor(('var', token), mascara))
+
+        comparacion = getattr(np, COMPARACIONES_VECTORIALES[tokens[2]])
+        return np.broadcast_to(comparacion(valores[0], valores[1]), (self.filas,)) & self.vivas
+
+
+def _mascara_de(filas, indices):
+    mascara = np.zeros(filas, dtype=bool)
+    mascara[indices] = True
+    return mascara
+
+
+def ejecutar_lote(codigo, entradas, capturar_salida=True):
+    """Ejecuta un programa sobre un lote de entradas y devuelve un ResultadoLote"""
+    return InterpreteVectorial(capturar_salida).ejecutar(codigo, entradas)
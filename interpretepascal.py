@@ -1,32 +1,1832 @@
+import asyncio
+import bisect
+import difflib
+import functools
+import gzip
+import inspect
+import io
+import json
 import math
+import os
+import re
+import sys
+import time
+
+
+# Versión del intérprete; cambia cuando cambia la forma de un ProgramaCompilado
+# y forma parte de la clave de la caché en disco (cache_programas.py)
+VERSION = "2.1"
+
+# Códigos de operación de las instrucciones precompiladas
+OP_NOP = 0
+OP_VAR = 1
+OP_READ = 2
+OP_PRINT = 3
+OP_PRINTLN = 4
+OP_WRITE = 5
+OP_ASIGNAR_LITERAL = 6
+OP_ASIGNAR = 7
+OP_FOR = 8
+OP_ENDFOR = 9
+OP_WHILE = 10
+OP_ENDWHILE = 11
+OP_ERROR = 12
+OP_IF = 13
+OP_ENDIF = 14
+OP_ASIGNAR_INVARIANTE = 15
+OP_FOR_CERRADO = 16
+
+# Instrucciones cuyo último operando es un evaluador compilado
+OPCODES_CON_EVALUADOR = {OP_ASIGNAR, OP_WHILE, OP_ENDWHILE, OP_IF, OP_ENDIF, OP_ASIGNAR_INVARIANTE}
+
+# Palabras que abren un bloque y la palabra que lo cierra
+CIERRES_BLOQUE = {
+    'for': 'endfor',
+    'while': 'endwhile',
+    'if': 'endif',
+}
+APERTURAS_BLOQUE = {cierre: apertura for apertura, cierre in CIERRES_BLOQUE.items()}
+
+# Instrucción de cierre que corresponde a cada cabecera de bloque
+CIERRES_OPCODE = {
+    OP_FOR: OP_ENDFOR,
+    OP_WHILE: OP_ENDWHILE,
+    OP_IF: OP_ENDIF,
+}
+
+# Instrucciones RISC-V de punto flotante por operador
+INSTRUCCIONES_ARITMETICAS = {
+    '+': 'fadd.s',
+    '-': 'fsub.s',
+    '*': 'fmul.s',
+    '/': 'fdiv.s',
+    '^': None,
+}
+
+INSTRUCCIONES_COMPARACION = {
+    '<': 'flt.s',
+    '>': 'fgt.s',
+    '<=': 'fle.s',
+    '>=': 'fge.s',
+    '==': 'feq.s',
+    '!=': 'fne.s',
+}
+
+# Instrucciones RISC-V enteras por operador; / y ^ siempre dan real
+INSTRUCCIONES_ENTERAS = {
+    '+': 'add',
+    '-': 'sub',
+    '*': 'mul',
+}
+
+# Salto que toma una comparación entera cuando es falsa: (instrucción, ¿invertir operandos?)
+SALTOS_SI_FALSA = {
+    '<': ('bge', False),
+    '>=': ('blt', False),
+    '>': ('bge', True),
+    '<=': ('blt', True),
+    '==': ('bne', False),
+    '!=': ('beq', False),
+}
+
+# Tipos de variables; sin ': tipo' en el var las variables son real
+TIPO_REAL = 'real'
+TIPO_ENTERO = 'integer'
+TIPOS = (TIPO_REAL, TIPO_ENTERO)
+
+
+# Estado de cada ranura de la tabla de símbolos
+SIN_DECLARAR = 0
+DECLARADA = 1
+CON_VALOR = 2
+
+# Tamaño máximo de la caché de expresiones compiladas
+TAMANO_CACHE_EXPRESIONES = 1024
+
+FUNCIONES = {
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+}
+
+OPERADORES_PYTHON = {
+    '+': '+',
+    '-': '-',
+    '*': '*',
+    '/': '/',
+    '^': '**',
+}
+
+COMPARACIONES_PYTHON = {'<', '>', '<=', '>=', '==', '!='}
+
+
+def _literal_python(valor):
+    """Representa un float como literal de Python"""
+    if not math.isfinite(valor):
+        return f"float('{valor}')"
+    # Los negativos van entre paréntesis: -1.0 ** 2.0 sería -(1.0 ** 2.0)
+    return f"({valor!r})" if math.copysign(1.0, valor) < 0 else repr(valor)
+
+
+def entero_leido(texto):
+    """Valor de read() para una variable integer: '7' o 7.0 sirven, '7.5' no (ValueError)"""
+    if isinstance(texto, int):
+        return texto
+    if isinstance(texto, str):
+        try:
+            return int(texto)
+        except ValueError:
+            pass
+    valor = float(texto)
+    if not es_literal_entero(valor):
+        raise ValueError(f"invalid literal for int(): {texto!r}")
+    return int(valor)
+
+
+def _literal_entero(valor):
+    """Representa un literal entero (guardado como float en el DAG) como int de Python"""
+    entero = int(valor)
+    return f"({entero})" if entero < 0 else str(entero)
+
+
+class GeneradorFuente:
+    """Acumula el código fuente de un evaluador y la carga de sus variables.
+
+    ranuras asocia cada nombre con su posición en las listas 'valores' y
+    'estado' que recibe el evaluador; un nombre sin ranura nunca está
+    declarado.
+    """
+
+    def __init__(self, cabecera, ranuras=()):
+        self.lineas = [cabecera]
+        self.ranuras = dict(ranuras)
+        self.simbolos = {}
+        self.valores = {}
+        self.temporales = 0
+        self.funciones = {}
+
+    def emitir(self, linea):
+        self.lineas.append("    " + linea)
+
+    def simbolo(self, nombre, mensaje):
+        """Verifica que la variable esté declarada, fallando con 'mensaje' si no"""
+        if nombre not in self.simbolos:
+            if nombre in self.ranuras:
+                self.emitir(f"if not estado[{self.ranuras[nombre]}]:")
+                self.emitir(f"    raise {mensaje}")
+            else:
+                self.emitir(f"raise {mensaje}")
+            self.simbolos[nombre] = True
+
+    def valor(self, operando):
+        """Devuelve el código Python que produce el valor del operando"""
+        tipo, dato = operando
+        if tipo != 'var':
+            return dato
+        if dato not in self.valores:
+            local = f"v{len(self.valores)}"
+            ranura = self.ranuras.get(dato)
+            if ranura is None:
+                self.emitir(f"{local} = None")
+            else:
+                self.emitir(f"if estado[{ranura}] != {CON_VALOR}:")
+                self.emitir(f"    raise Exception({f'Error: Variable {dato!r} no tiene valor.'!r})")
+                self.emitir(f"{local} = valores[{ranura}]")
+            self.valores[dato] = local
+        return self.valores[dato]
+
+    def temporal(self):
+        self.temporales += 1
+        return f"t{self.temporales - 1}"
+
+    def compilar(self, nombre_funcion, descripcion):
+        espacio = {f"_{nombre}": funcion for nombre, funcion in FUNCIONES.items()}
+        espacio.update(self.funciones)
+        exec(compile("\n".join(self.lineas), descripcion, 'exec'), espacio)
+        return espacio[nombre_funcion]
+
+
+OPERACIONES = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '^': lambda a, b: a ** b,
+}
+
+# Operadores con elemento neutro: (neutro a la derecha, ¿también a la izquierda?).
+# x+0 no está: con x = -0.0 da 0.0, así que no es una identidad en IEEE 754
+NEUTROS = {
+    '-': (0.0, False),
+    '*': (1.0, True),
+    '/': (1.0, False),
+    '^': (1.0, False),
+}
+
+OPERADORES_CONMUTATIVOS = {'+', '*'}
+
+
+class DagExpresion:
+    """Grafo acíclico de una expresión postfija con constantes plegadas y subexpresiones compartidas.
+
+    nodos contiene tuplas ('lit', valor), ('var', nombre), ('op', operador, a, b)
+    o ('fun', nombre, a), donde a y b son índices de otros nodos. eventos
+    registra, en el orden de los tokens, cada nodo nuevo ('nodo', i), cada vez
+    que se consume un operando ('uso', i) y la falta de operandos
+    ('falta', None), para que los errores salgan en el mismo orden que al
+    evaluar token por token. completa indica que la expresión dejó
+    exactamente un valor en la pila.
+    """
+    __slots__ = ('nodos', 'eventos', 'raiz', 'completa')
+
+    def __init__(self):
+        self.nodos = []
+        self.eventos = []
+        self.raiz = None
+        self.completa = False
+
+    def agregar(self, nodo, numeros, clave=None):
+        """Índice del nodo, creándolo sólo si no hay uno igual"""
+        clave = nodo if clave is None else clave
+        if clave not in numeros:
+            numeros[clave] = len(self.nodos)
+            self.nodos.append(nodo)
+            self.eventos.append(('nodo', numeros[clave]))
+        return numeros[clave]
+
+    def literal(self, indice):
+        """Valor del nodo si es un literal, None si no"""
+        nodo = self.nodos[indice]
+        return nodo[1] if nodo[0] == 'lit' else None
+
+
+def _clave_literal(valor):
+    # repr distingue 0.0 de -0.0 y permite usar nan como clave
+    return ('lit', repr(valor))
+
+
+def _plegar(funcion, *argumentos):
+    """Calcula una operación sobre literales; None si fallaría o no da un float"""
+    try:
+        valor = funcion(*argumentos)
+    except (ArithmeticError, ValueError):
+        return None
+    return valor if isinstance(valor, float) else None
+
+
+# Precedencia y asociatividad por la derecha de los operadores infijos ('~' es el menos unario)
+PRECEDENCIA_INFIJA = {
+    '+': (1, False),
+    '-': (1, False),
+    '*': (2, False),
+    '/': (2, False),
+    '~': (3, True),
+    '^': (4, True),
+}
+
+_LITERAL_NUMERICO = re.compile(r"-?(?:\d+\.?\d*|\.\d+)")
+
+# Nombre válido de variable o función
+_IDENTIFICADOR = re.compile(r"[A-Za-z_]\w*")
+
+# Prefijo que algunos errores de compilación ya traen con su número de línea
+_PREFIJO_ERROR = re.compile(r"^Error en línea \d+: ")
+
+_TOKEN_INFIJO = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|([A-Za-z_]\w*)|([-+*/^()]))")
+
+
+def es_infija(expresion):
+    """Indica si una expresión está en notación infija en lugar de postfija.
+
+    Es infija si tiene paréntesis, o si tiene algún operador y no termina
+    en un operador o una función, como terminan siempre las postfijas de
+    más de un token. Sin operadores ('x y foo') sigue siendo postfija, así
+    un token desconocido da el mismo error que antes.
+    """
+    if '(' in expresion or ')' in expresion:
+        return True
+    tokens = expresion.split()
+    if not tokens or tokens[-1] in INSTRUCCIONES_ARITMETICAS or tokens[-1].lower() in FUNCIONES:
+        return False
+    return any(operador in expresion for operador in INSTRUCCIONES_ARITMETICAS)
+
+
+@functools.lru_cache(maxsize=TAMANO_CACHE_EXPRESIONES)
+def a_postfija(expresion):
+    """Traduce una expresión infija a la forma postfija con el algoritmo shunting-yard.
+
+    Respeta la precedencia y los paréntesis; el menos unario -x se traduce
+    como x -1 * (no 0 x -, que con x = -0.0 daría 0.0) y las funciones
+    se escriben como sin(x).
+    """
+    salida = []
+    pila = []
+    espera_operando = True
+    posicion = 0
+    texto = expresion.strip()
+
+    while posicion < len(texto):
+        encontrado = _TOKEN_INFIJO.match(texto, posicion)
+        if encontrado is None or encontrado.end() == posicion:
+            raise Exception(f"Token no reconocido: {texto[posicion:].split()[0]}")
+        posicion = encontrado.end()
+        numero, nombre, simbolo = encontrado.groups()
+
+        if numero is not None or nombre is not None:
+            if not espera_operando:
+                raise Exception(f"Expresión inválida: {expresion}")
+            siguiente = _TOKEN_INFIJO.match(texto, posicion)
+            if nombre is not None and siguiente is not None and siguiente.group(3) == '(':
+                if nombre.lower() not in FUNCIONES:
+                    raise Exception(f"Función no reconocida: {nombre}")
+                # Como en las postfijas, SIN y Sin también son sin
+                pila.append(nombre.lower())
+                continue
+            salida.append(numero if numero is not None else nombre)
+            espera_operando = False
+
+        elif simbolo == '(':
+            if not espera_operando:
+                raise Exception(f"Expresión inválida: {expresion}")
+            pila.append('(')
+
+        elif simbolo == ')':
+            if espera_operando:
+                raise Exception(f"Expresión inválida: {expresion}")
+            while pila and pila[-1] != '(':
+                salida.append(_token_postfijo(pila.pop()))
+            if not pila:
+                raise Exception(f"Paréntesis desbalanceados en la expresión: {expresion}")
+            pila.pop()
+            if pila and pila[-1] in FUNCIONES:
+                salida.append(pila.pop())
+
+        elif espera_operando:
+            if simbolo == '-':
+                pila.append('~')
+            elif simbolo != '+':
+                raise Exception(f"Expresión inválida: {expresion}")
+
+        else:
+            precedencia, derecha = PRECEDENCIA_INFIJA[simbolo]
+            while pila and pila[-1] in PRECEDENCIA_INFIJA:
+                tope = PRECEDENCIA_INFIJA[pila[-1]][0]
+                if tope > precedencia or (tope == precedencia and not derecha):
+                    salida.append(_token_postfijo(pila.pop()))
+                else:
+                    break
+            pila.append(simbolo)
+            espera_operando = True
+
+    if espera_operando:
+        raise Exception(f"Expresión inválida: {expresion}")
+    while pila:
+        token = pila.pop()
+        if token == '(':
+            raise Exception(f"Paréntesis desbalanceados en la expresión: {expresion}")
+        salida.append(_token_postfijo(token))
+    return " ".join(salida)
+
+
+def _token_postfijo(token):
+    return '-1 *' if token == '~' else token
+
+
+@functools.lru_cache(maxsize=TAMANO_CACHE_EXPRESIONES)
+def construir_dag(expresion):
+    """Construye el DagExpresion de una expresión postfija.
+
+    Pliega las operaciones entre literales (incluidas sin, cos y tan),
+    aplica las identidades x-0, x*1, 1*x, x/1 y x^1 y reutiliza
+    el mismo nodo para subexpresiones repetidas.
+    """
+    dag = DagExpresion()
+    numeros = {}
+    pila = []
+
+    def literal(valor):
+        return dag.agregar(('lit', valor), numeros, _clave_literal(valor))
+
+    for token in expresion.split():
+        if token in OPERADORES_PYTHON:
+            if len(pila) < 2:
+                dag.eventos.append(('falta', None))
+                return dag
+            b = pila.pop()
+            a = pila.pop()
+            dag.eventos.append(('uso', a))
+            dag.eventos.append(('uso', b))
+            valor_a, valor_b = dag.literal(a), dag.literal(b)
+
+            if valor_a is not None and valor_b is not None:
+                valor = _plegar(OPERACIONES[token], valor_a, valor_b)
+                if valor is not None:
+                    pila.append(literal(valor))
+                    continue
+
+            if token in NEUTROS:
+                neutro, por_izquierda = NEUTROS[token]
+                if valor_b == neutro:
+                    pila.append(a)
+                    continue
+                if por_izquierda and valor_a == neutro:
+                    pila.append(b)
+                    continue
+
+            if token in OPERADORES_CONMUTATIVOS and b < a:
+                a, b = b, a
+            pila.append(dag.agregar(('op', token, a, b), numeros))
+
+        elif token.lower() in FUNCIONES:
+            if not pila:
+                dag.eventos.append(('falta', None))
+                return dag
+            a = pila.pop()
+            dag.eventos.append(('uso', a))
+            nombre = token.lower()
+            valor_a = dag.literal(a)
+            if valor_a is not None:
+                valor = _plegar(FUNCIONES[nombre], valor_a)
+                if valor is not None:
+                    pila.append(literal(valor))
+                    continue
+            pila.append(dag.agregar(('fun', nombre, a), numeros))
+
+        else:
+            try:
+                pila.append(literal(float(token)))
+            except ValueError:
+                pila.append(dag.agregar(('var', token), numeros))
+
+    if pila:
+        dag.raiz = pila[0]
+        dag.eventos.append(('uso', dag.raiz))
+    dag.completa = len(pila) == 1
+    return dag
+
+
+def texto_postfijo(dag, indice, sustituciones=None):
+    """Reconstruye el texto postfijo del subárbol de un nodo.
+
+    sustituciones asocia índices de nodos con el token que los reemplaza.
+    """
+    if sustituciones and indice in sustituciones:
+        return sustituciones[indice]
+    nodo = dag.nodos[indice]
+    if nodo[0] == 'lit':
+        return repr(nodo[1])
+    if nodo[0] == 'var':
+        return nodo[1]
+    if nodo[0] == 'op':
+        return (f"{texto_postfijo(dag, nodo[2], sustituciones)} "
+                f"{texto_postfijo(dag, nodo[3], sustituciones)} {nodo[1]}")
+    return f"{texto_postfijo(dag, nodo[2], sustituciones)} {nodo[1]}"
+
+
+def variables_dag(dag):
+    """Nombres de las variables que usa la expresión"""
+    return {nodo[1] for nodo in dag.nodos if nodo[0] == 'var'}
+
+
+def es_literal_entero(valor):
+    """Indica si un literal puede usarse como integer: entero y representable exactamente"""
+    return math.isfinite(valor) and float(valor).is_integer() and abs(valor) < LIMITE_ENTERO_EXACTO
+
+
+def tipos_dag(dag, enteras):
+    """Tipo de cada nodo del DAG: TIPO_ENTERO, TIPO_REAL o None para los literales.
+
+    Una variable es entera si está en 'enteras'. +, - y * de enteros (o de
+    un entero y un literal entero) dan entero; / , ^, las funciones y
+    cualquier operación con un real dan real. Los literales no tienen tipo
+    propio: toman el del otro operando.
+    """
+    tipos = []
+    for nodo in dag.nodos:
+        if nodo[0] == 'lit':
+            tipos.append(None)
+        elif nodo[0] == 'var':
+            tipos.append(TIPO_ENTERO if nodo[1] in enteras else TIPO_REAL)
+        elif nodo[0] == 'op' and nodo[1] in INSTRUCCIONES_ENTERAS:
+            hijos = nodo[2:]
+            entero = all(tipos[h] == TIPO_ENTERO or tipos[h] is None and es_literal_entero(dag.nodos[h][1])
+                         for h in hijos)
+            tipos.append(TIPO_ENTERO if entero and TIPO_ENTERO in (tipos[h] for h in hijos) else TIPO_REAL)
+        else:
+            tipos.append(TIPO_REAL)
+    return tipos
+
+
+def tipo_expresion(dag, enteras):
+    """Tipo del valor de la expresión (un literal suelto es entero si su valor lo es); None si está incompleta"""
+    if dag.raiz is None:
+        return None
+    tipo = tipos_dag(dag, enteras)[dag.raiz]
+    if tipo is None:
+        return TIPO_ENTERO if es_literal_entero(dag.nodos[dag.raiz][1]) else TIPO_REAL
+    return tipo
+
+
+def nombres_expresion(expresion):
+    """Nombres de variables de una expresión postfija, sin los marcadores '@k'"""
+    return sorted(nombre for nombre in variables_dag(construir_dag(expresion))
+                  if not nombre.startswith('@'))
+
+
+def nombres_condicion(condicion):
+    """Nombres de variables de una condición postfija 'a b op'"""
+    tokens = condicion.split()
+    if len(tokens) != 3:
+        return []
+    nombres = set()
+    for token in tokens[:2]:
+        try:
+            float(token)
+        except ValueError:
+            nombres.add(token)
+    return sorted(nombres)
+
+
+def ranuras_de(nombres, indices):
+    """Pares (nombre, ranura) de los nombres que tienen ranura asignada"""
+    return tuple((nombre, indices[nombre]) for nombre in nombres if nombre in indices)
+
+
+@functools.lru_cache(maxsize=TAMANO_CACHE_EXPRESIONES)
+def compilar_postfija(expresion, ranuras=(), invariantes=(), enteras=(), destino=None):
+    """Compila una expresión postfija a una función de Python reutilizable.
+
+    La expresión pasa antes por construir_dag, así que las constantes ya
+    vienen plegadas y cada subexpresión repetida se calcula una sola vez.
+    ranuras es una tupla de pares (nombre, ranura) que fija, al compilar,
+    dónde está cada variable. La función recibe las listas 'valores' y
+    'estado' de la tabla de símbolos y devuelve el valor de la expresión.
+
+    Si se dan invariantes, el token '@k' representa la subexpresión
+    invariantes[k]: la función recibe además un diccionario donde guarda
+    esos valores la primera vez que los calcula y los reutiliza después.
+
+    enteras son los nombres de las variables integer (y los '@k' enteros)
+    y destino el tipo de la variable que recibe el valor; ver emitir_postfija.
+    """
+    if invariantes:
+        generador = GeneradorFuente("def _expresion(valores, estado, cache):", ranuras)
+    else:
+        generador = GeneradorFuente("def _expresion(valores, estado):", ranuras)
+    resultado = emitir_postfija(generador, expresion, invariantes, enteras, destino)
+    generador.emitir(f"return {resultado}")
+    return generador.compilar('_expresion', f"<expresion {expresion}>")
+
+
+def emitir_postfija(generador, expresion, invariantes=(), enteras=(), destino=None):
+    """Emite en el generador el cálculo de una expresión postfija y devuelve el código de su valor.
+
+    Las verificaciones de variables se emiten en el mismo orden en que las
+    haría la evaluación token a token, así los errores coinciden.
+
+    Las variables de 'enteras' tienen int de Python y las operaciones
+    enteras (según tipos_dag) usan literales int, así el resultado es
+    exacto. Sólo se convierte donde hace falta: la base entera de ^ y el
+    resultado entero cuando destino es TIPO_REAL. Con destino=None el valor
+    queda con su propio tipo.
+    """
+    dag = construir_dag(expresion)
+    subexpresiones = {f"@{k}": texto for k, texto in enumerate(invariantes)}
+    tipos = tipos_dag(dag, enteras) if enteras or destino == TIPO_ENTERO else None
+    codigos = {}
+
+    def codigo(indice):
+        nodo = dag.nodos[indice]
+        if nodo[0] == 'var' and nodo[1] not in subexpresiones:
+            return generador.valor(nodo)
+        return codigos[indice]
+
+    for evento, indice in dag.eventos:
+        if evento == 'falta':
+            generador.emitir("raise IndexError('pop from empty list')")
+            return "0"
+
+        nodo = dag.nodos[indice]
+        if evento == 'uso':
+            if nodo[0] == 'var' and nodo[1] not in subexpresiones:
+                generador.valor(nodo)
+        elif nodo[0] == 'lit':
+            codigos[indice] = _literal_python(nodo[1])
+        elif nodo[0] == 'var' and nodo[1] in subexpresiones:
+            texto = subexpresiones[nodo[1]]
+            local = codigos[indice] = f"i{len(generador.funciones)}"
+            generador.funciones[f"_{local}"] = compilar_postfija(texto, tuple(generador.ranuras.items()), (),
+                                                                 enteras)
+            generador.emitir(f"{local} = cache.get({texto!r})")
+            generador.emitir(f"if {local} is None:")
+            generador.emitir(f"    {local} = cache[{texto!r}] = _{local}(valores, estado)")
+        elif nodo[0] == 'var':
+            token = nodo[1]
+            generador.simbolo(token, f"Exception({f'Token no reconocido: {token}'!r})")
+        elif nodo[0] == 'op':
+            _, token, a, b = nodo
+            codigo_a, codigo_b = codigo(a), codigo(b)
+            if tipos is not None and tipos[indice] == TIPO_ENTERO:
+                if tipos[a] is None:
+                    codigo_a = _literal_entero(dag.literal(a))
+                if tipos[b] is None:
+                    codigo_b = _literal_entero(dag.literal(b))
+            elif tipos is not None and token == '^' and tipos[a] == TIPO_ENTERO:
+                codigo_a = f"float({codigo_a})"
+            divisor = dag.literal(b)
+            if token == '/' and not divisor:
+                generador.emitir(f"if {codigo_b} == 0:")
+                generador.emitir("    raise Exception('Error: División por cero')")
+            codigos[indice] = generador.temporal()
+            generador.emitir(f"{codigos[indice]} = {codigo_a} {OPERADORES_PYTHON[token]} {codigo_b}")
+        else:
+            codigos[indice] = generador.temporal()
+            generador.emitir(f"{codigos[indice]} = _{nodo[1]}({codigo(nodo[2])})")
+
+    if dag.raiz is None:
+        return "0"
+    if tipos is not None and tipos[dag.raiz] is None and destino == TIPO_ENTERO:
+        return _literal_entero(dag.literal(dag.raiz))
+    if tipos is not None and tipos[dag.raiz] == TIPO_ENTERO and destino == TIPO_REAL:
+        return f"float({codigo(dag.raiz)})"
+    return codigo(dag.raiz)
+
+
+@functools.lru_cache(maxsize=TAMANO_CACHE_EXPRESIONES)
+def compilar_condicion(condicion, ranuras=()):
+    """Compila una condición postfija 'a b op' a una función de Python reutilizable"""
+    generador = GeneradorFuente("def _condicion(valores, estado):", ranuras)
+    generador.emitir(f"return {emitir_condicion(generador, condicion)}")
+    return generador.compilar('_condicion', f"<condicion {condicion}>")
+
+
+def emitir_condicion(generador, condicion):
+    """Emite en el generador las verificaciones de una condición y devuelve el código de su valor"""
+    tokens = condicion.split()
+    if len(tokens) != 3:
+        return "False"
+
+    operandos = []
+    for token in tokens[:2]:
+        try:
+            operandos.append(_literal_python(float(token)))
+        except ValueError:
+            error = f"could not convert string to float: {token!r}"
+            generador.simbolo(token, f"ValueError({error!r})")
+            operandos.append(generador.valor(('var', token)))
+
+    op = tokens[2]
+    if op in COMPARACIONES_PYTHON:
+        return f"{operandos[0]} {op} {operandos[1]}"
+    return "False"
+
+
+# Mayor entero hasta el que un float representa exactamente todos los enteros
+LIMITE_ENTERO_EXACTO = 2 ** 53
+
+
+def _evaluar_entero(dag, valores, cota=False):
+    """Evalúa con enteros de Python una expresión de +, - y * sobre enteros.
+
+    Con cota=True usa valores absolutos y cambia la resta por una suma: el
+    resultado acota el valor absoluto de todos los pasos intermedios.
+    """
+    resultados = []
+    for nodo in dag.nodos:
+        if nodo[0] == 'lit':
+            valor = int(nodo[1])
+            resultados.append(abs(valor) if cota else valor)
+        elif nodo[0] == 'var':
+            resultados.append(valores[nodo[1]])
+        else:
+            a, b = resultados[nodo[2]], resultados[nodo[3]]
+            if nodo[1] == '*':
+                resultados.append(a * b)
+            elif nodo[1] == '+' or cota:
+                resultados.append(a + b)
+            else:
+                resultados.append(a - b)
+    return resultados[dag.raiz]
+
+
+def _grado_entero(dag, variable):
+    """Grado de la expresión en 'variable' si sólo usa +, -, * y literales enteros; None si no"""
+    grados = []
+    for nodo in dag.nodos:
+        if nodo[0] == 'lit':
+            if not (math.isfinite(nodo[1]) and nodo[1].is_integer()):
+                return None
+            grados.append(0)
+        elif nodo[0] == 'var':
+            grados.append(1 if nodo[1] == variable else 0)
+        elif nodo[0] == 'op' and nodo[1] in ('+', '-', '*'):
+            a, b = grados[nodo[2]], grados[nodo[3]]
+            grados.append(a + b if nodo[1] == '*' else max(a, b))
+        else:
+            return None
+    return grados[dag.raiz]
+
+
+class FormaCerrada:
+    """Resultado de un ciclo for cuyo cuerpo sólo contiene reducciones reconocidas.
+
+    reducciones es una tupla de (tipo, ranura, dato, ranuras, tipos):
+      ('literal', v, valor, (), t)  v := valor
+      ('valor', v, expr, r, t)      v := expr, con expr invariante en el ciclo
+      ('suma', s, expr, r, t)       s := s expr +, con expr afín en la variable del for
+      ('resta', s, expr, r, t)      s := s expr -
+      ('producto', p, expr, r, t)   p := p expr *, con expr invariante
+    donde la ranura es la de la variable asignada, r son las ranuras de expr
+    y t es el par (enteras, destino) con que se compiló la asignación.
+    """
+    __slots__ = ('reducciones',)
+
+    def __init__(self, reducciones):
+        self.reducciones = reducciones
+
+    def __getstate__(self):
+        return self.reducciones
+
+    def __setstate__(self, estado):
+        self.reducciones = estado
+
+    def calcular(self, valores, estado, var, ranura_var, inicio, fin):
+        """Valores finales (ranura, valor) tras el ciclo, o None si no se puede garantizar
+        que coincidan exactamente con los de ejecutarlo iteración por iteración"""
+        if not isinstance(fin, (int, float)) or not math.isfinite(fin) or fin < inicio:
+            return None
+        primero = int(inicio)
+        vueltas = math.floor(fin) - primero + 1
+        ultimo = primero + vueltas - 1
+        if max(abs(primero), abs(ultimo + 1)) >= LIMITE_ENTERO_EXACTO:
+            return None
+
+        def entero(ranura):
+            valor = valores[ranura]
+            if estado[ranura] == CON_VALOR and isinstance(valor, int):
+                return valor
+            if estado[ranura] == CON_VALOR and isinstance(valor, float) \
+                    and math.isfinite(valor) and valor.is_integer():
+                return int(valor)
+            return None
+
+        resultado = []
+        for tipo, ranura, dato, ranuras, (enteras, destino) in self.reducciones:
+            if not estado[ranura]:
+                return None
+            if tipo == 'literal':
+                resultado.append((ranura, dato))
+                continue
+            if tipo == 'valor':
+                try:
+                    evaluador = compilar_postfija(dato, ranuras, (), enteras, destino)
+                    resultado.append((ranura, evaluador(valores, estado)))
+                except Exception:
+                    return None
+                continue
+
+            dag = construir_dag(dato)
+            actual = valores[ranura]
+            operandos = {nombre: entero(r) for nombre, r in ranuras if nombre != var}
+            acumulado = entero(ranura)
+            # -0.0 no se conserva al pasar por enteros
+            if acumulado is None or None in operandos.values() \
+                    or actual == 0 and math.copysign(1.0, actual) < 0:
+                return None
+            # Un acumulador integer es exacto con cualquier tamaño; uno real, sólo hasta 2**53
+            exacto = destino == TIPO_ENTERO
+            cotas = {nombre: abs(valor) for nombre, valor in operandos.items()}
+            cotas[var] = max(abs(primero), abs(ultimo))
+            cota = _evaluar_entero(dag, cotas, cota=True)
+            if cota >= LIMITE_ENTERO_EXACTO and not exacto:
+                return None
+
+            if tipo == 'producto':
+                factor = _evaluar_entero(dag, operandos)
+                if acumulado == 0 or factor == 0:
+                    return None
+                if abs(factor) > 1 and abs(acumulado).bit_length() + vueltas * (abs(factor).bit_length() - 1) > 53:
+                    return None
+                final = acumulado * factor ** vueltas
+            else:
+                if abs(acumulado) + vueltas * cota >= LIMITE_ENTERO_EXACTO and not exacto:
+                    return None
+                operandos[var] = primero
+                termino = _evaluar_entero(dag, operandos)
+                operandos[var] = primero + 1
+                paso = _evaluar_entero(dag, operandos) - termino
+                total = vueltas * termino + paso * vueltas * (vueltas - 1) // 2
+                final = acumulado + total if tipo == 'suma' else acumulado - total
+
+            if exacto:
+                resultado.append((ranura, final))
+            elif abs(final) < LIMITE_ENTERO_EXACTO:
+                resultado.append((ranura, float(final)))
+            else:
+                return None
+
+        final = primero + vueltas
+        resultado.append((ranura_var, final if isinstance(inicio, int) else float(final)))
+        return resultado
+
+
+def analizar_forma_cerrada(var, inicio, cuerpo, indices):
+    """FormaCerrada de un for con las instrucciones 'cuerpo', o None si alguna no es una reducción"""
+    if not float(inicio).is_integer():
+        return None
+    escritas = {var}
+    for instr in cuerpo:
+        if instr.opcode in (OP_ASIGNAR, OP_ASIGNAR_LITERAL):
+            if instr.operandos[0] in escritas:
+                return None
+            escritas.add(instr.operandos[0])
+        elif instr.opcode != OP_NOP:
+            return None
+
+    reducciones = []
+    for instr in cuerpo:
+        if instr.opcode == OP_ASIGNAR_LITERAL:
+            _, valor, ranura = instr.operandos
+            reducciones.append(('literal', ranura, valor, (), ((), None)))
+            continue
+        if instr.opcode != OP_ASIGNAR:
+            continue
+
+        nombre, expresion, ranura, _, tipos = instr.operandos[:5]
+        dag = construir_dag(expresion)
+        if not dag.completa:
+            return None
+        if not variables_dag(dag) & escritas:
+            reducciones.append(('valor', ranura, expresion, ranuras_de(nombres_expresion(expresion), indices),
+                                tipos))
+            continue
+
+        raiz = dag.nodos[dag.raiz]
+        if raiz[0] != 'op' or raiz[1] not in ('+', '-', '*'):
+            return None
+        acumulador = ('var', nombre)
+        if dag.nodos[raiz[2]] == acumulador:
+            otro = raiz[3]
+        elif raiz[1] != '-' and dag.nodos[raiz[3]] == acumulador:
+            otro = raiz[2]
+        else:
+            return None
+
+        texto = texto_postfijo(dag, otro)
+        termino = construir_dag(texto)
+        if variables_dag(termino) & escritas - {var}:
+            return None
+        grado = _grado_entero(termino, var)
+        if grado is None or grado > 1 or raiz[1] == '*' and grado > 0:
+            return None
+        tipo = {'+': 'suma', '-': 'resta', '*': 'producto'}[raiz[1]]
+        reducciones.append((tipo, ranura, texto, ranuras_de(nombres_expresion(texto), indices), tipos))
+
+    return FormaCerrada(tuple(reducciones))
+
+
+class Instruccion:
+    """Instrucción decodificada una sola vez a partir de una línea del programa"""
+    __slots__ = ('opcode', 'operandos', 'numero_linea', 'salto')
+
+    def __init__(self, opcode, operandos, numero_linea, salto=None):
+        self.opcode = opcode
+        self.operandos = operandos
+        self.numero_linea = numero_linea
+        self.salto = salto
+
+    def __getstate__(self):
+        # Los evaluadores generados no se serializan: se recompilan al cargar
+        operandos = self.operandos
+        if self.opcode in OPCODES_CON_EVALUADOR:
+            operandos = operandos[:-1]
+        return (self.opcode, operandos, self.numero_linea, self.salto)
+
+    def __setstate__(self, estado):
+        opcode, operandos, self.numero_linea, self.salto = estado
+        if opcode == OP_ASIGNAR:
+            operandos = operandos + (compilar_postfija(operandos[1], operandos[3], (), *operandos[4]),)
+        elif opcode == OP_ASIGNAR_INVARIANTE:
+            operandos = operandos + (compilar_postfija(operandos[4], operandos[6], operandos[5], *operandos[7]),)
+        elif opcode in OPCODES_CON_EVALUADOR:
+            operandos = operandos + (compilar_condicion(operandos[0], operandos[1]),)
+        self.opcode = opcode
+        self.operandos = operandos
+
+
+class Simbolo:
+    """Datos de una variable declarada; su valor vive en la lista de valores del intérprete"""
+    __slots__ = ('nombre', 'tipo', 'registro')
+
+    def __init__(self, nombre, tipo, registro='-'):
+        self.nombre = nombre
+        self.tipo = tipo
+        self.registro = registro
+
+
+class ProgramaCompilado:
+    """Forma compilada y serializable de un programa: líneas, instrucciones y bloques.
+
+    indices asocia cada nombre de variable con la ranura que usan las
+    instrucciones compiladas.
+    """
+
+    def __init__(self, lineas, instrucciones, tabla_bloques, ensamblador=None, indices=None):
+        self.lineas = lineas
+        self.instrucciones = instrucciones
+        self.tabla_bloques = tabla_bloques
+        self.ensamblador = ensamblador
+        self.indices = indices if indices is not None else {}
+
+
+class Presupuesto:
+    """Límites de una ejecución; None deja el recurso sin límite.
+
+    sentencias: instrucciones ejecutadas; iteraciones: veces que se entra al
+    cuerpo de un ciclo (un for en forma cerrada no lo recorre); tiempo:
+    segundos de reloj; ensamblador: instrucciones generadas antes de
+    asignar registros.
+    """
+    __slots__ = ('sentencias', 'iteraciones', 'tiempo', 'ensamblador')
+
+    def __init__(self, sentencias=None, iteraciones=None, tiempo=None, ensamblador=None):
+        self.sentencias = sentencias
+        self.iteraciones = iteraciones
+        self.tiempo = tiempo
+        self.ensamblador = ensamblador
+
+
+class PresupuestoExcedido(Exception):
+    """La ejecución agotó uno de los límites de su Presupuesto"""
+
+    DESCRIPCIONES = {
+        'sentencias': "sentencias ejecutadas",
+        'iteraciones': "iteraciones de ciclos",
+        'ensamblador': "instrucciones de ensamblador",
+    }
+
+    def __init__(self, recurso, limite, linea=None):
+        self.recurso = recurso
+        self.limite = limite
+        self.linea = linea
+        super().__init__(self.mensaje())
+
+    def mensaje(self):
+        return f"Presupuesto excedido: más de {self.limite} {self.DESCRIPCIONES[self.recurso]}"
+
+
+class TiempoLimiteExcedido(PresupuestoExcedido):
+    """La ejecución superó el tiempo límite asignado"""
+
+    def __init__(self, limite, linea=None):
+        super().__init__('tiempo', limite, linea)
+
+    def mensaje(self):
+        return f"Tiempo límite excedido ({self.limite} s)"
+
+
+# Registro entero donde las comparaciones dejan su resultado para beqz
+REGISTRO_COMPARACION = "t0"
+
+# Registro base del marco donde viven las variables al generar por fragmentos
+REGISTRO_MARCO = "s0"
+
+# Instrucciones de nivel superior que se generan juntas al escribir en un sumidero
+TAMANO_FRAGMENTO = 256
+
+# Registros de punto flotante disponibles; compartidos entre intérpretes
+REGISTROS_FLOAT = tuple(f"ft{i}" for i in range(32))
+
+# Registros enteros para las variables integer: t0 queda para las
+# comparaciones, s0 para el marco y a0/a1 para las llamadas
+REGISTROS_ENTEROS = tuple(f"s{i}" for i in range(1, 12)) + tuple(f"t{i}" for i in range(1, 7))
+
+# Prefijo de los registros virtuales enteros (%$nombre, %$.n)
+PREFIJO_ENTERO = '%$'
+
+# Inmediatos que entran en un addi (12 bits con signo)
+LIMITE_INMEDIATO = 2048
+
+# Instrucciones ejecutadas entre dos consultas del reloj cuando hay tiempo límite
+CONSULTAR_RELOJ_CADA = 4096
+
+# Instrucciones que ejecuta una sesión asíncrona antes de ceder el ciclo de eventos
+CEDER_CADA = 1000
+
+# Bytes que ocupa cada valor derramado a la pila
+TAMANO_PALABRA = 4
+
+# Instrucciones cuyo primer operando es el registro destino
+INSTRUCCIONES_CON_DESTINO = {
+    'li.s', 'fmv.s', 'flw', 'fadd.s', 'fsub.s', 'fmul.s', 'fdiv.s',
+    'flt.s', 'fgt.s', 'fle.s', 'fge.s', 'feq.s', 'fne.s',
+    'li', 'mv', 'lw', 'add', 'sub', 'mul', 'addi', 'fcvt.s.w',
+}
+
+# Instrucciones de salto: (posición del operando etiqueta, ¿puede seguir de largo?)
+INSTRUCCIONES_SALTO = {
+    'j': (0, False),
+    'beqz': (1, True),
+    'blt': (2, True),
+    'bge': (2, True),
+    'beq': (2, True),
+    'bne': (2, True),
+}
+
+
+# Pseudo mnemónicos de las líneas que no son instrucciones
+ETIQUETA = ':'
+COMENTARIO = '#'
+
+
+class LineaEnsamblador:
+    """Una línea de ensamblador como (mnemónico, operandos); el texto se arma sólo al pedirlo.
+
+    Las etiquetas y los comentarios usan los mnemónicos ETIQUETA y
+    COMENTARIO. Los operandos pueden ser registros, etiquetas o números
+    (por ejemplo el valor de un li.s), que se formatean al convertir a texto.
+    """
+    __slots__ = ('mnemonico', 'operandos')
+
+    def __init__(self, mnemonico, *operandos):
+        self.mnemonico = mnemonico
+        self.operandos = operandos
+
+    @classmethod
+    def desde_texto(cls, texto):
+        """Reconstruye el registro a partir de una línea de texto"""
+        texto = texto.strip()
+        if texto.startswith('#'):
+            return cls(COMENTARIO, texto[1:].strip())
+        if texto.endswith(':'):
+            return cls(ETIQUETA, texto[:-1])
+        mnemonico, _, resto = texto.partition(' ')
+        return cls(mnemonico, *(operando.strip() for operando in resto.split(','))) if resto else cls(mnemonico)
+
+    def __str__(self):
+        if self.mnemonico == ETIQUETA:
+            return f"{self.operandos[0]}:"
+        if self.mnemonico == COMENTARIO:
+            return "# " + " ".join(map(str, self.operandos))
+        if not self.operandos:
+            return self.mnemonico
+        return f"{self.mnemonico} {', '.join(map(str, self.operandos))}"
+
+    def __repr__(self):
+        return f"LineaEnsamblador({str(self)!r})"
+
+    def __eq__(self, otra):
+        return (isinstance(otra, LineaEnsamblador) and self.mnemonico == otra.mnemonico
+                and self.operandos == otra.operandos)
+
+    def __hash__(self):
+        return hash((self.mnemonico, self.operandos))
+
+
+def asm(mnemonico, *operandos):
+    return LineaEnsamblador(mnemonico, *operandos)
+
+
+def etiqueta(nombre):
+    return LineaEnsamblador(ETIQUETA, nombre)
+
+
+def comentario(*partes):
+    return LineaEnsamblador(COMENTARIO, *partes)
+
+
+def es_etiqueta(linea):
+    return linea.mnemonico == ETIQUETA
+
+
+def descomponer_instruccion(linea):
+    """(mnemónico, operandos) de una línea de ensamblador; None si es etiqueta o comentario"""
+    if linea.mnemonico == ETIQUETA or linea.mnemonico == COMENTARIO:
+        return None
+    return linea.mnemonico, linea.operandos
+
+
+def es_virtual(operando):
+    return isinstance(operando, str) and operando.startswith('%')
+
+
+def es_entero(operando):
+    """Indica si el operando es un registro virtual entero"""
+    return isinstance(operando, str) and operando.startswith(PREFIJO_ENTERO)
+
+
+def definiciones_y_usos(mnemonico, operandos):
+    """Registros virtuales que la instrucción escribe y los que lee"""
+    virtuales = [operando if es_virtual(operando) else None for operando in operandos]
+    if mnemonico in INSTRUCCIONES_CON_DESTINO and virtuales:
+        return [v for v in virtuales[:1] if v], [v for v in virtuales[1:] if v]
+    return [], [v for v in virtuales if v]
+
+
+class AsignadorRegistros:
+    """Asignación de registros por barrido lineal (linear scan) sobre el código generado.
+
+    Calcula la vida de cada registro virtual con un análisis de vitalidad
+    sobre el grafo de flujo (etiquetas, j y beqz), asigna registros físicos
+    reutilizándolos cuando los intervalos no se solapan y, si no alcanzan,
+    derrama a la pila los intervalos que terminan más tarde. Los registros
+    virtuales enteros (%$...) se asignan aparte, sobre 'enteros'.
+    """
+
+    def __init__(self, registros, enteros=REGISTROS_ENTEROS):
+        # Los dos últimos registros de cada banco quedan reservados para cargar valores derramados
+        self.registros = list(registros[:-2])
+        self.auxiliares = list(registros[-2:])
+        self.registros_enteros = list(enteros[:-2])
+        self.auxiliares_enteros = list(enteros[-2:])
+
+    def asignar(self, codigo):
+        """Devuelve (código con registros físicos, ubicación de cada registro virtual)"""
+        instrucciones = [descomponer_instruccion(linea) for linea in codigo]
+        intervalos = self.calcular_intervalos(codigo, instrucciones)
+        ubicaciones, derrames = self.barrido_lineal(intervalos)
+        return self.reescribir(codigo, instrucciones, ubicaciones, derrames), ubicaciones
+
+    def vivos_al_entrar(self, codigo):
+        """Registros virtuales que el código lee antes de escribirlos en algún camino"""
+        if not codigo:
+            return set()
+        instrucciones = [descomponer_instruccion(linea) for linea in codigo]
+        _, vivos_entrada, _ = self.vitalidad(codigo, instrucciones)
+        return vivos_entrada[0]
+
+    def vitalidad(self, codigo, instrucciones):
+        """Bloques básicos y registros vivos a la entrada y a la salida de cada uno"""
+        total = len(codigo)
+        etiquetas = {linea.operandos[0]: i for i, linea in enumerate(codigo) if es_etiqueta(linea)}
+
+        # Bloques básicos: empiezan en etiquetas y después de cada salto
+        lideres = {0}
+        for i, linea in enumerate(codigo):
+            if es_etiqueta(linea):
+                lideres.add(i)
+            elif instrucciones[i] and instrucciones[i][0] in INSTRUCCIONES_SALTO:
+                lideres.add(i + 1)
+        inicios = sorted(l for l in lideres if l < total)
+        bloque_de = {}
+        bloques = []
+        for n, inicio in enumerate(inicios):
+            fin = inicios[n + 1] if n + 1 < len(inicios) else total
+            bloques.append((inicio, fin))
+            bloque_de[inicio] = n
+
+        sucesores = []
+        usos = []
+        definiciones = []
+        for n, (inicio, fin) in enumerate(bloques):
+            siguientes = []
+            ultima = instrucciones[fin - 1]
+            sigue_de_largo = True
+            if ultima and ultima[0] in INSTRUCCIONES_SALTO:
+                posicion, sigue_de_largo = INSTRUCCIONES_SALTO[ultima[0]]
+                destino = etiquetas.get(ultima[1][posicion])
+                if destino is not None:
+                    siguientes.append(bloque_de[destino])
+            if sigue_de_largo and n + 1 < len(bloques):
+                siguientes.append(n + 1)
+            sucesores.append(siguientes)
+
+            uso, definicion = set(), set()
+            for i in range(inicio, fin):
+                if instrucciones[i]:
+                    escritos, leidos = definiciones_y_usos(*instrucciones[i])
+                    uso.update(v for v in leidos if v not in definicion)
+                    definicion.update(escritos)
+            usos.append(uso)
+            definiciones.append(definicion)
+
+        vivos_entrada = [set() for _ in bloques]
+        vivos_salida = [set() for _ in bloques]
+        cambio = True
+        while cambio:
+            cambio = False
+            for n in reversed(range(len(bloques))):
+                salida = set()
+                for s in sucesores[n]:
+                    salida |= vivos_entrada[s]
+                entrada = usos[n] | (salida - definiciones[n])
+                if salida != vivos_salida[n] or entrada != vivos_entrada[n]:
+                    vivos_salida[n], vivos_entrada[n] = salida, entrada
+                    cambio = True
+        return bloques, vivos_entrada, vivos_salida
+
+    def calcular_intervalos(self, codigo, instrucciones):
+        """Intervalo [primera, última] posición en que vive cada registro virtual"""
+        bloques, _, vivos_salida = self.vitalidad(codigo, instrucciones)
+        intervalos = {}
+
+        def extender(virtual, posicion):
+            if virtual in intervalos:
+                inicio, fin = intervalos[virtual]
+                intervalos[virtual] = (min(inicio, posicion), max(fin, posicion))
+            else:
+                intervalos[virtual] = (posicion, posicion)
+
+        for n, (inicio, fin) in enumerate(bloques):
+            vivos = set(vivos_salida[n])
+            for virtual in vivos:
+                extender(virtual, fin - 1)
+            for i in reversed(range(inicio, fin)):
+                if instrucciones[i]:
+                    escritos, leidos = definiciones_y_usos(*instrucciones[i])
+                    for virtual in escritos:
+                        extender(virtual, i)
+                        vivos.discard(virtual)
+                    for virtual in leidos:
+                        extender(virtual, i)
+                        vivos.add(virtual)
+                for virtual in vivos:
+                    extender(virtual, i)
+
+        return intervalos
+
+    def barrido_lineal(self, intervalos):
+        """Asigna registros físicos a los intervalos; los que no caben van a la pila"""
+        ubicaciones = {}
+        derrames = {}
+        bancos = {False: ([], list(self.registros), self.registros),
+                  True: ([], list(self.registros_enteros), self.registros_enteros)}
+
+        for virtual, (inicio, fin) in sorted(intervalos.items(), key=lambda par: (par[1][0], par[0])):
+            activos, libres, registros = bancos[es_entero(virtual)]
+            for activo in [a for a in activos if intervalos[a][1] < inicio]:
+                activos.remove(activo)
+                libres.append(ubicaciones[activo])
+
+            if libres:
+                libres.sort(key=registros.index)
+                ubicaciones[virtual] = libres.pop(0)
+                activos.append(virtual)
+                continue
+
+            # Sin registros libres: se derrama el intervalo que termina más tarde
+            ultimo = max(activos, key=lambda a: intervalos[a][1]) if activos else None
+            if ultimo is not None and intervalos[ultimo][1] > fin:
+                ubicaciones[virtual] = ubicaciones[ultimo]
+                activos.remove(ultimo)
+                activos.append(virtual)
+                victima = ultimo
+            else:
+                victima = virtual
+            desplazamiento = len(derrames) * TAMANO_PALABRA
+            derrames[victima] = desplazamiento
+            ubicaciones[victima] = f"{desplazamiento}(sp)"
+
+        return ubicaciones, derrames
+
+    def reescribir(self, codigo, instrucciones, ubicaciones, derrames):
+        """Sustituye los registros virtuales y agrega las cargas/guardados de los derramados"""
+        resultado = []
+        for linea, descompuesta in zip(codigo, instrucciones):
+            if descompuesta is None:
+                resultado.append(linea)
+                continue
+
+            mnemonico, operandos = descompuesta
+            escritos, leidos = definiciones_y_usos(mnemonico, operandos)
+            auxiliar_de = {}
+            for virtual in leidos:
+                if virtual in derrames and virtual not in auxiliar_de:
+                    entero = es_entero(virtual)
+                    usados = sum(1 for otro in auxiliar_de if es_entero(otro) == entero)
+                    auxiliar_de[virtual] = (self.auxiliares_enteros if entero else self.auxiliares)[usados]
+                    resultado.append(asm('lw' if entero else 'flw', auxiliar_de[virtual],
+                                         f"{derrames[virtual]}(sp)"))
+            for virtual in escritos:
+                if virtual in derrames and virtual not in auxiliar_de:
+                    auxiliar_de[virtual] = (self.auxiliares_enteros if es_entero(virtual) else self.auxiliares)[0]
+
+            fisicos = [auxiliar_de.get(op, ubicaciones.get(op, op)) if es_virtual(op) else op
+                       for op in operandos]
+            # Un fmv.s o mv que queda entre el mismo registro sobra, pero si el
+            # destino está derramado igual hay que guardarlo
+            if mnemonico in ('fmv.s', 'mv') and fisicos[0] == fisicos[1]:
+                pass
+            elif fisicos == list(operandos):
+                resultado.append(linea)
+            else:
+                resultado.append(asm(mnemonico, *fisicos))
+
+            for virtual in escritos:
+                if virtual in derrames:
+                    resultado.append(asm('sw' if es_entero(virtual) else 'fsw', auxiliar_de[virtual],
+                                         f"{derrames[virtual]}(sp)"))
+
+        if derrames:
+            marco = -(-len(derrames) * TAMANO_PALABRA // 16) * 16
+            resultado.insert(0, asm('addi', 'sp', 'sp', -marco))
+            resultado.append(asm('addi', 'sp', 'sp', marco))
+        return resultado
+
+
+# Instrucciones sin efectos secundarios que se pueden sacar de un ciclo
+INSTRUCCIONES_INVARIANTES = {'li.s', 'fadd.s', 'fsub.s', 'fmul.s', 'fdiv.s', 'li', 'add', 'sub', 'mul', 'addi',
+                              'fcvt.s.w'}
+
+
+def es_temporal(operando):
+    return isinstance(operando, str) and operando.startswith(('%.', PREFIJO_ENTERO + '.'))
+
+
+def contar_instrucciones(codigo):
+    """Cantidad de instrucciones reales (sin etiquetas ni comentarios)"""
+    return sum(1 for linea in codigo if descomponer_instruccion(linea) is not None)
+
+
+class OptimizadorMirilla:
+    """Optimizaciones de mirilla (peephole) sobre el código con registros virtuales.
+
+    - Escribe los resultados directamente en el destino en lugar de pasar
+      por un temporal y un fmv.s (o mv).
+    - Saca de los ciclos las cargas de constantes (li.s, li) y los cálculos
+      aritméticos cuyos operandos el ciclo no modifica.
+    - Elimina cargas y copias redundantes dentro de cada bloque básico,
+      reutilizando un mismo temporal para la misma constante.
+    - Elimina los movimientos a temporales que nunca se leen.
+    """
+
+    def optimizar(self, codigo):
+        """Aplica las pasadas hasta que el código deja de cambiar"""
+        codigo = list(codigo)
+        while True:
+            anterior = codigo
+            codigo = self.escribir_en_destino(codigo)
+            codigo = self.sacar_invariantes_de_ciclos(codigo)
+            codigo = self.eliminar_redundancias(codigo)
+            codigo = self.eliminar_temporales_muertos(codigo)
+            if codigo == anterior:
+                return codigo
+
+    def contar_usos(self, codigo):
+        usos = {}
+        for linea in codigo:
+            instruccion = descomponer_instruccion(linea)
+            if instruccion:
+                for virtual in definiciones_y_usos(*instruccion)[1]:
+                    usos[virtual] = usos.get(virtual, 0) + 1
+        return usos
+
+    def escribir_en_destino(self, codigo):
+        """'op %.t, a, b' seguido de 'fmv.s d, %.t' (o mv) pasa a ser 'op d, a, b'"""
+        usos = self.contar_usos(codigo)
+        resultado = []
+        for linea in codigo:
+            actual = descomponer_instruccion(linea)
+            if (actual and actual[0] in ('fmv.s', 'mv') and resultado
+                    and es_temporal(actual[1][1]) and usos.get(actual[1][1]) == 1):
+                anterior = descomponer_instruccion(resultado[-1])
+                if (anterior and anterior[0] in INSTRUCCIONES_CON_DESTINO
+                        and anterior[1][0] == actual[1][1]):
+                    resultado[-1] = asm(anterior[0], actual[1][0], *anterior[1][1:])
+                    continue
+            resultado.append(linea)
+        return resultado
+
+    def sacar_invariantes_de_ciclos(self, codigo):
+        """Mueve las definiciones invariantes de temporales de cada ciclo antes de su etiqueta de inicio.
+
+        Sólo se mueven cargas de constantes, conversiones y operaciones
+        aritméticas, que no tienen efectos secundarios, hacia temporales que
+        se definen una sola vez.
+        """
+        definiciones = {}
+        for linea in codigo:
+            instruccion = descomponer_instruccion(linea)
+            if instruccion:
+                for virtual in definiciones_y_usos(*instruccion)[0]:
+                    definiciones[virtual] = definiciones.get(virtual, 0) + 1
+
+        etiquetas = {linea.operandos[0]: i for i, linea in enumerate(codigo) if es_etiqueta(linea)}
+        # Ciclos como (inicio, fin): una etiqueta y el salto hacia atrás que vuelve a ella
+        ciclos = []
+        for i, linea in enumerate(codigo):
+            instruccion = descomponer_instruccion(linea)
+            if instruccion and instruccion[0] == 'j':
+                inicio = etiquetas.get(instruccion[1][0])
+                if inicio is not None and inicio < i:
+                    ciclos.append((inicio, i))
+
+        # Primero los ciclos internos: las instrucciones salen un nivel por vuelta de optimizar()
+        ciclos.sort(key=lambda ciclo: ciclo[1] - ciclo[0])
+        movidas = set()
+        destino = {}
+        for inicio, fin in ciclos:
+            escritos = set()
+            for i in range(inicio + 1, fin):
+                instruccion = descomponer_instruccion(codigo[i])
+                if instruccion:
+                    escritos.update(definiciones_y_usos(*instruccion)[0])
+
+            for i in range(inicio + 1, fin):
+                if i in movidas:
+                    continue
+                instruccion = descomponer_instruccion(codigo[i])
+                if not instruccion or instruccion[0] not in INSTRUCCIONES_INVARIANTES:
+                    continue
+                destino_instr, fuentes = instruccion[1][0], instruccion[1][1:]
+                if instruccion[0] in ('li.s', 'li'):
+                    fuentes = []
+                elif instruccion[0] == 'addi':
+                    fuentes = fuentes[:1]
+                if (es_temporal(destino_instr) and definiciones.get(destino_instr) == 1
+                        and all(es_virtual(f) and f not in escritos for f in fuentes)):
+                    movidas.add(i)
+                    destino.setdefault(inicio, []).append(codigo[i])
+
+        if not movidas:
+            return codigo
+        resultado = []
+        for i, linea in enumerate(codigo):
+            if i in destino:
+                resultado.extend(destino[i])
+            if i not in movidas:
+                resultado.append(linea)
+        return resultado
+
+    def eliminar_redundancias(self, codigo):
+        """Quita cargas y copias de valores que el registro ya tiene (por bloque básico)"""
+        contenido = {}
+        renombres = {}
+        resultado = []
+
+        def invalidar(registro):
+            contenido.pop(registro, None)
+            for otro in [r for r, valor in contenido.items() if valor == ('registro', registro)]:
+                del contenido[otro]
+
+        for linea in codigo:
+            descompuesta = descomponer_instruccion(linea)
+            if descompuesta is None:
+                if es_etiqueta(linea):
+                    contenido.clear()
+                resultado.append(linea)
+                continue
+
+            mnemonico, operandos = descompuesta
+            renombrados = [renombres.get(op, op) for op in operandos]
+            if renombrados != list(operandos):
+                linea = asm(mnemonico, *renombrados)
+            operandos = renombrados
+
+            if mnemonico in ('li.s', 'li'):
+                destino, valor = operandos
+                # Las constantes se comparan por su texto (0.0 y -0.0 no son la misma carga)
+                constante = ('constante', mnemonico, str(valor))
+                if contenido.get(destino) == constante:
+                    continue
+                if es_temporal(destino):
+                    igual = next((r for r, v in contenido.items()
+                                  if v == constante and es_temporal(r)), None)
+                    if igual is not None:
+                        renombres[destino] = igual
+                        continue
+                invalidar(destino)
+                contenido[destino] = constante
+
+            elif mnemonico in ('fmv.s', 'mv'):
+                destino, fuente = operandos
+                if destino == fuente or contenido.get(destino) == ('registro', fuente) \
+                        or contenido.get(fuente) == ('registro', destino):
+                    continue
+                if fuente in contenido and contenido[fuente][0] == 'constante' \
+                        and contenido.get(destino) == contenido[fuente]:
+                    continue
+                invalidar(destino)
+                contenido[destino] = contenido.get(fuente, ('registro', fuente))
+
+            elif mnemonico == 'call':
+                for registro in ('fa0', 'fa1', 'a0'):
+                    invalidar(registro)
+
+            elif mnemonico in INSTRUCCIONES_CON_DESTINO:
+                invalidar(operandos[0])
+
+            resultado.append(linea)
+            if mnemonico in INSTRUCCIONES_SALTO:
+                contenido.clear()
+        return resultado
+
+    def eliminar_temporales_muertos(self, codigo):
+        """Quita las definiciones de temporales que nunca se leen"""
+        usos = self.contar_usos(codigo)
+        resultado = []
+        for linea in codigo:
+            instruccion = descomponer_instruccion(linea)
+            if instruccion and instruccion[0] in ('li.s', 'fmv.s', 'li', 'mv') and es_temporal(instruccion[1][0]) \
+                    and instruccion[1][0] not in usos:
+                continue
+            resultado.append(linea)
+        return resultado
+
+
+class ResultadoEjecucion:
+    """Resultado estructurado de una ejecución sin terminal"""
+
+    def __init__(self, salida, variables, ensamblador, errores):
+        self.salida = salida
+        self.variables = variables
+        self.ensamblador = ensamblador
+        self.errores = errores
+
+    @property
+    def ensamblador(self):
+        """Código ensamblador como lista de textos, que se arma la primera vez que se pide"""
+        if self._texto_ensamblador is None and self._lineas_ensamblador is not None:
+            self._texto_ensamblador = [str(linea) for linea in self._lineas_ensamblador]
+        return self._texto_ensamblador
+
+    @ensamblador.setter
+    def ensamblador(self, lineas):
+        self._lineas_ensamblador = lineas
+        self._texto_ensamblador = None
+
+    @property
+    def exito(self):
+        return not self.errores
+
+
+class Diagnostico:
+    """Un problema encontrado por la validación estática, con su número de línea"""
+    __slots__ = ('linea', 'mensaje')
+
+    def __init__(self, linea, mensaje):
+        self.linea = linea
+        self.mensaje = mensaje
+
+    def __str__(self):
+        return f"línea {self.linea}: {self.mensaje}"
+
+    def __repr__(self):
+        return f"Diagnostico({self.linea}, {self.mensaje!r})"
+
+
+def crear_lector(entradas):
+    """Convierte un iterador, un buffer o una función en una función de lectura"""
+    if entradas is None or callable(entradas):
+        return entradas
+
+    if hasattr(entradas, 'readline'):
+        def leer(mensaje=''):
+            linea = entradas.readline()
+            if not linea:
+                raise Exception("No hay más valores de entrada")
+            return linea
+        return leer
+
+    valores = iter(entradas)
+
+    def leer(mensaje=''):
+        try:
+            return next(valores)
+        except StopIteration:
+            raise Exception("No hay más valores de entrada")
+    return leer
+
+
+def crear_lector_asincrono(entradas):
+    """Convierte una función asíncrona, un StreamReader o cualquier entrada de crear_lector en una lectura asíncrona"""
+    if inspect.iscoroutinefunction(entradas):
+        return entradas
+
+    if isinstance(entradas, asyncio.StreamReader):
+        async def leer(mensaje=''):
+            linea = await entradas.readline()
+            if not linea:
+                raise Exception("No hay más valores de entrada")
+            return linea.decode('utf-8')
+        return leer
+
+    lector = crear_lector(entradas) or input
+
+    async def leer(mensaje=''):
+        return lector(mensaje)
+    return leer
+
+
+async def escribir_asincrono(salida, texto):
+    """Escribe en un sumidero común, en uno con write asíncrono o en un asyncio.StreamWriter"""
+    if hasattr(salida, 'drain'):
+        salida.write(texto.encode('utf-8'))
+        await salida.drain()
+        return
+    resultado = salida.write(texto)
+    if inspect.isawaitable(resultado):
+        await resultado
+
+
+# Instrucciones que evalúan una expresión o condición cada vez que se ejecutan
+OPCODES_QUE_EVALUAN = {OP_ASIGNAR, OP_ASIGNAR_INVARIANTE, OP_WHILE, OP_ENDWHILE, OP_IF}
+
+# Cabeceras y cierres de ciclo, donde el perfil cuenta las iteraciones
+OPCODES_CICLO = {OP_FOR, OP_FOR_CERRADO, OP_WHILE, OP_ENDFOR, OP_ENDWHILE}
+
+
+class Perfil:
+    """Datos de perfilado de una ejecución, por línea y por ciclo.
+
+    Por cada línea guarda cuántas veces se ejecutó, el tiempo acumulado
+    (sólo de la propia línea, sin el cuerpo de los ciclos), las
+    instrucciones de ensamblador que generó y las expresiones evaluadas.
+    Por cada ciclo guarda cuántas veces se entró y cuántas iteraciones hizo.
+    Los ganchos reciben el perfil al terminar la ejecución.
+    """
+
+    def __init__(self, ganchos=()):
+        self.ganchos = list(ganchos)
+        self.lineas = []
+        self.conteos = []
+        self.tiempos = []
+        self.evaluaciones = []
+        self.ensamblador = []
+        self.ciclos = {}
+
+    def agregar_gancho(self, gancho):
+        """Registra una función gancho(perfil) que se llama al terminar"""
+        self.ganchos.append(gancho)
+
+    def preparar(self, lineas, instrucciones, ensamblador_por_linea=None):
+        total = len(instrucciones)
+        self.lineas = list(lineas)
+        self.conteos = [0] * total
+        self.tiempos = [0] * total
+        self.evaluaciones = [0] * total
+        self.ensamblador = list(ensamblador_por_linea) if ensamblador_por_linea else [None] * total
+        self.ciclos = {pc: [0, 0] for pc, instr in enumerate(instrucciones)
+                      if instr.opcode in (OP_FOR, OP_FOR_CERRADO, OP_WHILE)}
+
+    def finalizar(self):
+        for gancho in self.ganchos:
+            gancho(self)
+
+    def como_diccionario(self):
+        """Perfil como estructuras simples, listo para serializar"""
+        lineas = []
+        for pc, conteo in enumerate(self.conteos):
+            lineas.append({
+                'linea': pc + 1,
+                'codigo': self.lineas[pc] if pc < len(self.lineas) else '',
+                'veces': conteo,
+                'tiempo': self.tiempos[pc] / 1e9,
+                'ensamblador': self.ensamblador[pc],
+                'evaluaciones': self.evaluaciones[pc],
+            })
+        ciclos = [{'linea': pc + 1, 'entradas': entradas, 'iteraciones': iteraciones}
+                  for pc, (entradas, iteraciones) in sorted(self.ciclos.items())]
+        return {'tiempo_total': sum(self.tiempos) / 1e9, 'lineas': lineas, 'ciclos': ciclos}
+
+    def a_json(self, **opciones):
+        return json.dumps(self.como_diccionario(), ensure_ascii=False, **opciones)
+
+    def tabla(self):
+        """Reporte del perfil como texto tabulado"""
+        total = sum(self.tiempos) or 1
+        filas = ["Línea  Veces      Tiempo(ms)  %      Ensamblador  Evaluaciones  Código", "-" * 78]
+        for pc, conteo in enumerate(self.conteos):
+            ensamblador = self.ensamblador[pc]
+            filas.append(f"{pc + 1:<6} {conteo:<10} {self.tiempos[pc] / 1e6:<11.3f} "
+                         f"{100 * self.tiempos[pc] / total:<6.1f} "
+                         f"{'-' if ensamblador is None else ensamblador:<12} "
+                         f"{self.evaluaciones[pc]:<13} {self.lineas[pc] if pc < len(self.lineas) else ''}")
+        if self.ciclos:
+            filas.append("")
+            filas.append("Ciclo  Entradas   Iteraciones  Promedio")
+            filas.append("-" * 40)
+            for pc, (entradas, iteraciones) in sorted(self.ciclos.items()):
+                promedio = iteraciones / entradas if entradas else 0
+                filas.append(f"{pc + 1:<6} {entradas:<10} {iteraciones:<12} {promedio:.1f}")
+        return "\n".join(filas)
+
+
+class SumideroLista:
+    """Sumidero de ensamblador que guarda las líneas (LineaEnsamblador) en una lista en memoria"""
+
+    def __init__(self, lineas=None):
+        self.lineas = [] if lineas is None else lineas
+
+    def escribir(self, lineas):
+        self.lineas.extend(lineas)
+
+    def cerrar(self):
+        pass
+
+
+class SumideroArchivo:
+    """Sumidero de ensamblador que escribe en un archivo a medida que se genera el código.
+
+    destino es una ruta o un objeto con write. Las líneas se juntan en un
+    buffer de hasta tam_buffer caracteres antes de escribirse. Con
+    comprimir=True (por defecto si la ruta termina en .gz) se escribe en
+    gzip; en ese caso un objeto destino tiene que ser binario.
+    """
+
+    def __init__(self, destino, comprimir=None, tam_buffer=1 << 16):
+        es_ruta = isinstance(destino, (str, os.PathLike))
+        if comprimir is None:
+            comprimir = es_ruta and os.fspath(destino).endswith('.gz')
+        self.nombre = os.fspath(destino) if es_ruta else getattr(destino, 'name', '<flujo>')
+        self.propio = es_ruta or comprimir
+        if es_ruta:
+            self.archivo = gzip.open(destino, 'wt', encoding='utf-8') if comprimir \
+                else open(destino, 'w', encoding='utf-8')
+        elif comprimir:
+            self.archivo = io.TextIOWrapper(gzip.GzipFile(fileobj=destino, mode='wb'), encoding='utf-8')
+        else:
+            self.archivo = destino
+        self.tam_buffer = tam_buffer
+        self.buffer = []
+        self.tamano = 0
+        self.lineas_escritas = 0
+
+    def escribir(self, lineas):
+        for linea in lineas:
+            texto = str(linea)
+            self.buffer.append(texto)
+            self.tamano += len(texto) + 1
+        self.lineas_escritas += len(lineas)
+        if self.tamano >= self.tam_buffer:
+            self.vaciar()
+
+    def vaciar(self):
+        if self.buffer:
+            self.archivo.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+            self.tamano = 0
+
+    def cerrar(self):
+        """Escribe lo pendiente; cierra el archivo sólo si lo abrió el sumidero"""
+        self.vaciar()
+        if self.propio:
+            self.archivo.close()
+        elif hasattr(self.archivo, 'flush'):
+            self.archivo.flush()
 
 
 class InterpreteUnificado:
-    def __init__(self):
-        self.variables = {}
+    def __init__(self, entrada=None, salida=None, optimizar=False, sumidero_ensamblador=None,
+                 generar_ensamblador=True, presupuesto=None):
+        self.entrada = crear_lector(entrada) or input
+        self.salida = salida
+        self.optimizar = optimizar
+        self.sumidero_ensamblador = sumidero_ensamblador
+        # Con False no se genera ni se guarda ensamblador (sólo ejecución)
+        self.generar_ensamblador = generar_ensamblador
+        # Límites de cada ejecución (Presupuesto) o None
+        self.presupuesto = presupuesto
+        self.instrucciones_generadas = 0
+        self.escribir = None
+        # Tabla de símbolos por ranuras: los nombres se resuelven al compilar
+        self.indices = {}
+        # Tipo declarado de cada nombre, para compilar las expresiones con sus conversiones
+        self.tipos = {}
+        self.valores = []
+        self.estado = bytearray()
+        self.simbolos = []
+        self.declaradas = []
         self.lineas = []
+        self.instrucciones = []
+        self.tabla_bloques = {}
+        self.bucles_activos = {}
+        self.invariantes = {}
         self.indice = 0
-        self.registros_float = [f"ft{i}" for i in range(32)]
-        self.registros_usados = set()
+        self.registros_float = REGISTROS_FLOAT
+        self.asignacion_registros = {}
+        self.registros_virtuales = {}
         self.codigo_ensamblador = []
-        self.contador_temporal = 7
+        self.codigo_virtual = None
+        self.ensamblador_por_linea = []
+        self.estadisticas_ensamblador = None
+        self.contador_virtuales = 0
         self.contador_etiquetas = 0
 
+        # Tabla de despacho indexada por código de operación
+        self.despacho = [None] * (OP_FOR_CERRADO + 1)
+        self.despacho[OP_NOP] = self._ejecutar_nop
+        self.despacho[OP_VAR] = self._ejecutar_var
+        self.despacho[OP_READ] = self._ejecutar_read
+        self.despacho[OP_PRINT] = self._ejecutar_print
+        self.despacho[OP_PRINTLN] = self._ejecutar_println
+        self.despacho[OP_WRITE] = self._ejecutar_write
+        self.despacho[OP_ASIGNAR_LITERAL] = self._ejecutar_asignar_literal
+        self.despacho[OP_ASIGNAR] = self._ejecutar_asignar
+        self.despacho[OP_FOR] = self._ejecutar_for
+        self.despacho[OP_ENDFOR] = self._ejecutar_endfor
+        self.despacho[OP_WHILE] = self._ejecutar_while
+        self.despacho[OP_ENDWHILE] = self._ejecutar_endwhile
+        self.despacho[OP_ERROR] = self._ejecutar_error
+        self.despacho[OP_IF] = self._ejecutar_if
+        self.despacho[OP_ENDIF] = self._ejecutar_nop
+        self.despacho[OP_ASIGNAR_INVARIANTE] = self._ejecutar_asignar_invariante
+        self.despacho[OP_FOR_CERRADO] = self._ejecutar_for_cerrado
+
     def obtener_nueva_etiqueta(self):
         self.contador_etiquetas += 1
         return f"L{self.contador_etiquetas}"
 
-    def obtener_registro_disponible(self):
-        for r in self.registros_float:
-            if r not in self.registros_usados:
-                self.registros_usados.add(r)
-                return r
-        raise Exception("No hay registros disponibles")
-
-    def liberar_registro(self, registro):
-        if registro in self.registros_usados:
-            self.registros_usados.remove(registro)
-
     def validar_punto_coma(self, linea, numero_linea):
         """Valida que las líneas que requieren ';' lo tengan"""
         linea_limpia = linea.strip().lower()
@@ -51,366 +1851,999 @@ class InterpreteUnificado:
         if requiere_semicolon and not no_requiere_semicolon and not linea.strip().endswith(";"):
             raise Exception(f"Error en línea {numero_linea}: Falta punto y coma (;)")
 
+    def ranura(self, nombre):
+        """Ranura de la variable en la tabla de símbolos, asignándola si es nueva"""
+        indice = self.indices.get(nombre)
+        if indice is None:
+            indice = self.indices[nombre] = len(self.indices)
+        return indice
+
+    def _asegurar_capacidad(self):
+        """Agranda las listas de la tabla hasta cubrir todas las ranuras asignadas"""
+        faltan = len(self.indices) - len(self.valores)
+        if faltan > 0:
+            self.valores.extend([None] * faltan)
+            self.estado.extend(bytes(faltan))
+            self.simbolos.extend([None] * faltan)
+
+    def _adoptar_indices(self, indices):
+        """Pasa a usar las ranuras de un programa compilado, conservando las variables actuales"""
+        if all(indices.get(nombre) == indice for nombre, indice in self.indices.items()):
+            self.indices = dict(indices)
+            return
+        anteriores = [(self.simbolos[r], self.valores[r], self.estado[r]) for r in self.declaradas]
+        self.indices = dict(indices)
+        self.valores, self.estado, self.simbolos, self.declaradas = [], bytearray(), [], []
+        for simbolo, _, _ in anteriores:
+            self.ranura(simbolo.nombre)
+        self._asegurar_capacidad()
+        for simbolo, valor, estado in anteriores:
+            ranura = self.indices[simbolo.nombre]
+            self.simbolos[ranura], self.valores[ranura], self.estado[ranura] = simbolo, valor, estado
+            self.declaradas.append(ranura)
+
+    @property
+    def variables(self):
+        """Vista de sólo lectura de la tabla de símbolos como {nombre: {'tipo', 'valor', 'registro'}}"""
+        return {
+            self.simbolos[r].nombre: {
+                'tipo': self.simbolos[r].tipo,
+                'valor': self.valores[r] if self.estado[r] == CON_VALOR else None,
+                'registro': self.simbolos[r].registro,
+            }
+            for r in self.declaradas
+        }
+
     def declarar_variable(self, nombre, tipo):
         """Declara una variable con validación de redeclaración"""
-        if nombre in self.variables:
+        ranura = self.ranura(nombre)
+        self._asegurar_capacidad()
+        if self.estado[ranura]:
             raise Exception(f"Error: Variable '{nombre}' ya está declarada")
 
-        registro = self.obtener_registro_disponible()
-        self.variables[nombre] = {
-            'tipo': tipo,
-            'valor': None,
-            'registro': registro
-        }
+        self.simbolos[ranura] = Simbolo(nombre, tipo, self.asignacion_registros.get(nombre, '-'))
+        self.estado[ranura] = DECLARADA
+        self.declaradas.append(ranura)
+
+    def declarada(self, nombre):
+        ranura = self.indices.get(nombre)
+        return ranura is not None and ranura < len(self.estado) and self.estado[ranura] != SIN_DECLARAR
 
     def asignar_valor(self, nombre, valor):
-        if nombre not in self.variables:
+        if not self.declarada(nombre):
             raise Exception(f"Error: Variable '{nombre}' no declarada.")
-        self.variables[nombre]['valor'] = valor
+        ranura = self.indices[nombre]
+        self.valores[ranura] = valor
+        self.estado[ranura] = CON_VALOR
 
     def obtener_valor(self, nombre):
-        if nombre in self.variables and self.variables[nombre]['valor'] is not None:
-            return self.variables[nombre]['valor']
+        ranura = self.indices.get(nombre)
+        if ranura is not None and ranura < len(self.estado) and self.estado[ranura] == CON_VALOR:
+            return self.valores[ranura]
         raise Exception(f"Error: Variable '{nombre}' no tiene valor.")
 
+    def _ranuras_expresion(self, expresion):
+        nombres = nombres_expresion(expresion)
+        for nombre in nombres:
+            self.ranura(nombre)
+        return ranuras_de(nombres, self.indices)
+
+    def _ranuras_condicion(self, condicion):
+        nombres = nombres_condicion(condicion)
+        for nombre in nombres:
+            self.ranura(nombre)
+        return ranuras_de(nombres, self.indices)
+
     def evaluar_funcion(self, func, valor):
         """Evalúa funciones trigonométricas"""
-        if func == 'sin':
-            return math.sin(valor)
-        elif func == 'cos':
-            return math.cos(valor)
-        elif func == 'tan':
-            return math.tan(valor)
-        else:
-            raise Exception(f"Función no reconocida: {func}")
+        if func in FUNCIONES:
+            return FUNCIONES[func](valor)
+        raise Exception(f"Función no reconocida: {func}")
 
     def evaluar_condicion(self, condicion):
         """Evalúa condiciones para estructuras de control"""
-        tokens = condicion.split()
-
-        if len(tokens) == 3:
-            var1, var2, op = tokens
+        if not isinstance(condicion, str):
+            condicion = " ".join(condicion)
+        evaluador = compilar_condicion(condicion, self._ranuras_condicion(condicion))
+        self._asegurar_capacidad()
+        return evaluador(self.valores, self.estado)
 
-            if var1 in self.variables:
-                val1 = self.obtener_valor(var1)
-                reg1 = self.variables[var1]['registro']
-            else:
-                val1 = float(var1)
-                reg1 = f"ft{self.contador_temporal}"
-                self.codigo_ensamblador.append(f"li.s {reg1}, {val1}")
-
-            if var2 in self.variables:
-                val2 = self.obtener_valor(var2)
-                reg2 = self.variables[var2]['registro']
-            else:
-                val2 = float(var2)
-                reg2 = f"ft{self.contador_temporal + 1}"
-                self.codigo_ensamblador.append(f"li.s {reg2}, {val2}")
-
-            reg_temp = f"ft{self.contador_temporal + 2}"
-
-            resultado = False
-            if op == '<':
-                self.codigo_ensamblador.append(f"flt.s {reg_temp}, {reg1}, {reg2}")
-                resultado = val1 < val2
-            elif op == '>':
-                self.codigo_ensamblador.append(f"fgt.s {reg_temp}, {reg1}, {reg2}")
-                resultado = val1 > val2
-            elif op == '<=':
-                self.codigo_ensamblador.append(f"fle.s {reg_temp}, {reg1}, {reg2}")
-                resultado = val1 <= val2
-            elif op == '>=':
-                self.codigo_ensamblador.append(f"fge.s {reg_temp}, {reg1}, {reg2}")
-                resultado = val1 >= val2
-            elif op == '==':
-                self.codigo_ensamblador.append(f"feq.s {reg_temp}, {reg1}, {reg2}")
-                resultado = val1 == val2
-            elif op == '!=':
-                self.codigo_ensamblador.append(f"fne.s {reg_temp}, {reg1}, {reg2}")
-                resultado = val1 != val2
-
-            return resultado
-        return False
-
-    def evaluar_postfija(self, postfija, variable_destino=None):
+    def evaluar_postfija(self, postfija):
         """Evalúa expresiones en notación postfija"""
-        stack = []
-        for token in postfija:
-            if token in ['+', '-', '*', '/', '^']:
-                b_token = stack.pop()
-                a_token = stack.pop()
-
-                if isinstance(a_token, str) and a_token in self.variables:
-                    reg_a = self.variables[a_token]['registro']
-                    val_a = self.obtener_valor(a_token)
-                else:
-                    reg_a = f"ft{self.contador_temporal}"
-                    val_a = float(a_token)
-                    if variable_destino:
-                        self.codigo_ensamblador.append(f"li.s {reg_a}, {val_a}")
-
-                if isinstance(b_token, str) and b_token in self.variables:
-                    reg_b = self.variables[b_token]['registro']
-                    val_b = self.obtener_valor(b_token)
-                else:
-                    reg_b = f"ft{self.contador_temporal + 1}"
-                    val_b = float(b_token)
-                    if variable_destino:
-                        self.codigo_ensamblador.append(f"li.s {reg_b}, {val_b}")
-
-                if token == '+':
-                    resultado = val_a + val_b
-                    if variable_destino:
-                        reg_temp = f"ft{self.contador_temporal + 2}"
-                        reg_destino = self.variables[variable_destino]['registro']
-                        self.codigo_ensamblador.append(f"fadd.s {reg_temp}, {reg_a}, {reg_b}")
-                        self.codigo_ensamblador.append(f"fmv.s {reg_destino}, {reg_temp}")
-                elif token == '-':
-                    resultado = val_a - val_b
-                    if variable_destino:
-                        reg_temp = f"ft{self.contador_temporal + 2}"
-                        reg_destino = self.variables[variable_destino]['registro']
-                        self.codigo_ensamblador.append(f"fsub.s {reg_temp}, {reg_a}, {reg_b}")
-                        self.codigo_ensamblador.append(f"fmv.s {reg_destino}, {reg_temp}")
-                elif token == '*':
-                    resultado = val_a * val_b
-                    if variable_destino:
-                        reg_temp = f"ft{self.contador_temporal + 2}"
-                        reg_destino = self.variables[variable_destino]['registro']
-                        self.codigo_ensamblador.append(f"fmul.s {reg_temp}, {reg_a}, {reg_b}")
-                        self.codigo_ensamblador.append(f"fmv.s {reg_destino}, {reg_temp}")
-                elif token == '/':
-                    if val_b == 0:
-                        raise Exception("Error: División por cero")
-                    resultado = val_a / val_b
-                    if variable_destino:
-                        reg_temp = f"ft{self.contador_temporal + 2}"
-                        reg_destino = self.variables[variable_destino]['registro']
-                        self.codigo_ensamblador.append(f"fdiv.s {reg_temp}, {reg_a}, {reg_b}")
-                        self.codigo_ensamblador.append(f"fmv.s {reg_destino}, {reg_temp}")
-                elif token == '^':
-                    resultado = val_a ** val_b
-                    if variable_destino:
-                        reg_destino = self.variables[variable_destino]['registro']
-                        self.codigo_ensamblador.append(f"# Función pow llamada")
-
-                stack.append(resultado)
-
-            elif token.lower() in ['sin', 'cos', 'tan']:
-                a_token = stack.pop()
-                if isinstance(a_token, str) and a_token in self.variables:
-                    val_a = self.obtener_valor(a_token)
-                    reg_a = self.variables[a_token]['registro']
+        return self.evaluar_expresion(" ".join(postfija))
+
+    def evaluar_expresion(self, expr):
+        """Evalúa una expresión en notación postfija o infija"""
+        if es_infija(expr):
+            expr = a_postfija(expr)
+        evaluador = compilar_postfija(expr, self._ranuras_expresion(expr))
+        self._asegurar_capacidad()
+        return evaluador(self.valores, self.estado)
+
+    def construir_tabla_bloques(self):
+        """Empareja en una sola pasada cada cabecera de bloque con su cierre"""
+        tabla, errores = emparejar_bloques(self.lineas)
+        if errores:
+            detalle = "\n".join(f"  {diagnostico}" for diagnostico in errores)
+            raise Exception(f"Bloques desbalanceados:\n{detalle}")
+
+        self.tabla_bloques = tabla
+        return tabla
+
+    def validar(self):
+        """Revisa todo self.lineas sin ejecutar nada y devuelve los Diagnostico ordenados por línea.
+
+        Se revisan los puntos y coma y las líneas que no compilan, el
+        balance de los bloques, los encabezados de for, while e if, que cada
+        variable se declare antes de usarse (y no se redeclare), la
+        profundidad de pila de las expresiones postfijas y los nombres de
+        funciones. Sólo se informan errores que fallarían al ejecutarse la
+        línea: una variable declarada dentro de un if que no se tomó no
+        cuenta como error.
+        """
+        _, diagnosticos = emparejar_bloques(self.lineas)
+        self.tipos = tipos_declarados(self.lineas)
+        declaradas_en_programa = set()
+        instrucciones = []
+        for numero, linea in enumerate(self.lineas, 1):
+            instr = self.compilar_linea(linea, numero, evaluadores=False)
+            instrucciones.append(instr)
+            if instr.opcode == OP_VAR:
+                declaradas_en_programa.update(instr.operandos[0])
+
+        # Declaradas en alguna línea anterior, y seguro declaradas en cada bloque abierto
+        posibles = set()
+        seguras = [set()]
+
+        def funcion_desconocida(numero, nombre):
+            """Informa un nombre nunca declarado que se parece a una función conocida"""
+            if nombre in declaradas_en_programa or nombre.lower() in FUNCIONES:
+                return False
+            parecidas = difflib.get_close_matches(nombre.lower(), FUNCIONES, n=1)
+            if parecidas:
+                diagnosticos.append(Diagnostico(numero, f"Función no reconocida: {nombre} "
+                                                        f"(¿quiso decir '{parecidas[0]}'?)"))
+            return bool(parecidas)
+
+        def usar(numero, nombre, mensaje=None):
+            if nombre in posibles:
+                return
+            if not _IDENTIFICADOR.fullmatch(nombre):
+                diagnosticos.append(Diagnostico(numero, f"Token no reconocido: {nombre}"))
+            elif not funcion_desconocida(numero, nombre):
+                diagnosticos.append(Diagnostico(numero, mensaje or f"Variable '{nombre}' no declarada"))
+
+        for numero, (linea, instr) in enumerate(zip(self.lineas, instrucciones), 1):
+            palabras = linea.lower().replace(';', ' ').split()
+            palabra = palabras[0] if palabras else ''
+            opcode = instr.opcode
+
+            if opcode == OP_ERROR:
+                mensaje = _PREFIJO_ERROR.sub('', str(instr.operandos[0]))
+                anteriores = len(diagnosticos)
+                if ':=' in linea:
+                    for nombre in _IDENTIFICADOR.findall(linea.split(':=', 1)[1]):
+                        funcion_desconocida(numero, nombre)
+                # Una función desconocida con sugerencia reemplaza al mensaje del compilador
+                if len(diagnosticos) == anteriores or not mensaje.startswith("Función no reconocida"):
+                    diagnosticos.insert(anteriores, Diagnostico(numero, mensaje))
+            elif opcode == OP_NOP and palabra not in APERTURAS_BLOQUE:
+                diagnosticos.append(Diagnostico(numero, f"Sentencia no reconocida: {linea}"))
+            elif opcode == OP_VAR:
+                for nombre in instr.operandos[0]:
+                    if not _IDENTIFICADOR.fullmatch(nombre):
+                        diagnosticos.append(Diagnostico(numero, f"Nombre de variable inválido: {nombre}"))
+                    elif any(nombre in bloque for bloque in seguras):
+                        diagnosticos.append(Diagnostico(numero, f"Variable '{nombre}' ya está declarada"))
+                    seguras[-1].add(nombre)
+                    posibles.add(nombre)
+            elif opcode in (OP_READ, OP_ASIGNAR_LITERAL):
+                usar(numero, instr.operandos[0])
+            elif opcode == OP_ASIGNAR:
+                nombre, expresion, _, ranuras = instr.operandos[:4]
+                problema = problema_postfija(expresion)
+                if problema:
+                    diagnosticos.append(Diagnostico(numero, problema))
+                for token, _ in ranuras:
+                    usar(numero, token)
+                usar(numero, nombre)
+            elif opcode == OP_FOR:
+                var, _, fin_var = instr.operandos[:3]
+                partes = linea.split()
+                if len(partes) != 7 or partes[2] != ':=' or partes[4].lower() != 'to' or partes[6].lower() != 'do':
+                    diagnosticos.append(Diagnostico(numero, "Encabezado de for inválido: se espera "
+                                                            "'for variable := inicio to limite do'"))
+                usar(numero, var)
+                if _LITERAL_NUMERICO.fullmatch(fin_var):
+                    diagnosticos.append(Diagnostico(numero, f"El límite del for debe ser una variable, no {fin_var}"))
                 else:
-                    val_a = float(a_token)
-                    reg_a = f"ft{self.contador_temporal}"
-
-                resultado = self.evaluar_funcion(token.lower(), val_a)
+                    usar(numero, fin_var, f"Variable '{fin_var}' no declarada en el for")
+            elif opcode in (OP_WHILE, OP_IF):
+                palabra_final = 'do' if opcode == OP_WHILE else 'then'
+                if palabras[-1] != palabra_final:
+                    diagnosticos.append(Diagnostico(numero, f"Falta '{palabra_final}' al final del {palabra}"))
+                condicion = instr.operandos[0]
+                tokens = condicion.split()
+                if len(tokens) != 3 or tokens[2] not in COMPARACIONES_PYTHON:
+                    diagnosticos.append(Diagnostico(
+                        numero, f"Condición inválida: '{condicion}' (se espera 'a op b' con op en "
+                                f"{', '.join(sorted(COMPARACIONES_PYTHON))})"))
+                for token, _ in instr.operandos[1]:
+                    usar(numero, token)
+
+            if palabra in CIERRES_BLOQUE:
+                seguras.append(set())
+            elif palabra in APERTURAS_BLOQUE and len(seguras) > 1:
+                seguras.pop()
+
+        diagnosticos.sort(key=lambda diagnostico: diagnostico.linea)
+        return diagnosticos
+
+    def normalizar_condicion(self, condicion):
+        """Lleva una condición 'a op b' a la forma postfija 'a b op'"""
+        tokens = condicion.split()
+        if len(tokens) == 3 and tokens[1] in INSTRUCCIONES_COMPARACION \
+                and tokens[2] not in INSTRUCCIONES_COMPARACION:
+            tokens = [tokens[0], tokens[2], tokens[1]]
+        return " ".join(tokens)
 
-                if variable_destino:
-                    reg_destino = self.variables[variable_destino]['registro']
-                    self.codigo_ensamblador.append(f"# Llamada a función {token}")
-                    self.codigo_ensamblador.append(f"fmv.s {reg_destino}, fa0")
+    def compilar_linea(self, linea, numero_linea, evaluadores=True):
+        """Decodifica una línea en una instrucción (sin saltos resueltos).
 
-                stack.append(resultado)
+        Con evaluadores=False no se compilan las funciones de las expresiones
+        y condiciones (quedan en None); alcanza para analizar el programa.
+        """
+        try:
+            self.validar_punto_coma(linea, numero_linea)
+
+            if linea.startswith("var"):
+                nombres, tipo = separar_declaracion(linea)
+                for nombre in nombres:
+                    if self.tipos.get(nombre, tipo) != tipo:
+                        raise Exception(f"Error: Variable '{nombre}' ya está declarada como {self.tipos[nombre]}")
+                    self.ranura(nombre)
+                return Instruccion(OP_VAR, (tuple(nombres), tipo), numero_linea)
+
+            elif linea.startswith("read"):
+                nombre = linea[linea.find('(') + 1:linea.find(')')].strip()
+                return Instruccion(OP_READ, (nombre,), numero_linea)
+
+            elif linea.startswith("print(") or linea.startswith("println("):
+                nombre = linea[linea.find('(') + 1:linea.find(')')].strip()
+                texto = nombre.replace('"', '').replace("'", "")
+                opcode = OP_PRINT if linea.startswith("print(") else OP_PRINTLN
+                return Instruccion(opcode, (nombre, texto), numero_linea)
+
+            elif linea.startswith("for"):
+                partes = linea.split()
+                var = partes[1]
+                inicio = self._literal_de_tipo(partes[3], var)
+                fin_var = partes[5]
+                return Instruccion(OP_FOR, (var, inicio, fin_var, self.ranura(var), self.ranura(fin_var)),
+                                   numero_linea)
+
+            elif linea.startswith("while"):
+                inicio_condicion = linea.find("while") + 5
+                fin_condicion = linea.find(" do")
+                if fin_condicion == -1:
+                    fin_condicion = len(linea)
+                condicion = self.normalizar_condicion(linea[inicio_condicion:fin_condicion])
+                ranuras = self._ranuras_condicion(condicion)
+                evaluador = compilar_condicion(condicion, ranuras) if evaluadores else None
+                return Instruccion(OP_WHILE, (condicion, ranuras, evaluador), numero_linea)
+
+            elif linea.startswith("if "):
+                fin_condicion = linea.find(" then")
+                if fin_condicion == -1:
+                    fin_condicion = len(linea)
+                condicion = self.normalizar_condicion(linea[2:fin_condicion])
+                ranuras = self._ranuras_condicion(condicion)
+                evaluador = compilar_condicion(condicion, ranuras) if evaluadores else None
+                return Instruccion(OP_IF, (condicion, ranuras, evaluador), numero_linea)
+
+            elif ":=" in linea:
+                nombre, expr = linea.replace(";", "").split(":=")
+                nombre = nombre.strip()
+                expr = expr.strip()
+                if es_infija(expr) and not _LITERAL_NUMERICO.fullmatch(expr):
+                    expr = a_postfija(expr)
+                if _LITERAL_NUMERICO.fullmatch(expr):
+                    return Instruccion(OP_ASIGNAR_LITERAL,
+                                       (nombre, self._literal_de_tipo(expr, nombre), self.ranura(nombre)),
+                                       numero_linea)
+                ranuras = self._ranuras_expresion(expr)
+                tipos = self._tipos_asignacion(nombre, expr)
+                evaluador = compilar_postfija(expr, ranuras, (), *tipos) if evaluadores else None
+                return Instruccion(OP_ASIGNAR, (nombre, expr, self.ranura(nombre), ranuras, tipos, evaluador),
+                                   numero_linea)
+
+            elif linea.startswith("write"):
+                nombre = linea[linea.find('(') + 1:linea.find(')')].strip()
+                return Instruccion(OP_WRITE, (nombre,), numero_linea)
 
-            elif token in self.variables:
-                stack.append(token)
-            else:
-                try:
-                    stack.append(float(token))
-                except ValueError:
-                    raise Exception(f"Token no reconocido: {token}")
-
-        return stack[0] if stack else 0
-
-    def evaluar_expresion(self, expr, variable_destino=None):
-        """Evalúa una expresión en notación postfija"""
-        return self.evaluar_postfija(expr.split(), variable_destino)
-
-    def encontrar_fin_bloque(self, inicio, palabra_inicio, palabra_fin):
-        """Encuentra el final de un bloque (for/endfor, while/endwhile)"""
-        contador = 1
-        i = inicio + 1
-        while i < len(self.lineas) and contador > 0:
-            linea = self.lineas[i].strip().lower()
-            if linea.startswith(palabra_inicio):
-                contador += 1
-            elif linea.startswith(palabra_fin):
-                contador -= 1
-            i += 1
-        return i - 1
+        except Exception as e:
+            # El error se difiere hasta que la ejecución alcance la línea
+            return Instruccion(OP_ERROR, (e,), numero_linea)
 
-    def ejecutar_linea(self, linea, numero_linea):
-        """Ejecuta una línea de código"""
-        # Validar punto y coma
-        self.validar_punto_coma(linea, numero_linea)
+        return Instruccion(OP_NOP, (), numero_linea)
 
-        if linea.startswith("var"):
-            partes = linea.replace(";", "").split()
-            for nombre in partes[1:]:
-                if nombre != ':' and nombre != ',':
-                    nombre = nombre.replace(',', '')
-                    if nombre:
-                        self.declarar_variable(nombre, 'real')
-
-        elif linea.startswith("read"):
-            nombre = linea[linea.find('(') + 1:linea.find(')')]
-            nombre = nombre.strip()
-            if nombre in self.variables:
-                try:
-                    valor = float(input(f"Ingrese valor para {nombre}: "))
-                    self.asignar_valor(nombre, valor)
-                    registro = self.variables[nombre]['registro']
-                    self.codigo_ensamblador.append(f"# leer {nombre} → valor {valor}")
-                except ValueError:
-                    raise Exception("Valor inválido ingresado")
-            else:
-                raise Exception(f"Error: Variable '{nombre}' no declarada.")
-
-        elif linea.startswith("print("):
-            nombre = linea[linea.find('(') + 1:linea.find(')')]
-            nombre = nombre.strip()
-            if nombre in self.variables:
-                valor = self.obtener_valor(nombre)
-                registro = self.variables[nombre]['registro']
-                print(valor, end='')
-                self.codigo_ensamblador.append(f"# print {nombre} → valor {valor}")
-            else:
-                print(nombre.replace('"', '').replace("'", ""), end='')
-
-        elif linea.startswith("println("):
-            nombre = linea[linea.find('(') + 1:linea.find(')')]
-            nombre = nombre.strip()
-            if nombre in self.variables:
-                valor = self.obtener_valor(nombre)
-                registro = self.variables[nombre]['registro']
-                print(valor)
-                self.codigo_ensamblador.append(f"# println {nombre} → valor {valor}")
-            else:
-                print(nombre.replace('"', '').replace("'", ""))
+    def _literal_de_tipo(self, texto, nombre):
+        """Valor de un literal asignado a 'nombre': int si la variable es integer, float si no"""
+        if self.tipos.get(nombre) != TIPO_ENTERO:
+            return float(texto)
+        try:
+            return int(texto)
+        except ValueError:
+            valor = float(texto)
+        if not es_literal_entero(valor):
+            raise Exception(f"Error: Tipos incompatibles: la variable entera '{nombre}' no puede recibir {texto}")
+        return int(valor)
+
+    def _tipos_asignacion(self, nombre, expresion):
+        """(enteras, destino) con que se compila 'nombre := expresion'.
+
+        Falla si la expresión da un real y la variable es integer (salvo que
+        use nombres sin declarar: ese error sale al ejecutar).
+        """
+        dag = construir_dag(expresion)
+        nombres = variables_dag(dag)
+        enteras = tuple(sorted(n for n in nombres if self.tipos.get(n) == TIPO_ENTERO))
+        destino = self.tipos.get(nombre, TIPO_REAL)
+        if destino == TIPO_ENTERO and tipo_expresion(dag, enteras) == TIPO_REAL \
+                and all(n in self.tipos for n in nombres):
+            raise Exception(f"Error: Tipos incompatibles: la variable entera '{nombre}' "
+                            f"no puede recibir el valor real de {expresion}")
+        return enteras, destino
+
+    def compilar(self, desde=0):
+        """Compila self.lineas a una lista de instrucciones con saltos resueltos.
+
+        Con desde > 0 se conservan las instrucciones ya compiladas de las
+        líneas anteriores, que tienen que ser sentencias completas sin cambios.
+        """
+        tabla = self.construir_tabla_bloques()
+        self.tipos = tipos_declarados(self.lineas)
+        instrucciones = self.instrucciones[:desde]
+        instrucciones.extend(self.compilar_linea(linea, i + 1) for i, linea in enumerate(self.lineas[desde:], desde))
+        if desde:
+            tabla = {inicio: fin for inicio, fin in tabla.items() if inicio >= desde}
+
+        for inicio, fin in tabla.items():
+            instr = instrucciones[inicio]
+            cierre = CIERRES_OPCODE.get(instr.opcode)
+            if cierre is not None:
+                instr.salto = fin
+                instrucciones[fin] = Instruccion(cierre, instr.operandos, fin + 1, inicio)
+
+        self.optimizar_ciclos(instrucciones, tabla)
+        self.instrucciones = instrucciones
+        self.asignacion_registros = {}
+        return instrucciones
+
+    def optimizar_ciclos(self, instrucciones, tabla):
+        """Prepara los ciclos para ejecutarse con menos trabajo por iteración.
+
+        Los for cuyo cuerpo sólo tiene reducciones reconocidas pasan a
+        OP_FOR_CERRADO, que calcula el resultado sin iterar cuando puede
+        garantizar que es exacto. Las asignaciones dentro de un ciclo con
+        subexpresiones que el ciclo no modifica pasan a
+        OP_ASIGNAR_INVARIANTE: esas subexpresiones se calculan una sola vez
+        por cada entrada al ciclo.
+        """
+        ciclos = sorted((inicio, fin) for inicio, fin in tabla.items()
+                        if instrucciones[inicio].opcode in (OP_FOR, OP_WHILE))
+        ciclo_interno = {}
+        escritas = {}
+        for inicio, fin in ciclos:
+            nombres = set()
+            for instr in instrucciones[inicio:fin]:
+                if instr.opcode in (OP_ASIGNAR, OP_ASIGNAR_LITERAL, OP_READ, OP_FOR, OP_FOR_CERRADO):
+                    nombres.add(instr.operandos[0])
+                elif instr.opcode == OP_VAR:
+                    nombres.update(instr.operandos[0])
+            escritas[inicio] = nombres
+            # Los ciclos internos empiezan después, así que sobrescriben a los externos
+            for pc in range(inicio + 1, fin):
+                ciclo_interno[pc] = inicio
+
+            cabecera = instrucciones[inicio]
+            if cabecera.opcode == OP_FOR:
+                var, valor_inicio = cabecera.operandos[:2]
+                forma = analizar_forma_cerrada(var, valor_inicio, instrucciones[inicio + 1:fin], self.indices)
+                if forma is not None:
+                    instrucciones[inicio] = Instruccion(OP_FOR_CERRADO, cabecera.operandos + (forma,),
+                                                        cabecera.numero_linea, cabecera.salto)
+
+        for pc, ciclo in ciclo_interno.items():
+            instr = instrucciones[pc]
+            if instr.opcode != OP_ASIGNAR:
+                continue
+            nombre, expresion, ranura, ranuras, (enteras, destino), _ = instr.operandos
+            dag = construir_dag(expresion)
+            if not dag.completa:
+                continue
+
+            invariante = []
+            variantes = set()
+            for nodo in dag.nodos:
+                if nodo[0] == 'lit':
+                    invariante.append(True)
+                elif nodo[0] == 'var':
+                    invariante.append(nodo[1] not in escritas[ciclo])
+                else:
+                    hijos = nodo[2:] if nodo[0] == 'op' else nodo[2:3]
+                    invariante.append(all(invariante[h] for h in hijos))
+                    if not invariante[-1]:
+                        variantes.update(hijos)
+
+            sustituciones = {}
+            textos = []
+            for indice, nodo in enumerate(dag.nodos):
+                if nodo[0] in ('op', 'fun') and invariante[indice] \
+                        and (indice == dag.raiz or indice in variantes):
+                    sustituciones[indice] = f"@{len(textos)}"
+                    textos.append(texto_postfijo(dag, indice))
+            if not textos:
+                continue
+
+            texto = texto_postfijo(dag, dag.raiz, sustituciones)
+            textos = tuple(textos)
+            # Cada '@k' tiene el tipo de su subexpresión
+            tipos = (enteras + tuple(f"@{k}" for k, subexpresion in enumerate(textos)
+                                     if tipo_expresion(construir_dag(subexpresion), enteras) == TIPO_ENTERO),
+                     destino)
+            instrucciones[pc] = Instruccion(
+                OP_ASIGNAR_INVARIANTE,
+                (nombre, expresion, ranura, ciclo, texto, textos, ranuras, tipos,
+                 compilar_postfija(texto, ranuras, textos, *tipos)),
+                instr.numero_linea)
+
+    def compilar_codigo(self, codigo):
+        """Separa el código fuente en líneas y lo compila"""
+        self.lineas = [line.strip() for line in codigo.strip().split('\n') if line.strip()]
+        return self.compilar()
+
+    def exportar_programa(self, incluir_ensamblador=False):
+        """Empaqueta el programa compilado para reutilizarlo en otro intérprete"""
+        ensamblador = list(self.codigo_ensamblador) if incluir_ensamblador else None
+        return ProgramaCompilado(self.lineas, self.instrucciones, self.tabla_bloques, ensamblador,
+                                 dict(self.indices))
+
+    def cargar_programa(self, programa):
+        """Carga un programa ya compilado, sin volver a analizar el código fuente"""
+        self.lineas = programa.lineas
+        self.instrucciones = programa.instrucciones
+        self.tabla_bloques = programa.tabla_bloques
+        self._adoptar_indices(programa.indices)
+        self.asignacion_registros = {}
+        self.ensamblador_por_linea = []
+        if programa.ensamblador is not None:
+            self.codigo_ensamblador = list(programa.ensamblador)
+
+    def _ejecutar_var(self, instr, pc):
+        nombres, tipo = instr.operandos
+        for nombre in nombres:
+            self.declarar_variable(nombre, tipo)
+        return pc + 1
+
+    def _ejecutar_read(self, instr, pc):
+        nombre = instr.operandos[0]
+        self._asignar_lectura(nombre, self.entrada(self._mensaje_lectura(nombre)))
+        return pc + 1
+
+    def _mensaje_lectura(self, nombre):
+        """Texto con el que read() pide el valor; falla si la variable no está declarada"""
+        if not self.declarada(nombre):
+            raise Exception(f"Error: Variable '{nombre}' no declarada.")
+        return f"Ingrese valor para {nombre}: "
 
-        elif linea.startswith("for"):
-            partes = linea.split()
-            var = partes[1]
-            inicio_val = partes[3]
-            fin_var = partes[5]
+    def _asignar_lectura(self, nombre, texto):
+        ranura = self.indices.get(nombre)
+        entera = self.declarada(nombre) and self.simbolos[ranura].tipo == TIPO_ENTERO
+        try:
+            valor = entero_leido(texto) if entera else float(texto)
+        except ValueError:
+            raise Exception("Valor inválido ingresado")
+        self.asignar_valor(nombre, valor)
+
+    def _ejecutar_print(self, instr, pc):
+        nombre, texto = instr.operandos
+        if self.declarada(nombre):
+            self.escribir(str(self.obtener_valor(nombre)))
+        else:
+            self.escribir(texto)
+        return pc + 1
 
-            inicio = float(inicio_val)
-            self.asignar_valor(var, inicio)
-            reg_var = self.variables[var]['registro']
-            self.codigo_ensamblador.append(f"li.s {reg_var}, {inicio}")
+    def _ejecutar_println(self, instr, pc):
+        nombre, texto = instr.operandos
+        if self.declarada(nombre):
+            self.escribir(f"{self.obtener_valor(nombre)}\n")
+        else:
+            self.escribir(f"{texto}\n")
+        return pc + 1
 
-            if fin_var not in self.variables:
-                raise Exception(f"Variable '{fin_var}' no declarada en el for")
+    def _ejecutar_write(self, instr, pc):
+        nombre = instr.operandos[0]
+        if self.declarada(nombre):
+            self.escribir(f"{nombre}: {self.obtener_valor(nombre)}\n")
+        else:
+            self.escribir(f"{nombre}\n")
+        return pc + 1
 
-            fin = self.obtener_valor(fin_var)
+    def _ejecutar_asignar_literal(self, instr, pc):
+        nombre, valor, ranura = instr.operandos
+        if not self.estado[ranura]:
+            raise Exception(f"Error: Variable '{nombre}' no declarada.")
+        self.valores[ranura] = valor
+        self.estado[ranura] = CON_VALOR
+        return pc + 1
+
+    def _ejecutar_asignar(self, instr, pc):
+        nombre, _, ranura, _, _, evaluador = instr.operandos
+        valor = evaluador(self.valores, self.estado)
+        if not self.estado[ranura]:
+            raise Exception(f"Error: Variable '{nombre}' no declarada.")
+        self.valores[ranura] = valor
+        self.estado[ranura] = CON_VALOR
+        return pc + 1
+
+    def _ejecutar_asignar_invariante(self, instr, pc):
+        nombre, _, ranura, ciclo, _, _, _, _, evaluador = instr.operandos
+        cache = self.invariantes.get(ciclo)
+        if cache is None:
+            cache = self.invariantes[ciclo] = {}
+        valor = evaluador(self.valores, self.estado, cache)
+        if not self.estado[ranura]:
+            raise Exception(f"Error: Variable '{nombre}' no declarada.")
+        self.valores[ranura] = valor
+        self.estado[ranura] = CON_VALOR
+        return pc + 1
+
+    def _ejecutar_for(self, instr, pc):
+        var, inicio, fin_var, ranura_var, ranura_fin = instr.operandos[:5]
+        self.invariantes.pop(pc, None)
+
+        estado = self.estado
+        if not estado[ranura_var]:
+            raise Exception(f"Error: Variable '{var}' no declarada.")
+        self.valores[ranura_var] = inicio
+        estado[ranura_var] = CON_VALOR
+        if not estado[ranura_fin]:
+            raise Exception(f"Variable '{fin_var}' no declarada en el for")
+        if estado[ranura_fin] != CON_VALOR:
+            raise Exception(f"Error: Variable '{fin_var}' no tiene valor.")
+
+        fin = self.valores[ranura_fin]
+        self.bucles_activos[pc] = fin
+
+        if inicio <= fin:
+            return pc + 1
+        return instr.salto + 1
+
+    def _ejecutar_endfor(self, instr, pc):
+        ranura = instr.operandos[3]
+        cabecera = instr.salto
+
+        valor = self.valores[ranura] + 1
+        self.valores[ranura] = valor
+
+        if valor <= self.bucles_activos[cabecera]:
+            return cabecera + 1
+        return pc + 1
+
+    def _ejecutar_for_cerrado(self, instr, pc):
+        var, inicio, _, ranura_var, ranura_fin, forma = instr.operandos
+        estado = self.estado
+        if estado[ranura_var] and estado[ranura_fin] == CON_VALOR:
+            fin = self.valores[ranura_fin]
+            resultados = forma.calcular(self.valores, estado, var, ranura_var, inicio, fin)
+            if resultados is not None:
+                self.bucles_activos[pc] = fin
+                for ranura, valor in resultados:
+                    self.valores[ranura] = valor
+                    estado[ranura] = CON_VALOR
+                return instr.salto + 1
+        return self._ejecutar_for(instr, pc)
+
+    def _ejecutar_while(self, instr, pc):
+        self.invariantes.pop(pc, None)
+        if instr.operandos[2](self.valores, self.estado):
+            return pc + 1
+        return instr.salto + 1
+
+    def _ejecutar_endwhile(self, instr, pc):
+        cabecera = instr.salto
+        if instr.operandos[2](self.valores, self.estado):
+            return cabecera + 1
+        return pc + 1
+
+    def _ejecutar_if(self, instr, pc):
+        if instr.operandos[2](self.valores, self.estado):
+            return pc + 1
+        return instr.salto + 1
+
+    def _ejecutar_nop(self, instr, pc):
+        return pc + 1
+
+    def _ejecutar_error(self, instr, pc):
+        raise instr.operandos[0]
+
+    def generar_codigo(self):
+        """Genera el código ensamblador del programa en una pasada estática, una vez por construcción.
+
+        El código se genera primero sobre registros virtuales (%nombre para
+        variables, %.n para temporales; %$nombre y %$.n para los enteros) y
+        luego el asignador de registros los lleva a registros físicos o a
+        posiciones de la pila. Las variables integer usan registros e
+        instrucciones enteras y sólo se convierten (fcvt.s.w) al mezclarse
+        con reales.
+
+        Sin sumidero, todo el programa se optimiza y asigna de una vez y queda
+        en self.codigo_ensamblador. Con un sumidero, el código se genera por
+        fragmentos de sentencias de nivel superior que se escriben apenas
+        están listos, así la memoria no crece con el largo del programa.
+
+        Las líneas son registros LineaEnsamblador; el texto se arma recién al
+        mostrarlas o escribirlas. Con generar_ensamblador=False no se genera nada.
+        Si el Presupuesto limita el ensamblador, al pasarse del límite se
+        detiene con PresupuestoExcedido.
+
+        Sin sumidero también queda en self.codigo_virtual el código anterior a
+        la asignación de registros, donde cada variable sigue en su propio
+        registro virtual (self.registros_virtuales) hasta el final.
+        """
+        self.codigo_virtual = None
+        if not self.generar_ensamblador:
+            self.codigo_ensamblador = []
+            self.ensamblador_por_linea = []
+            self.asignacion_registros = {}
+            return self.codigo_ensamblador
 
+        self.contador_etiquetas = 0
+        self.contador_virtuales = 0
+        self.instrucciones_generadas = 0
+        self.estadisticas_ensamblador = None
+        self.ensamblador_por_linea = []
+        registros = self.registros_virtuales = {}
+        etiquetas = {}
+
+        if self.sumidero_ensamblador is None:
+            codigo_virtual = self._generar_virtual(0, len(self.instrucciones), registros, etiquetas)
+            codigo_virtual = self.codigo_virtual = self._optimizar_virtual(codigo_virtual)
+            asignador = AsignadorRegistros(self.registros_float)
+            self.codigo_ensamblador, ubicaciones = asignador.asignar(codigo_virtual)
+            self.asignacion_registros = {nombre: ubicaciones.get(virtual, '-')
+                                         for nombre, virtual in registros.items()}
+        else:
+            self._generar_por_fragmentos(self.sumidero_ensamblador, registros, etiquetas)
+
+        for ranura in self.declaradas:
+            simbolo = self.simbolos[ranura]
+            simbolo.registro = self.asignacion_registros.get(simbolo.nombre, '-')
+        return self.codigo_ensamblador
+
+    def _generar_virtual(self, inicio, fin, registros, etiquetas):
+        """Código con registros virtuales de las instrucciones [inicio, fin)"""
+        limite = self.presupuesto.ensamblador if self.presupuesto is not None else None
+        codigo_virtual = []
+        for pc in range(inicio, fin):
+            instr = self.instrucciones[pc]
+            codigo = []
+            try:
+                self._generar_instruccion(instr, pc, registros, etiquetas, codigo)
+            except Exception as e:
+                codigo = [comentario(f"línea {instr.numero_linea}: sin código ({e})")]
+            codigo_virtual.extend(codigo)
+            cantidad = contar_instrucciones(codigo)
+            self.ensamblador_por_linea.append(cantidad)
+            self.instrucciones_generadas += cantidad
+            if limite is not None and self.instrucciones_generadas > limite:
+                raise PresupuestoExcedido('ensamblador', limite, pc + 1)
+        return codigo_virtual
+
+    def _optimizar_virtual(self, codigo_virtual):
+        if not self.optimizar:
+            return codigo_virtual
+        antes = contar_instrucciones(codigo_virtual)
+        codigo_virtual = OptimizadorMirilla().optimizar(codigo_virtual)
+        despues = contar_instrucciones(codigo_virtual)
+        if self.estadisticas_ensamblador:
+            antes += self.estadisticas_ensamblador['antes']
+            despues += self.estadisticas_ensamblador['despues']
+        self.estadisticas_ensamblador = {'antes': antes, 'despues': despues}
+        return codigo_virtual
+
+    def _fragmentos(self, maximo=TAMANO_FRAGMENTO):
+        """Rangos [inicio, fin) de sentencias de nivel superior completas, de hasta 'maximo' instrucciones"""
+        total = len(self.instrucciones)
+        inicio = pc = 0
+        while pc < total:
+            salto = self.instrucciones[pc].salto
+            pc = salto + 1 if salto is not None and salto > pc else pc + 1
+            if pc - inicio >= maximo:
+                yield inicio, pc
+                inicio = pc
+        if inicio < total:
+            yield inicio, total
+
+    def _generar_por_fragmentos(self, sumidero, registros, etiquetas):
+        """Genera, optimiza y asigna registros fragmento por fragmento, escribiendo en el sumidero.
+
+        Cada variable tiene su lugar en un marco apuntado por REGISTRO_MARCO:
+        un fragmento carga al empezar las variables que lee y guarda al
+        terminar las que escribe, de modo que los fragmentos se asignan por
+        separado. Los ciclos y los if nunca se parten entre fragmentos.
+        """
+        self.codigo_ensamblador = sumidero.lineas if isinstance(sumidero, SumideroLista) else []
+        asignador = AsignadorRegistros(self.registros_float)
+        marco = -(-len(self.indices) * TAMANO_PALABRA // 16) * 16
+        if marco:
+            sumidero.escribir([asm("addi", "sp", "sp", -marco), asm("mv", REGISTRO_MARCO, "sp")])
+
+        for inicio, fin in self._fragmentos():
+            codigo_virtual = self._generar_virtual(inicio, fin, registros, etiquetas)
+            codigo_virtual = self._optimizar_virtual(self._con_memoria(codigo_virtual, registros, asignador))
+            codigo, _ = asignador.asignar(codigo_virtual)
+            sumidero.escribir(codigo)
+
+        if marco:
+            sumidero.escribir([asm("addi", "sp", "sp", marco)])
+        sumidero.cerrar()
+        self.asignacion_registros = {nombre: f"{self.indices[nombre] * TAMANO_PALABRA}({REGISTRO_MARCO})"
+                                     for nombre in registros}
+
+    def _con_memoria(self, codigo_virtual, registros, asignador):
+        """Agrega las cargas y guardados en el marco de las variables que usa el fragmento.
+
+        Se guardan las variables que el fragmento escribe y se cargan sólo las
+        que lee (o guarda) antes de escribirlas en algún camino.
+        """
+        variables = {virtual: nombre for nombre, virtual in registros.items()}
+        escritas = {}
+        for linea in codigo_virtual:
+            descompuesta = descomponer_instruccion(linea)
+            if descompuesta:
+                for virtual in definiciones_y_usos(*descompuesta)[0]:
+                    if virtual in variables:
+                        escritas.setdefault(virtual, None)
+
+        def direccion(virtual):
+            return f"{self.indices[variables[virtual]] * TAMANO_PALABRA}({REGISTRO_MARCO})"
+
+        codigo = codigo_virtual + [asm("sw" if es_entero(virtual) else "fsw", virtual, direccion(virtual))
+                                   for virtual in escritas]
+        vivas = asignador.vivos_al_entrar(codigo)
+        cargas = [asm("lw" if es_entero(virtual) else "flw", virtual, direccion(virtual))
+                  for virtual in sorted(vivas, key=lambda v: self.indices[variables[v]]) if virtual in variables]
+        return cargas + codigo
+
+    def _nuevo_temporal(self, entero=False):
+        self.contador_virtuales += 1
+        return f"{PREFIJO_ENTERO if entero else '%'}.{self.contador_virtuales}"
+
+    def _generar_instruccion(self, instr, pc, registros, etiquetas, codigo):
+        opcode = instr.opcode
+
+        if opcode == OP_VAR:
+            nombres, tipo = instr.operandos
+            prefijo = PREFIJO_ENTERO if tipo == TIPO_ENTERO else '%'
+            for nombre in nombres:
+                registros.setdefault(nombre, f"{prefijo}{nombre}")
+
+        elif opcode == OP_READ:
+            nombre = instr.operandos[0]
+            codigo.append(comentario("leer", nombre))
+            if es_entero(registros[nombre]):
+                codigo.append(asm("call", "leer_entero"))
+                codigo.append(asm("mv", registros[nombre], "a0"))
+            else:
+                codigo.append(asm("call", "leer_float"))
+                codigo.append(asm("fmv.s", registros[nombre], "fa0"))
+
+        elif opcode in (OP_PRINT, OP_PRINTLN, OP_WRITE):
+            nombre = instr.operandos[0]
+            texto = {OP_PRINT: 'print', OP_PRINTLN: 'println', OP_WRITE: 'escribir'}[opcode]
+            codigo.append(comentario(texto, nombre))
+            if nombre in registros and es_entero(registros[nombre]):
+                codigo.append(asm("mv", "a0", registros[nombre]))
+                codigo.append(asm("call", "imprimir_entero"))
+            elif nombre in registros:
+                codigo.append(asm("fmv.s", "fa0", registros[nombre]))
+                codigo.append(asm("call", "imprimir_float"))
+            if opcode == OP_PRINTLN:
+                codigo.append(asm("call", "imprimir_salto_linea"))
+
+        elif opcode == OP_ASIGNAR_LITERAL:
+            nombre, valor = instr.operandos[:2]
+            codigo.append(asm("li" if es_entero(registros[nombre]) else "li.s", registros[nombre], valor))
+
+        elif opcode in (OP_ASIGNAR, OP_ASIGNAR_INVARIANTE):
+            nombre, expr = instr.operandos[:2]
+            self._generar_expresion(expr, registros[nombre], registros, codigo)
+
+        elif opcode in (OP_FOR, OP_FOR_CERRADO):
+            var, inicio, fin_var = instr.operandos[:3]
+            if fin_var not in registros:
+                raise Exception(f"Variable '{fin_var}' no declarada en el for")
+            reg_var = registros[var]
             etiqueta_inicio = self.obtener_nueva_etiqueta()
             etiqueta_fin = self.obtener_nueva_etiqueta()
-
-            self.codigo_ensamblador.append(f"# Inicio del for")
-            self.codigo_ensamblador.append(f"{etiqueta_inicio}:")
-
-            fin_for = self.encontrar_fin_bloque(self.indice, "for", "endfor")
-
-            reg_fin = self.variables[fin_var]['registro']
-            reg_comp = f"ft{self.contador_temporal + 3}"
-            self.codigo_ensamblador.append(f"fle.s {reg_comp}, {reg_var}, {reg_fin}")
-            self.codigo_ensamblador.append(f"beqz {reg_comp}, {etiqueta_fin}")
-
-            while self.obtener_valor(var) <= fin:
-                indice_temp = self.indice + 1
-                while indice_temp < fin_for:
-                    self.ejecutar_linea(self.lineas[indice_temp], indice_temp + 1)
-                    indice_temp += 1
-
-                var_val = self.obtener_valor(var)
-                nueva_val = var_val + 1
-                self.asignar_valor(var, nueva_val)
-                reg_var = self.variables[var]['registro']
-                reg_uno = f"ft{self.contador_temporal + 4}"
-                self.codigo_ensamblador.append(f"li.s {reg_uno}, 1.0")
-                self.codigo_ensamblador.append(f"fadd.s {reg_var}, {reg_var}, {reg_uno}")
-
-            self.codigo_ensamblador.append(f"j {etiqueta_inicio}")
-            self.codigo_ensamblador.append(f"{etiqueta_fin}:")
-            self.codigo_ensamblador.append(f"# Fin del for")
-            self.indice = fin_for
-
-        elif linea.startswith("while"):
-            inicio_condicion = linea.find("while") + 5
-            fin_condicion = linea.find(" do")
-            if fin_condicion == -1:
-                fin_condicion = len(linea)
-            condicion = linea[inicio_condicion:fin_condicion].strip()
-
+            etiquetas[pc] = (etiqueta_inicio, etiqueta_fin)
+
+            codigo.append(asm("li" if es_entero(reg_var) else "li.s", reg_var, inicio))
+            codigo.append(comentario("Inicio del for"))
+            codigo.append(etiqueta(etiqueta_inicio))
+            self._generar_comparacion('<=', reg_var, registros[fin_var], etiqueta_fin, codigo)
+
+        elif opcode == OP_ENDFOR:
+            if instr.salto not in etiquetas:
+                return
+            reg_var = registros[instr.operandos[0]]
+            etiqueta_inicio, etiqueta_fin = etiquetas[instr.salto]
+            if es_entero(reg_var):
+                codigo.append(asm("addi", reg_var, reg_var, 1))
+            else:
+                reg_uno = self._nuevo_temporal()
+                codigo.append(asm("li.s", reg_uno, 1.0))
+                codigo.append(asm("fadd.s", reg_var, reg_var, reg_uno))
+            codigo.append(asm("j", etiqueta_inicio))
+            codigo.append(etiqueta(etiqueta_fin))
+            codigo.append(comentario("Fin del for"))
+
+        elif opcode == OP_WHILE:
             etiqueta_inicio = self.obtener_nueva_etiqueta()
             etiqueta_fin = self.obtener_nueva_etiqueta()
+            etiquetas[pc] = (etiqueta_inicio, etiqueta_fin)
 
-            self.codigo_ensamblador.append(f"# Inicio del while")
-            self.codigo_ensamblador.append(f"{etiqueta_inicio}:")
-
-            fin_while = self.encontrar_fin_bloque(self.indice, "while", "endwhile")
+            codigo.append(comentario("Inicio del while"))
+            codigo.append(etiqueta(etiqueta_inicio))
+            self._generar_condicion(instr.operandos[0].split(), etiqueta_fin, registros, codigo)
 
-            while self.evaluar_condicion(condicion):
-                tokens = condicion.split()
-                if len(tokens) == 3:
-                    var1, var2, op = tokens
-                    if var1 in self.variables and var2 in self.variables:
-                        reg1 = self.variables[var1]['registro']
-                        reg2 = self.variables[var2]['registro']
-                        reg_comp = f"ft{self.contador_temporal + 2}"
-
-                        if op == '<=':
-                            self.codigo_ensamblador.append(f"fle.s {reg_comp}, {reg1}, {reg2}")
-                        elif op == '<':
-                            self.codigo_ensamblador.append(f"flt.s {reg_comp}, {reg1}, {reg2}")
-                        elif op == '>=':
-                            self.codigo_ensamblador.append(f"fge.s {reg_comp}, {reg1}, {reg2}")
-                        elif op == '>':
-                            self.codigo_ensamblador.append(f"fgt.s {reg_comp}, {reg1}, {reg2}")
-
-                        self.codigo_ensamblador.append(f"beqz {reg_comp}, {etiqueta_fin}")
-
-                indice_temp = self.indice + 1
-                while indice_temp < fin_while:
-                    self.ejecutar_linea(self.lineas[indice_temp], indice_temp + 1)
-                    indice_temp += 1
-
-                self.codigo_ensamblador.append(f"j {etiqueta_inicio}")
-
-            self.codigo_ensamblador.append(f"{etiqueta_fin}:")
-            self.codigo_ensamblador.append(f"# Fin del while")
-            self.indice = fin_while
-
-        elif ":=" in linea:
-            nombre, expr = linea.replace(";", "").split(":=")
-            nombre = nombre.strip()
-            expr = expr.strip()
-
-            if expr.replace('.', '').replace('-', '').isdigit():
-                valor = float(expr)
-                self.asignar_valor(nombre, valor)
-                registro = self.variables[nombre]['registro']
-                self.codigo_ensamblador.append(f"li.s {registro}, {valor}")
+        elif opcode == OP_IF:
+            etiqueta_fin = self.obtener_nueva_etiqueta()
+            etiquetas[pc] = (None, etiqueta_fin)
+            codigo.append(comentario("Inicio del if"))
+            self._generar_condicion(instr.operandos[0].split(), etiqueta_fin, registros, codigo)
+
+        elif opcode == OP_ENDIF:
+            if instr.salto not in etiquetas:
+                return
+            codigo.append(etiqueta(etiquetas[instr.salto][1]))
+            codigo.append(comentario("Fin del if"))
+
+        elif opcode == OP_ENDWHILE:
+            if instr.salto not in etiquetas:
+                return
+            etiqueta_inicio, etiqueta_fin = etiquetas[instr.salto]
+            codigo.append(asm("j", etiqueta_inicio))
+            codigo.append(etiqueta(etiqueta_fin))
+            codigo.append(comentario("Fin del while"))
+
+    def _materializar(self, operando, codigo, entero=False):
+        """Devuelve el registro de un operando, cargando los literales en un temporal.
+
+        Con entero=False un registro entero se convierte a real (fcvt.s.w);
+        con entero=True el literal se carga con li, o se usa zero si vale 0.
+        """
+        if isinstance(operando, str):
+            if entero or not es_entero(operando):
+                return operando
+            registro = self._nuevo_temporal()
+            codigo.append(asm("fcvt.s.w", registro, operando))
+            return registro
+        if entero:
+            if operando == 0:
+                return "zero"
+            registro = self._nuevo_temporal(True)
+            codigo.append(asm("li", registro, int(operando)))
+            return registro
+        registro = self._nuevo_temporal()
+        codigo.append(asm("li.s", registro, operando))
+        return registro
+
+    def _generar_operacion_entera(self, token, a, b, codigo):
+        """Genera +, - o * entre registros enteros o literales enteros; addi si el literal cabe como inmediato"""
+        reg_res = self._nuevo_temporal(True)
+        if token == '+' and not isinstance(a, str):
+            a, b = b, a
+        if token in ('+', '-') and not isinstance(b, str) and abs(b) < LIMITE_INMEDIATO:
+            inmediato = int(b) if token == '+' else -int(b)
+            codigo.append(asm("addi", reg_res, a, inmediato))
+        else:
+            reg_a = self._materializar(a, codigo, True)
+            reg_b = self._materializar(b, codigo, True)
+            codigo.append(asm(INSTRUCCIONES_ENTERAS[token], reg_res, reg_a, reg_b))
+        return reg_res
+
+    def _generar_expresion(self, expresion, reg_destino, registros, codigo):
+        """Genera el código de una expresión postfija dejando el resultado en reg_destino.
+
+        Se genera desde el DAG de la expresión: las constantes llegan plegadas
+        y las subexpresiones repetidas se calculan una sola vez. Los nodos
+        enteros usan instrucciones enteras; los enteros que entran en una
+        operación real se convierten antes con fcvt.s.w.
+        """
+        dag = construir_dag(expresion)
+        if any(evento == 'falta' for evento, _ in dag.eventos):
+            raise IndexError('pop from empty list')
+        tipos = tipos_dag(dag, {nombre for nombre, registro in registros.items() if es_entero(registro)})
+
+        operandos = {}
+        for indice, nodo in enumerate(dag.nodos):
+            if nodo[0] == 'lit':
+                operandos[indice] = nodo[1]
+            elif nodo[0] == 'var':
+                if nodo[1] not in registros:
+                    raise Exception(f"Token no reconocido: {nodo[1]}")
+                operandos[indice] = registros[nodo[1]]
+            elif nodo[0] == 'op' and tipos[indice] == TIPO_ENTERO:
+                _, token, a, b = nodo
+                operandos[indice] = self._generar_operacion_entera(token, operandos[a], operandos[b], codigo)
+            elif nodo[0] == 'op':
+                _, token, a, b = nodo
+                reg_a = self._materializar(operandos[a], codigo)
+                reg_b = self._materializar(operandos[b], codigo)
+                reg_res = self._nuevo_temporal()
+                if token == '^':
+                    codigo.append(asm("fmv.s", "fa0", reg_a))
+                    codigo.append(asm("fmv.s", "fa1", reg_b))
+                    codigo.append(asm("call", "pow"))
+                    codigo.append(asm("fmv.s", reg_res, "fa0"))
+                else:
+                    codigo.append(asm(INSTRUCCIONES_ARITMETICAS[token], reg_res, reg_a, reg_b))
+                operandos[indice] = reg_res
             else:
-                valor = self.evaluar_expresion(expr, nombre)
-                self.asignar_valor(nombre, valor)
-
-        elif linea.startswith("write"):
-            nombre = linea[linea.find('(') + 1:linea.find(')')]
-            nombre = nombre.strip()
-            if nombre in self.variables:
-                valor = self.obtener_valor(nombre)
-                registro = self.variables[nombre]['registro']
-                print(f"{nombre}: {valor}")
-                self.codigo_ensamblador.append(f"# escribir {nombre} → valor {valor}")
+                reg_a = self._materializar(operandos[nodo[2]], codigo)
+                reg_res = self._nuevo_temporal()
+                codigo.append(asm("fmv.s", "fa0", reg_a))
+                codigo.append(asm("call", nodo[1]))
+                codigo.append(asm("fmv.s", reg_res, "fa0"))
+                operandos[indice] = reg_res
+
+        resultado = operandos[dag.raiz] if dag.raiz is not None else 0.0
+        if es_entero(reg_destino):
+            if isinstance(resultado, str) and es_entero(resultado):
+                codigo.append(asm("mv", reg_destino, resultado))
+            elif not isinstance(resultado, str) and es_literal_entero(resultado):
+                codigo.append(asm("li", reg_destino, int(resultado)))
             else:
-                print(nombre)
-
-        elif linea.lower() in ["endfor", "endwhile"]:
-            pass
+                raise Exception(f"Tipos incompatibles: {reg_destino} no puede recibir un valor real")
+        elif isinstance(resultado, str) and es_entero(resultado):
+            codigo.append(asm("fcvt.s.w", reg_destino, resultado))
+        elif isinstance(resultado, str):
+            codigo.append(asm("fmv.s", reg_destino, resultado))
+        else:
+            codigo.append(asm("li.s", reg_destino, resultado))
+
+    def _generar_comparacion(self, op, a, b, etiqueta_fin, codigo):
+        """Salta a etiqueta_fin si 'a op b' es falsa; a y b son registros o literales.
+
+        Entre enteros (o un entero y un literal entero) salta directamente con
+        blt, bge, beq o bne; si no, compara en punto flotante.
+        """
+        if (any(isinstance(x, str) for x in (a, b))
+                and all(es_entero(x) if isinstance(x, str) else es_literal_entero(x) for x in (a, b))):
+            mnemonico, invertir = SALTOS_SI_FALSA[op]
+            reg1 = self._materializar(a, codigo, True)
+            reg2 = self._materializar(b, codigo, True)
+            if invertir:
+                reg1, reg2 = reg2, reg1
+            codigo.append(asm(mnemonico, reg1, reg2, etiqueta_fin))
+            return
+        reg1 = self._materializar(a, codigo)
+        reg2 = self._materializar(b, codigo)
+        codigo.append(asm(INSTRUCCIONES_COMPARACION[op], REGISTRO_COMPARACION, reg1, reg2))
+        codigo.append(asm("beqz", REGISTRO_COMPARACION, etiqueta_fin))
+
+    def _generar_condicion(self, tokens, etiqueta_fin, registros, codigo):
+        """Genera la comparación de una condición y el salto a etiqueta_fin si es falsa"""
+        if len(tokens) != 3 or tokens[2] not in INSTRUCCIONES_COMPARACION:
+            codigo.append(asm("j", etiqueta_fin))
+            return
+
+        var1, var2, op = tokens
+        self._generar_comparacion(op, registros[var1] if var1 in registros else float(var1),
+                                  registros[var2] if var2 in registros else float(var2), etiqueta_fin, codigo)
 
     def mostrar_tabla_simbolos(self):
         """Muestra la tabla de símbolos"""
@@ -423,30 +2856,632 @@ class InterpreteUnificado:
 
     def mostrar_codigo_ensamblador(self):
         """Muestra el código ensamblador generado"""
+        if not self.generar_ensamblador:
+            return
+        sumidero = self.sumidero_ensamblador
+        if sumidero is not None and not isinstance(sumidero, SumideroLista):
+            print(f"\n--- Código ensamblador escrito en {sumidero.nombre} ---")
+            return
         print("\n--- Código ensamblador generado ---")
         for linea in self.codigo_ensamblador:
             print(linea)
-
-    def ejecutar(self, codigo):
-        """Ejecuta el programa completo"""
-        self.lineas = [line.strip() for line in codigo.strip().split('\n') if line.strip()]
-        self.indice = 0
-
+        if self.estadisticas_ensamblador:
+            print(f"\nInstrucciones: {self.estadisticas_ensamblador['antes']} antes de optimizar, "
+                  f"{self.estadisticas_ensamblador['despues']} después")
+
+    def ejecutar_instrucciones(self, tiempo_limite=None, perfil=None, inicio=0, fin=None):
+        """Ejecuta las instrucciones compiladas; devuelve el mensaje de error o None.
+
+        Con un Perfil se usa un ciclo aparte que mide cada instrucción; sin
+        él, el ciclo normal no paga ningún costo por el perfilado. inicio y
+        fin limitan la ejecución a un tramo de sentencias completas.
+
+        Con un Presupuesto (o tiempo_limite, que reemplaza su tiempo) se usa
+        otro ciclo que lleva la cuenta de las sentencias y consulta el reloj
+        sólo cada CONSULTAR_RELOJ_CADA instrucciones; al agotarse se detiene
+        con PresupuestoExcedido en la línea que estaba por ejecutar.
+        """
+        salida = self.salida if self.salida is not None else sys.stdout
+        self.escribir = salida.write
+
+        presupuesto = self.presupuesto
+        if tiempo_limite is None and presupuesto is not None:
+            tiempo_limite = presupuesto.tiempo
+        limite_sentencias = presupuesto.sentencias if presupuesto is not None else None
+
+        instrucciones = self.instrucciones
+        despacho = self._despacho_con_presupuesto()
+        total = len(instrucciones) if fin is None else fin
+        self.invariantes = {}
+        self._asegurar_capacidad()
+        pc = inicio
+        try:
+            if perfil is not None:
+                por_linea = (self.ensamblador_por_linea
+                             if len(self.ensamblador_por_linea) == len(instrucciones) else None)
+                perfil.preparar(self.lineas, instrucciones, por_linea)
+                conteos, tiempos, evaluaciones = perfil.conteos, perfil.tiempos, perfil.evaluaciones
+                reloj = time.perf_counter_ns
+                plazo = None if tiempo_limite is None else reloj() + int(tiempo_limite * 1e9)
+                ejecutadas = 0
+                while pc < total:
+                    if limite_sentencias is not None and ejecutadas >= limite_sentencias:
+                        raise PresupuestoExcedido('sentencias', limite_sentencias, pc + 1)
+                    ejecutadas += 1
+                    instr = instrucciones[pc]
+                    opcode = instr.opcode
+                    antes = reloj()
+                    siguiente = despacho[opcode](instr, pc)
+                    despues = reloj()
+                    tiempos[pc] += despues - antes
+                    conteos[pc] += 1
+                    if opcode in OPCODES_QUE_EVALUAN:
+                        evaluaciones[pc] += 1
+                    if opcode in OPCODES_CICLO:
+                        self._contar_iteracion(instr, pc, siguiente, perfil.ciclos)
+                    pc = siguiente
+                    if plazo is not None and despues > plazo:
+                        raise TiempoLimiteExcedido(tiempo_limite, pc + 1)
+            elif tiempo_limite is None and limite_sentencias is None:
+                while pc < total:
+                    instr = instrucciones[pc]
+                    pc = despacho[instr.opcode](instr, pc)
+            else:
+                # Sólo se compara un contador; el reloj se consulta en los controles
+                plazo = None if tiempo_limite is None else time.monotonic() + tiempo_limite
+                paso = CONSULTAR_RELOJ_CADA if plazo is not None else math.inf
+                limite = limite_sentencias if limite_sentencias is not None else math.inf
+                contador = 0
+                control = min(paso, limite)
+                while pc < total:
+                    if contador >= control:
+                        if contador >= limite:
+                            raise PresupuestoExcedido('sentencias', limite_sentencias, pc + 1)
+                        if time.monotonic() > plazo:
+                            raise TiempoLimiteExcedido(tiempo_limite, pc + 1)
+                        control = min(contador + paso, limite)
+                    instr = instrucciones[pc]
+                    pc = despacho[instr.opcode](instr, pc)
+                    contador += 1
+        except Exception as e:
+            self.indice = pc
+            return f"Error en línea {pc + 1}: {e}"
+        finally:
+            if perfil is not None:
+                perfil.finalizar()
+        self.indice = pc
+        return None
+
+    def _despacho_con_presupuesto(self):
+        """Tabla de despacho de una ejecución: con límite de iteraciones, los ciclos las cuentan"""
+        presupuesto = self.presupuesto
+        if presupuesto is None or presupuesto.iteraciones is None:
+            return self.despacho
+
+        limite = presupuesto.iteraciones
+        iteraciones = 0
+        despacho = list(self.despacho)
+
+        def contando(ejecutar, es_cierre):
+            def manejador(instr, pc):
+                nonlocal iteraciones
+                siguiente = ejecutar(instr, pc)
+                if siguiente == (instr.salto + 1 if es_cierre else pc + 1):
+                    iteraciones += 1
+                    if iteraciones > limite:
+                        raise PresupuestoExcedido('iteraciones', limite, pc + 1)
+                return siguiente
+            return manejador
+
+        for opcode in (OP_FOR, OP_FOR_CERRADO, OP_WHILE):
+            despacho[opcode] = contando(despacho[opcode], False)
+        for opcode in (OP_ENDFOR, OP_ENDWHILE):
+            despacho[opcode] = contando(despacho[opcode], True)
+        return despacho
+
+    def _contar_iteracion(self, instr, pc, siguiente, ciclos):
+        """Actualiza entradas e iteraciones del ciclo tras ejecutar su cabecera o su cierre"""
+        opcode = instr.opcode
+        if opcode in (OP_ENDFOR, OP_ENDWHILE):
+            if siguiente == instr.salto + 1:
+                ciclos[instr.salto][1] += 1
+            return
+        ciclo = ciclos[pc]
+        ciclo[0] += 1
+        if siguiente == pc + 1:
+            ciclo[1] += 1
+        elif opcode == OP_FOR_CERRADO and pc in self.bucles_activos:
+            # Forma cerrada: el cuerpo no se ejecutó, pero cuenta como iterado
+            ciclo[1] += max(0, math.floor(self.bucles_activos[pc] - instr.operandos[1]) + 1)
+
+    def ejecutar(self, codigo, perfil=None, validar=False):
+        """Ejecuta el programa completo.
+
+        Con perfil=True (o un Perfil ya creado, por ejemplo con ganchos) se
+        perfila la ejecución y se muestra el reporte al final; devuelve el perfil.
+        Con validar=True antes se revisa todo el programa y, si hay errores,
+        se muestran todos juntos sin ejecutar ninguna sentencia.
+        """
+        if perfil is True:
+            perfil = Perfil()
+        if validar:
+            diagnosticos = validar_codigo(codigo)
+            if diagnosticos:
+                print(f"Validación: {len(diagnosticos)} errores, no se ejecutó ninguna sentencia")
+                for diagnostico in diagnosticos:
+                    print(f"  {diagnostico}")
+                return perfil
         print("Ejecutando el programa...")
         print("=" * 40)
 
-        while self.indice < len(self.lineas):
-            try:
-                self.ejecutar_linea(self.lineas[self.indice], self.indice + 1)
-                self.indice += 1
-            except Exception as e:
-                print(f"Error en línea {self.indice + 1}: {e}")
+        try:
+            self.compilar_codigo(codigo)
+        except Exception as e:
+            print(f"Error: {e}")
+            print("\n--- Fin del programa ---")
+            self.mostrar_tabla_simbolos()
+            return perfil
+        try:
+            self.generar_codigo()
+        except PresupuestoExcedido as e:
+            print(f"Error en línea {e.linea}: {e}")
+        else:
+            error = self.ejecutar_instrucciones(perfil=perfil)
+            if error:
+                print(error)
                 print(f"Línea: {self.lineas[self.indice]}")
-                break
 
         print("\n--- Fin del programa ---")
         self.mostrar_tabla_simbolos()
         self.mostrar_codigo_ensamblador()
+        if perfil is not None:
+            print("\n--- Perfil de ejecución ---")
+            print(perfil.tabla())
+        return perfil
+
+    def ejecutar_programa(self, codigo, mostrar=False, generar_ensamblador=True, tiempo_limite=None,
+                          perfil=None, validar=False):
+        """Ejecuta el programa sin usar la terminal y devuelve un ResultadoEjecucion.
+
+        codigo puede ser código fuente o un ProgramaCompilado. La salida va al
+        objeto 'salida' del intérprete (cualquier objeto con write) o, si no
+        se indicó, a un buffer que se devuelve en el resultado. Con
+        mostrar=True además se imprimen la tabla de símbolos y el código.
+        Si se pasa un Perfil, se llena con los datos de la ejecución.
+        Con validar=True el código fuente se valida antes y, si hay
+        diagnósticos, se devuelven todos como errores sin ejecutar nada.
+        """
+        if validar and not isinstance(codigo, ProgramaCompilado):
+            diagnosticos = validar_codigo(codigo)
+            if diagnosticos:
+                errores = [f"Error en línea {d.linea}: {d.mensaje}" for d in diagnosticos]
+                return ResultadoEjecucion("" if self.salida is None else None, {}, None, errores)
+
+        buffer = None
+        if self.salida is None:
+            buffer = []
+            self.salida = _SalidaLista(buffer)
+
+        errores = []
+        try:
+            if isinstance(codigo, ProgramaCompilado):
+                self.cargar_programa(codigo)
+            else:
+                self.compilar_codigo(codigo)
+        except Exception as e:
+            errores.append(f"Error: {e}")
+        else:
+            try:
+                if generar_ensamblador and not (isinstance(codigo, ProgramaCompilado) and codigo.ensamblador):
+                    self.generar_codigo()
+            except PresupuestoExcedido as e:
+                errores.append(f"Error en línea {e.linea}: {e}")
+            else:
+                error = self.ejecutar_instrucciones(tiempo_limite, perfil)
+                if error:
+                    errores.append(error)
+
+        if buffer is not None:
+            self.salida = None
+
+        if mostrar:
+            self.mostrar_tabla_simbolos()
+            self.mostrar_codigo_ensamblador()
+
+        variables = {nombre: info['valor'] for nombre, info in self.variables.items()}
+        return ResultadoEjecucion("".join(buffer) if buffer is not None else None,
+                                  variables, self.codigo_ensamblador, errores)
+
+    async def ejecutar_instrucciones_asincrono(self, entrada, salida, ceder_cada=CEDER_CADA, tiempo_limite=None):
+        """Versión asíncrona de ejecutar_instrucciones; devuelve el mensaje de error o None.
+
+        read() espera a 'entrada' (una función asíncrona que recibe el
+        mensaje) y la salida se acumula y se entrega a 'salida' antes de cada
+        lectura, al ceder y al terminar. Cada ceder_cada instrucciones se
+        cede el control al ciclo de eventos, así muchas sesiones comparten
+        un solo hilo. El Presupuesto del intérprete se respeta igual que en
+        ejecutar_instrucciones; el reloj se consulta al ceder.
+        """
+        pendiente = []
+        self.escribir = pendiente.append
+
+        async def vaciar():
+            if pendiente:
+                texto = "".join(pendiente)
+                pendiente.clear()
+                await escribir_asincrono(salida, texto)
+
+        presupuesto = self.presupuesto
+        if tiempo_limite is None and presupuesto is not None:
+            tiempo_limite = presupuesto.tiempo
+        limite = presupuesto.sentencias if presupuesto is not None and presupuesto.sentencias is not None else math.inf
+
+        instrucciones = self.instrucciones
+        despacho = self._despacho_con_presupuesto()
+        total = len(instrucciones)
+        self.invariantes = {}
+        self._asegurar_capacidad()
+        plazo = None if tiempo_limite is None else time.monotonic() + tiempo_limite
+        pc = 0
+        contador = 0
+        ejecutadas = 0
+        try:
+            while pc < total:
+                if ejecutadas >= limite:
+                    raise PresupuestoExcedido('sentencias', limite, pc + 1)
+                ejecutadas += 1
+                instr = instrucciones[pc]
+                if instr.opcode == OP_READ:
+                    nombre = instr.operandos[0]
+                    mensaje = self._mensaje_lectura(nombre)
+                    await vaciar()
+                    self._asignar_lectura(nombre, await entrada(mensaje))
+                    pc += 1
+                else:
+                    pc = despacho[instr.opcode](instr, pc)
+                contador += 1
+                if contador >= ceder_cada:
+                    contador = 0
+                    await vaciar()
+                    await asyncio.sleep(0)
+                    if plazo is not None and time.monotonic() > plazo:
+                        raise TiempoLimiteExcedido(tiempo_limite, pc + 1)
+        except Exception as e:
+            self.indice = pc
+            return f"Error en línea {pc + 1}: {e}"
+        finally:
+            await vaciar()
+        self.indice = pc
+        return None
+
+    async def ejecutar_programa_asincrono(self, codigo, entrada, salida=None, ceder_cada=CEDER_CADA,
+                                          tiempo_limite=None):
+        """Como ejecutar_programa, pero con read() asíncrono y sin generar ensamblador.
+
+        entrada es una función asíncrona, un asyncio.StreamReader o
+        cualquier entrada que acepte crear_lector. salida puede tener un
+        write común o asíncrono, o ser un asyncio.StreamWriter; sin salida
+        el texto se devuelve en el resultado.
+        """
+        buffer = None
+        if salida is None:
+            buffer = []
+            salida = _SalidaLista(buffer)
+
+        errores = []
+        try:
+            if isinstance(codigo, ProgramaCompilado):
+                self.cargar_programa(codigo)
+            else:
+                self.compilar_codigo(codigo)
+        except Exception as e:
+            errores.append(f"Error: {e}")
+        else:
+            error = await self.ejecutar_instrucciones_asincrono(crear_lector_asincrono(entrada), salida,
+                                                                ceder_cada, tiempo_limite)
+            if error:
+                errores.append(error)
+
+        variables = {nombre: info['valor'] for nombre, info in self.variables.items()}
+        return ResultadoEjecucion("".join(buffer) if buffer is not None else None, variables, None, errores)
+
+
+class _SalidaLista:
+    """Sumidero de salida que acumula los fragmentos en una lista"""
+    __slots__ = ('write',)
+
+    def __init__(self, lista):
+        self.write = lista.append
+
+
+def ejecutar_programa(codigo, entradas=(), salida=None, mostrar=False,
+                      generar_ensamblador=True, tiempo_limite=None, optimizar=False, perfil=None,
+                      sumidero_ensamblador=None, presupuesto=None, validar=False):
+    """Ejecuta un programa como biblioteca: sin input() ni impresión en terminal"""
+    interprete = InterpreteUnificado(entrada=entradas, salida=salida, optimizar=optimizar,
+                                     sumidero_ensamblador=sumidero_ensamblador, presupuesto=presupuesto)
+    return interprete.ejecutar_programa(codigo, mostrar, generar_ensamblador, tiempo_limite, perfil, validar)
+
+
+async def ejecutar_programa_asincrono(codigo, entrada, salida=None, ceder_cada=CEDER_CADA, tiempo_limite=None,
+                                     optimizar=False, presupuesto=None):
+    """Ejecuta un programa dentro de un ciclo de eventos de asyncio; devuelve un ResultadoEjecucion"""
+    interprete = InterpreteUnificado(optimizar=optimizar, generar_ensamblador=False, presupuesto=presupuesto)
+    return await interprete.ejecutar_programa_asincrono(codigo, entrada, salida, ceder_cada, tiempo_limite)
+
+
+def compilar_programa(codigo, incluir_ensamblador=True, optimizar=False, presupuesto=None):
+    """Compila el código fuente a un ProgramaCompilado reutilizable"""
+    interprete = InterpreteUnificado(optimizar=optimizar, presupuesto=presupuesto)
+    interprete.compilar_codigo(codigo)
+    if incluir_ensamblador:
+        interprete.generar_codigo()
+    return interprete.exportar_programa(incluir_ensamblador)
+
+
+def separar_declaracion(linea):
+    """(nombres, tipo) de una línea 'var a, b : integer;'; sin ': tipo' las variables son real"""
+    nombres, dos_puntos, tipo = linea.replace(";", "")[3:].partition(':')
+    tipo = tipo.strip().lower() if dos_puntos else TIPO_REAL
+    if tipo not in TIPOS:
+        raise Exception(f"Tipo no reconocido: '{tipo}' (se espera {' o '.join(TIPOS)})")
+    return [nombre for nombre in nombres.replace(',', ' ').split()], tipo
+
+
+def tipos_declarados(lineas):
+    """Tipo de cada variable según la primera línea var que la declara"""
+    tipos = {}
+    for linea in lineas:
+        if linea.startswith("var"):
+            try:
+                nombres, tipo = separar_declaracion(linea)
+            except Exception:
+                continue
+            for nombre in nombres:
+                tipos.setdefault(nombre, tipo)
+    return tipos
+
+
+def emparejar_bloques(lineas):
+    """Empareja cada cabecera de bloque con su cierre.
+
+    Devuelve la tabla {línea de la cabecera: línea del cierre}, con índices
+    desde 0, y la lista de Diagnostico de los bloques desbalanceados.
+    """
+    tabla = {}
+    pila = []
+    errores = []
+
+    for i, linea in enumerate(lineas):
+        palabras = linea.lower().replace(';', ' ').split()
+        palabra = palabras[0] if palabras else ''
+
+        if palabra in CIERRES_BLOQUE:
+            pila.append((palabra, i))
+        elif palabra in APERTURAS_BLOQUE:
+            if not pila:
+                errores.append(Diagnostico(i + 1, f"'{palabra}' sin '{APERTURAS_BLOQUE[palabra]}' correspondiente"))
+                continue
+            apertura, inicio = pila.pop()
+            if CIERRES_BLOQUE[apertura] != palabra:
+                errores.append(Diagnostico(i + 1, f"se esperaba '{CIERRES_BLOQUE[apertura]}' para cerrar "
+                                                  f"'{apertura}' de la línea {inicio + 1}, se encontró '{palabra}'"))
+                continue
+            tabla[inicio] = i
+
+    for apertura, inicio in pila:
+        errores.append(Diagnostico(inicio + 1, f"'{apertura}' sin '{CIERRES_BLOQUE[apertura]}'"))
+
+    errores.sort(key=lambda diagnostico: diagnostico.linea)
+    return tabla, errores
+
+
+def problema_postfija(expresion):
+    """Describe por qué una expresión postfija no deja exactamente un valor en la pila, o None"""
+    if not expresion.split():
+        return "Expresión vacía"
+    profundidad = 0
+    for token in expresion.split():
+        if token in OPERADORES_PYTHON:
+            if profundidad < 2:
+                return f"Expresión inválida: al operador '{token}' le faltan operandos en '{expresion}'"
+            profundidad -= 1
+        elif token.lower() in FUNCIONES:
+            if profundidad < 1:
+                return f"Expresión inválida: a la función '{token}' le falta el argumento en '{expresion}'"
+        else:
+            profundidad += 1
+    if profundidad != 1:
+        return f"Expresión inválida: quedan {profundidad} valores sin operar en '{expresion}'"
+    return None
+
+
+def validar_codigo(codigo):
+    """Valida un programa completo sin ejecutarlo; devuelve la lista de Diagnostico"""
+    interprete = InterpreteUnificado(generar_ensamblador=False)
+    interprete.lineas = [linea.strip() for linea in codigo.strip().split('\n') if linea.strip()]
+    return interprete.validar()
+
+
+def limites_sentencias(lineas):
+    """Líneas donde empieza cada sentencia de nivel superior.
+
+    Devuelve la lista de comienzos seguida del final de la última sentencia
+    completa; si al final queda un bloque abierto, sus líneas no se cuentan.
+    """
+    limites = [0]
+    profundidad = 0
+    for i, linea in enumerate(lineas):
+        palabras = linea.lower().replace(';', ' ').split()
+        palabra = palabras[0] if palabras else ''
+        if palabra in CIERRES_BLOQUE:
+            profundidad += 1
+        elif palabra in APERTURAS_BLOQUE:
+            profundidad = max(0, profundidad - 1)
+        if profundidad == 0:
+            limites.append(i + 1)
+    return limites
+
+
+class _Instantanea:
+    """Estado del intérprete antes de una sentencia de nivel superior"""
+    __slots__ = ('valores', 'estado', 'simbolos', 'declaradas', 'salida', 'entradas')
+
+    def __init__(self, interprete, salida, entradas):
+        self.valores = list(interprete.valores)
+        self.estado = bytes(interprete.estado)
+        self.simbolos = list(interprete.simbolos)
+        self.declaradas = list(interprete.declaradas)
+        self.salida = salida
+        self.entradas = entradas
+
+    def restaurar(self, interprete):
+        interprete.valores[:] = self.valores
+        interprete.estado[:] = self.estado
+        interprete.simbolos[:] = self.simbolos
+        interprete.declaradas[:] = self.declaradas
+
+
+class SesionIncremental:
+    """Sesión interactiva que recompila y vuelve a ejecutar sólo desde el primer cambio.
+
+    Cada sentencia de nivel superior se ejecuta apenas está completa y antes
+    de ejecutarla se guarda una instantánea del estado. Al agregar, editar o
+    borrar líneas se conservan las instrucciones compiladas de las sentencias
+    anteriores al cambio, se restaura la instantánea de la sentencia donde
+    está el cambio y se sigue desde ahí. Los valores ya ingresados con read()
+    se vuelven a usar en el mismo orden; sólo se piden los que faltan.
+    """
+
+    def __init__(self, entrada=None, eco=None, optimizar=False):
+        self.leer = crear_lector(entrada) or input
+        self.eco = eco
+        self.lineas = []
+        self.salida = []
+        self.entradas = []
+        self.posicion_entrada = 0
+        # Si el último read() tomó un valor guardado en self.entradas
+        self.ultima_guardada = False
+        self.limites = [0]
+        self.instantaneas = []
+        self.ejecutadas = 0
+        self.error = None
+        self.interprete = InterpreteUnificado(entrada=self._leer, salida=self, optimizar=optimizar)
+
+    def write(self, texto):
+        self.salida.append(texto)
+        if self.eco is not None:
+            self.eco.write(texto)
+
+    def _leer(self, mensaje=''):
+        if self.posicion_entrada < len(self.entradas):
+            valor = self.entradas[self.posicion_entrada]
+        else:
+            valor = self.leer(mensaje)
+            try:
+                float(valor)
+            except ValueError:
+                # Un valor inválido no se guarda: la próxima vez se vuelve a pedir
+                self.ultima_guardada = False
+                return valor
+            self.entradas.append(valor)
+        self.posicion_entrada += 1
+        self.ultima_guardada = True
+        return valor
+
+    @property
+    def texto_salida(self):
+        return "".join(self.salida)
+
+    @property
+    def variables(self):
+        return self.interprete.variables
+
+    def agregar(self, linea):
+        return self.cambiar(self.lineas + [linea])
+
+    def reemplazar(self, numero, linea):
+        """Reemplaza la línea 'numero' (desde 1)"""
+        self._verificar_numero(numero)
+        return self.cambiar(self.lineas[:numero - 1] + [linea] + self.lineas[numero:])
+
+    def insertar(self, numero, linea):
+        """Inserta una línea para que quede con el número 'numero' (desde 1)"""
+        if not 1 <= numero <= len(self.lineas) + 1:
+            raise Exception(f"No existe la línea {numero}")
+        return self.cambiar(self.lineas[:numero - 1] + [linea] + self.lineas[numero - 1:])
+
+    def borrar(self, numero):
+        self._verificar_numero(numero)
+        return self.cambiar(self.lineas[:numero - 1] + self.lineas[numero:])
+
+    def _verificar_numero(self, numero):
+        if not 1 <= numero <= len(self.lineas):
+            raise Exception(f"No existe la línea {numero}")
+
+    def cambiar(self, lineas):
+        """Pasa a las líneas dadas y ejecuta lo que haga falta.
+
+        Devuelve el número de línea desde donde se volvió a ejecutar, o None
+        si no se ejecutó nada (por ejemplo, si quedó un bloque abierto).
+        """
+        self.lineas = [linea.strip() for linea in lineas if linea.strip()]
+        interprete = self.interprete
+        anteriores = interprete.lineas
+        limites = limites_sentencias(self.lineas)
+        completas = limites[-1]
+
+        # Primera sentencia ya compilada que cambió (o que no llegó a ejecutarse bien)
+        cambio = 0
+        maximo = min(len(anteriores), completas)
+        while cambio < maximo and anteriores[cambio] == self.lineas[cambio]:
+            cambio += 1
+        sentencia = min(bisect.bisect_right(self.limites, cambio) - 1, self.ejecutadas)
+        desde = self.limites[sentencia]
+        if desde == completas and len(anteriores) == completas and self.error is None:
+            return None
+
+        interprete.lineas = self.lineas[:completas]
+        try:
+            interprete.compilar(desde)
+        except Exception as e:
+            interprete.lineas = anteriores[:desde]
+            interprete.instrucciones = interprete.instrucciones[:desde]
+            self.limites = self.limites[:sentencia + 1]
+            self._restaurar(sentencia)
+            self.error = f"Error: {e}"
+            return None
+
+        self.limites = limites
+        self._restaurar(sentencia)
+        self._ejecutar_desde(sentencia)
+        return desde + 1
+
+    def _restaurar(self, sentencia):
+        if sentencia < len(self.instantaneas):
+            instantanea = self.instantaneas[sentencia]
+            instantanea.restaurar(self.interprete)
+            del self.salida[instantanea.salida:]
+            self.posicion_entrada = instantanea.entradas
+            del self.instantaneas[sentencia:]
+        self.ejecutadas = sentencia
+        self.error = None
+
+    def _ejecutar_desde(self, sentencia):
+        interprete = self.interprete
+        limites = self.limites
+        for k in range(sentencia, len(limites) - 1):
+            self.instantaneas.append(_Instantanea(interprete, len(self.salida), self.posicion_entrada))
+            error = interprete.ejecutar_instrucciones(inicio=limites[k], fin=limites[k + 1])
+            if error:
+                if error.endswith("Valor inválido ingresado") and self.ultima_guardada:
+                    # Tampoco se guarda un número que la variable no acepta (7.5 para un integer)
+                    self.posicion_entrada -= 1
+                    del self.entradas[self.posicion_entrada]
+                self.error = error
+                return
+            self.ejecutadas = k + 1
+        self.instantaneas.append(_Instantanea(interprete, len(self.salida), self.posicion_entrada))
 
 
 # EJEMPLOS DE PRUEBA INTERACTIVOS
@@ -491,6 +3526,18 @@ var x;"""
     except Exception as e:
         print(f" Error capturado: {e}")
 
+    # Validación estática: todos los errores antes de ejecutar
+    print("\n3. Validación de todo el programa antes de ejecutar:")
+    interprete3 = InterpreteUnificado()
+    codigo_varios = """var x, y;
+x := 5
+y := x sen;
+for i := 1 to y do
+z := x y + +;
+endfor"""
+    print("Código:", codigo_varios)
+    interprete3.ejecutar(codigo_varios, validar=True)
+
 
 def programa_basico():
     print("\n PROGRAMA CON READ() - OPERACIONES BÁSICAS")
@@ -634,20 +3681,50 @@ endif"""
 
 def codigo_personalizado():
     print("\n️ CÓDIGO PERSONALIZADO")
-    print("Ingresa tu código línea por línea. Escribe 'FIN' para terminar:")
+    print("Ingresa tu código línea por línea; cada sentencia se ejecuta apenas está completa.")
+    print("Comandos: ':lista', ':editar N línea', ':insertar N línea', ':borrar N'. Escribe 'FIN' para terminar:")
 
-    lineas = []
+    sesion = SesionIncremental(eco=sys.stdout)
+    error_mostrado = None
     while True:
         linea = input(">>> ")
         if linea.upper() == "FIN":
             break
-        lineas.append(linea)
 
-    codigo = "\n".join(lineas)
-    print("\nEjecutando código personalizado...")
-
-    interprete = InterpreteUnificado()
-    interprete.ejecutar(codigo)
+        comando, _, resto = linea.partition(' ')
+        try:
+            if comando == ':lista':
+                for numero, texto in enumerate(sesion.lineas, 1):
+                    print(f"{numero:>4}  {texto}")
+                continue
+            elif comando in (':editar', ':insertar', ':borrar'):
+                numero, _, texto = resto.strip().partition(' ')
+                if comando == ':borrar':
+                    desde = sesion.borrar(int(numero))
+                elif comando == ':editar':
+                    desde = sesion.reemplazar(int(numero), texto)
+                else:
+                    desde = sesion.insertar(int(numero), texto)
+                if desde is not None and desde <= len(sesion.lineas):
+                    print(f"(se volvió a ejecutar desde la línea {desde})")
+            else:
+                sesion.agregar(linea)
+        except ValueError:
+            print(" Número de línea inválido")
+        except Exception as e:
+            print(f" {e}")
+
+        if sesion.error and sesion.error != error_mostrado:
+            print(sesion.error)
+        error_mostrado = sesion.error
+
+    if sesion.limites[-1] < len(sesion.lineas):
+        print("Las últimas líneas forman un bloque sin cerrar y no se ejecutaron")
+    print("\n--- Fin del programa ---")
+    interprete = sesion.interprete
+    interprete.mostrar_tabla_simbolos()
+    interprete.generar_codigo()
+    interprete.mostrar_codigo_ensamblador()
 
 
 if __name__ == "__main__":
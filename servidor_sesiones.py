@@ -0,0 +1,146 @@
+"""Servidor de sesiones interactivas sobre asyncio.
+
+Cada conexión es una sesión: el cliente envía las líneas del programa y
+termina con una línea FIN; el programa se ejecuta y cada read() le pide el
+valor al cliente, que responde con una línea. Al terminar se envían los
+errores y las variables, y se cierra la conexión. Todas las sesiones
+comparten un solo ciclo de eventos: las que esperan una entrada no ocupan
+el hilo, los ciclos largos ceden el control cada cierto número de
+instrucciones y los programas nuevos se compilan en un hilo aparte.
+
+Uso desde la línea de comandos:
+
+    python servidor_sesiones.py --puerto 8765
+    python servidor_sesiones.py --stdio < programa_y_entradas.txt
+"""
+import argparse
+import asyncio
+import hashlib
+import sys
+
+from interpretepascal import (
+    CEDER_CADA,
+    InterpreteUnificado,
+    Presupuesto,
+    ResultadoEjecucion,
+    compilar_programa,
+    escribir_asincrono,
+)
+
+
+# Programas compilados compartidos por todas las sesiones, por hash del código
+TAMANO_CACHE_PROGRAMAS = 256
+
+_PROGRAMAS = {}
+
+
+async def programa_compartido(codigo):
+    """ProgramaCompilado para el código; si no compila, lanza el error de compilación.
+
+    La compilación corre en un hilo aparte: un programa grande no detiene
+    el ciclo de eventos ni a las demás sesiones.
+    """
+    clave = hashlib.sha256(codigo.encode('utf-8')).hexdigest()
+    programa = _PROGRAMAS.get(clave)
+    if programa is not None:
+        return programa
+    bucle = asyncio.get_running_loop()
+    programa = await bucle.run_in_executor(None, compilar_programa, codigo, False)
+    if len(_PROGRAMAS) >= TAMANO_CACHE_PROGRAMAS:
+        del _PROGRAMAS[next(iter(_PROGRAMAS))]
+    _PROGRAMAS[clave] = programa
+    return programa
+
+
+async def leer_programa(lector):
+    """Lee líneas hasta FIN (o el fin del flujo) y devuelve el código fuente"""
+    lineas = []
+    while True:
+        linea = await lector.readline()
+        if not linea:
+            break
+        linea = linea.decode('utf-8').rstrip('\r\n')
+        if linea.strip().upper() == 'FIN':
+            break
+        lineas.append(linea)
+    return "\n".join(lineas)
+
+
+async def atender_sesion(lector, salida, ceder_cada=CEDER_CADA, tiempo_limite=None, presupuesto=None):
+    """Ejecuta una sesión completa: programa, lecturas interactivas y resumen final"""
+    codigo = await leer_programa(lector)
+
+    async def entrada(mensaje):
+        await escribir_asincrono(salida, mensaje)
+        linea = await lector.readline()
+        if not linea:
+            raise Exception("No hay más valores de entrada")
+        return linea.decode('utf-8')
+
+    try:
+        programa = await programa_compartido(codigo)
+    except Exception as e:
+        # El mismo resultado que da ejecutar_programa_asincrono cuando el código no compila
+        resultado = ResultadoEjecucion(None, {}, None, [f"Error: {e}"])
+    else:
+        interprete = InterpreteUnificado(generar_ensamblador=False, presupuesto=presupuesto)
+        resultado = await interprete.ejecutar_programa_asincrono(programa, entrada, salida, ceder_cada,
+                                                                 tiempo_limite)
+    resumen = [f"{error}\n" for error in resultado.errores]
+    resumen.extend(f"{nombre} = {valor}\n" for nombre, valor in resultado.variables.items())
+    await escribir_asincrono(salida, "".join(resumen))
+    return resultado
+
+
+async def servir(anfitrion='127.0.0.1', puerto=8765, ceder_cada=CEDER_CADA, tiempo_limite=None, presupuesto=None):
+    """Atiende sesiones por TCP hasta que se cancela la tarea"""
+    async def conexion(lector, escritor):
+        try:
+            await atender_sesion(lector, escritor, ceder_cada, tiempo_limite, presupuesto)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    servidor = await asyncio.start_server(conexion, anfitrion, puerto)
+    async with servidor:
+        await servidor.serve_forever()
+
+
+async def servir_stdio(ceder_cada=CEDER_CADA, tiempo_limite=None, presupuesto=None):
+    """Una sola sesión sobre la entrada y salida estándar"""
+    lector = asyncio.StreamReader()
+    bucle = asyncio.get_running_loop()
+    await bucle.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(lector), sys.stdin)
+    resultado = await atender_sesion(lector, sys.stdout, ceder_cada, tiempo_limite, presupuesto)
+    sys.stdout.flush()
+    return resultado
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Servidor de sesiones del intérprete Pascal")
+    parser.add_argument('--anfitrion', default='127.0.0.1', help="dirección en la que escuchar")
+    parser.add_argument('--puerto', type=int, default=8765, help="puerto TCP")
+    parser.add_argument('--stdio', action='store_true', help="atender una sola sesión por stdin/stdout")
+    parser.add_argument('--ceder-cada', type=int, default=CEDER_CADA,
+                        help="instrucciones ejecutadas antes de ceder el ciclo de eventos")
+    parser.add_argument('--tiempo-limite', type=float, default=None, help="segundos máximos por sesión")
+    parser.add_argument('--max-sentencias', type=int, default=None, help="sentencias ejecutadas por sesión")
+    parser.add_argument('--max-iteraciones', type=int, default=None, help="iteraciones de ciclos por sesión")
+    args = parser.parse_args(argumentos)
+
+    presupuesto = None
+    if args.max_sentencias or args.max_iteraciones:
+        presupuesto = Presupuesto(args.max_sentencias, args.max_iteraciones)
+
+    try:
+        if args.stdio:
+            resultado = asyncio.run(servir_stdio(args.ceder_cada, args.tiempo_limite, presupuesto))
+            sys.exit(1 if resultado.errores else 0)
+        asyncio.run(servir(args.anfitrion, args.puerto, args.ceder_cada, args.tiempo_limite, presupuesto))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,634 @@
+"""Simulador del subconjunto de RISC-V que emite el generador de código.
+
+Ejecuta el ensamblador generado (li.s, operaciones y comparaciones de punto
+flotante, fmv.s, flw/fsw, las operaciones enteras li, add, sub, mul, addi y
+mv, lw/sw, fcvt.s.w, beqz, blt, bge, beq, bne, j, etiquetas y las llamadas
+a leer_float, leer_entero, imprimir_float, imprimir_entero,
+imprimir_salto_linea, sin, cos, tan y pow), cuenta las instrucciones ejecutadas y estima los ciclos con una
+tabla de costos configurable. validar_programa() compara además los valores
+finales con la tabla de símbolos del intérprete.
+
+Uso desde la línea de comandos:
+
+    python simulador_riscv.py programa.pas --entradas 3 4
+    python simulador_riscv.py programa.pas --optimizar --fragmentos --costos costos.json
+"""
+import argparse
+import json
+import math
+import re
+import struct
+import sys
+
+from interpretepascal import (
+    COMENTARIO,
+    ETIQUETA,
+    FUNCIONES,
+    InterpreteUnificado,
+    LineaEnsamblador,
+    SumideroLista,
+    crear_lector,
+    entero_leido,
+)
+
+
+# Ciclos estimados por instrucción y por llamada. Es un modelo aproximado de
+# un núcleo en orden: sirve para comparar versiones del código generado, no
+# para predecir tiempos reales. 'salto_tomado' se suma cada vez que j o
+# un salto condicional cambian el flujo.
+COSTOS_CICLOS = {
+    'li.s': 2,
+    'fmv.s': 1,
+    'fadd.s': 4,
+    'fsub.s': 4,
+    'fmul.s': 4,
+    'fdiv.s': 20,
+    'flt.s': 2,
+    'fgt.s': 2,
+    'fle.s': 2,
+    'fge.s': 2,
+    'feq.s': 2,
+    'fne.s': 2,
+    'flw': 3,
+    'fsw': 1,
+    'fcvt.s.w': 2,
+    'li': 1,
+    'add': 1,
+    'sub': 1,
+    'mul': 3,
+    'lw': 3,
+    'sw': 1,
+    'addi': 1,
+    'mv': 1,
+    'beqz': 1,
+    'blt': 1,
+    'bge': 1,
+    'beq': 1,
+    'bne': 1,
+    'j': 1,
+    'call': 2,
+    'salto_tomado': 2,
+    'leer_float': 0,
+    'leer_entero': 0,
+    'imprimir_float': 0,
+    'imprimir_entero': 0,
+    'imprimir_salto_linea': 0,
+    'sin': 40,
+    'cos': 40,
+    'tan': 60,
+    'pow': 80,
+}
+
+# Instrucciones ejecutadas antes de abandonar una simulación (ciclos sin fin)
+LIMITE_INSTRUCCIONES = 50_000_000
+
+# Valor inicial de sp; la pila crece hacia direcciones menores
+PILA_INICIAL = 1 << 20
+
+COMPARACIONES = {
+    'flt.s': lambda a, b: a < b,
+    'fgt.s': lambda a, b: a > b,
+    'fle.s': lambda a, b: a <= b,
+    'fge.s': lambda a, b: a >= b,
+    'feq.s': lambda a, b: a == b,
+    'fne.s': lambda a, b: a != b,
+}
+
+OPERACIONES_ENTERAS = {
+    'add': lambda a, b: a + b,
+    'sub': lambda a, b: a - b,
+    'mul': lambda a, b: a * b,
+}
+
+SALTOS_CONDICIONALES = {
+    'blt': lambda a, b: a < b,
+    'bge': lambda a, b: a >= b,
+    'beq': lambda a, b: a == b,
+    'bne': lambda a, b: a != b,
+}
+
+_DIRECCION = re.compile(r"(-?\d+)\((\w+)\)$")
+
+
+def _dividir(a, b):
+    """fdiv.s: la división por cero da infinito o NaN, como en IEEE 754"""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def _potencia(a, b):
+    try:
+        return math.pow(a, b)
+    except OverflowError:
+        return math.inf
+    except ValueError:
+        return math.nan
+
+
+def _funcion(nombre):
+    funcion = FUNCIONES[nombre]
+
+    def calcular(a):
+        try:
+            return funcion(a)
+        except ValueError:
+            return math.nan
+    return calcular
+
+
+OPERACIONES = {
+    'fadd.s': lambda a, b: a + b,
+    'fsub.s': lambda a, b: a - b,
+    'fmul.s': lambda a, b: a * b,
+    'fdiv.s': _dividir,
+}
+
+
+def a_precision_simple(valor):
+    """Redondea un float de Python al float de 32 bits más cercano"""
+    try:
+        return struct.unpack('f', struct.pack('f', valor))[0]
+    except OverflowError:
+        return math.copysign(math.inf, valor)
+
+
+def a_entero_32(valor):
+    """Trunca un entero de Python a un registro de 32 bits con signo"""
+    valor &= 0xFFFFFFFF
+    return valor - (1 << 32) if valor & 0x80000000 else valor
+
+
+def direccion(operando):
+    """(desplazamiento, registro base) de un operando 'N(reg)'"""
+    encontrado = _DIRECCION.match(str(operando).strip())
+    if not encontrado:
+        raise Exception(f"Dirección inválida: {operando}")
+    return int(encontrado.group(1)), encontrado.group(2)
+
+
+def decodificar(codigo):
+    """Separa las instrucciones de las etiquetas; devuelve (instrucciones, etiquetas).
+
+    codigo puede tener registros LineaEnsamblador o líneas de texto. Cada
+    etiqueta apunta al índice de la instrucción que le sigue.
+    """
+    instrucciones = []
+    etiquetas = {}
+    for linea in codigo:
+        if isinstance(linea, str):
+            if not linea.strip():
+                continue
+            linea = LineaEnsamblador.desde_texto(linea)
+        if linea.mnemonico == ETIQUETA:
+            etiquetas[linea.operandos[0]] = len(instrucciones)
+        elif linea.mnemonico != COMENTARIO:
+            instrucciones.append((linea.mnemonico, linea.operandos))
+    return instrucciones, etiquetas
+
+
+class ResultadoSimulacion:
+    """Estado final y conteos de una simulación"""
+
+    def __init__(self, instrucciones, conteos, registros, memoria, salida, saltos_tomados, base_pila,
+                 costos, error):
+        self.registros = registros
+        self.memoria = memoria
+        self.salida = salida
+        self.saltos_tomados = saltos_tomados
+        self.base_pila = base_pila
+        self.error = error
+
+        self.por_mnemonico = {}
+        self.llamadas = {}
+        for (mnemonico, operandos), conteo in zip(instrucciones, conteos):
+            if not conteo:
+                continue
+            self.por_mnemonico[mnemonico] = self.por_mnemonico.get(mnemonico, 0) + conteo
+            if mnemonico == 'call':
+                self.llamadas[operandos[0]] = self.llamadas.get(operandos[0], 0) + conteo
+        self.instrucciones = sum(conteos)
+        self.ciclos = (sum(costos.get(mnemonico, 1) * conteo for mnemonico, conteo in self.por_mnemonico.items())
+                       + sum(costos.get(nombre, 0) * conteo for nombre, conteo in self.llamadas.items())
+                       + costos.get('salto_tomado', 0) * saltos_tomados)
+
+    def valor(self, ubicacion):
+        """Valor final en un registro ('ft3', '%x') o en memoria ('8(s0)').
+
+        Las direcciones relativas a sp se toman sobre el marco más profundo
+        que usó el programa, que es donde viven los valores derramados.
+        """
+        if '(' not in ubicacion:
+            return self.registros.get(ubicacion)
+        desplazamiento, base = direccion(ubicacion)
+        inicio = self.base_pila if base == 'sp' else self.registros.get(base, 0)
+        return self.memoria.get(inicio + desplazamiento)
+
+    def como_diccionario(self):
+        return {
+            'instrucciones': self.instrucciones,
+            'ciclos': self.ciclos,
+            'saltos_tomados': self.saltos_tomados,
+            'por_mnemonico': dict(sorted(self.por_mnemonico.items(), key=lambda par: -par[1])),
+            'llamadas': self.llamadas,
+            'error': self.error,
+        }
+
+
+class SimuladorRiscV:
+    """Ejecuta el ensamblador generado con registros y memoria en diccionarios.
+
+    Los registros no tienen un conjunto fijo: cualquier nombre es un
+    registro, así que también se puede simular el código con registros
+    virtuales. Con precision_simple=True cada resultado de punto flotante
+    se redondea a 32 bits y cada entero se trunca a 32 bits con signo; por
+    omisión se usan los float e int de Python, igual que el intérprete.
+    Con enteros_32=True solo se truncan los enteros, como en los registros
+    de RV32, y los float siguen siendo los de Python.
+    """
+
+    def __init__(self, entradas=(), costos=None, limite=LIMITE_INSTRUCCIONES, precision_simple=False,
+                 enteros_32=False):
+        self.leer = crear_lector(entradas) or input
+        self.costos = dict(COSTOS_CICLOS)
+        if costos:
+            self.costos.update(costos)
+        self.limite = limite
+        self.redondear = a_precision_simple if precision_simple else float
+        self.truncar = a_entero_32 if precision_simple or enteros_32 else int
+
+    def ejecutar(self, codigo):
+        """Simula el código y devuelve un ResultadoSimulacion"""
+        instrucciones, etiquetas = decodificar(codigo)
+        registros = {'sp': PILA_INICIAL, 'zero': 0}
+        memoria = {}
+        salida = []
+        self._base_pila = PILA_INICIAL
+        conteos = [0] * len(instrucciones)
+        saltos_tomados = 0
+        error = None
+
+        try:
+            pasos = [self._compilar(mnemonico, operandos, etiquetas, indice, registros, memoria, salida)
+                     for indice, (mnemonico, operandos) in enumerate(instrucciones)]
+            total = len(pasos)
+            ejecutadas = 0
+            limite = self.limite
+            i = 0
+            while i < total:
+                conteos[i] += 1
+                siguiente = pasos[i]()
+                if siguiente != i + 1:
+                    saltos_tomados += 1
+                i = siguiente
+                ejecutadas += 1
+                if ejecutadas >= limite:
+                    raise Exception(f"Límite de {limite} instrucciones excedido")
+        except Exception as e:
+            error = str(e)
+
+        return ResultadoSimulacion(instrucciones, conteos, registros, memoria, salida, saltos_tomados,
+                                   self._base_pila, self.costos, error)
+
+    def _compilar(self, mnemonico, operandos, etiquetas, indice, r, memoria, salida):
+        """Convierte una instrucción en una función sin argumentos que devuelve el índice siguiente"""
+        siguiente = indice + 1
+        redondear = self.redondear
+        truncar = self.truncar
+
+        if mnemonico in OPERACIONES:
+            operacion = OPERACIONES[mnemonico]
+            d, a, b = operandos
+
+            def paso():
+                r[d] = redondear(operacion(r.get(a, 0.0), r.get(b, 0.0)))
+                return siguiente
+            return paso
+
+        if mnemonico in COMPARACIONES:
+            comparacion = COMPARACIONES[mnemonico]
+            d, a, b = operandos
+
+            def paso():
+                r[d] = int(comparacion(r.get(a, 0.0), r.get(b, 0.0)))
+                return siguiente
+            return paso
+
+        if mnemonico in OPERACIONES_ENTERAS:
+            operacion = OPERACIONES_ENTERAS[mnemonico]
+            d, a, b = operandos
+
+            def paso():
+                r[d] = truncar(operacion(r.get(a, 0), r.get(b, 0)))
+                return siguiente
+            return paso
+
+        if mnemonico == 'li':
+            d, valor = operandos[0], truncar(int(operandos[1]))
+
+            def paso():
+                r[d] = valor
+                return siguiente
+            return paso
+
+        if mnemonico == 'fcvt.s.w':
+            d, a = operandos
+
+            def paso():
+                r[d] = redondear(float(r.get(a, 0)))
+                return siguiente
+            return paso
+
+        if mnemonico == 'li.s':
+            d, valor = operandos[0], redondear(float(operandos[1]))
+
+            def paso():
+                r[d] = valor
+                return siguiente
+            return paso
+
+        if mnemonico in ('fmv.s', 'mv'):
+            d, a = operandos
+
+            def paso():
+                r[d] = r.get(a, 0.0)
+                return siguiente
+            return paso
+
+        if mnemonico == 'addi':
+            d, a, inmediato = operandos[0], operandos[1], int(operandos[2])
+
+            def paso():
+                r[d] = truncar(r.get(a, 0) + inmediato)
+                if d == 'sp' and r[d] < self._base_pila:
+                    self._base_pila = r[d]
+                return siguiente
+            return paso
+
+        if mnemonico == 'flw':
+            d = operandos[0]
+            desplazamiento, base = direccion(operandos[1])
+
+            def paso():
+                r[d] = memoria.get(r.get(base, 0) + desplazamiento, 0.0)
+                return siguiente
+            return paso
+
+        if mnemonico == 'fsw':
+            a = operandos[0]
+            desplazamiento, base = direccion(operandos[1])
+
+            def paso():
+                memoria[r.get(base, 0) + desplazamiento] = r.get(a, 0.0)
+                return siguiente
+            return paso
+
+        if mnemonico == 'lw':
+            d = operandos[0]
+            desplazamiento, base = direccion(operandos[1])
+
+            def paso():
+                r[d] = memoria.get(r.get(base, 0) + desplazamiento, 0)
+                return siguiente
+            return paso
+
+        if mnemonico == 'sw':
+            a = operandos[0]
+            desplazamiento, base = direccion(operandos[1])
+
+            def paso():
+                memoria[r.get(base, 0) + desplazamiento] = r.get(a, 0)
+                return siguiente
+            return paso
+
+        if mnemonico in SALTOS_CONDICIONALES:
+            comparacion = SALTOS_CONDICIONALES[mnemonico]
+            a, b, nombre = operandos
+            destino = etiquetas.get(nombre)
+            if destino is None:
+                raise Exception(f"Etiqueta no definida: {nombre}")
+            return lambda: destino if comparacion(r.get(a, 0), r.get(b, 0)) else siguiente
+
+        if mnemonico in ('beqz', 'j'):
+            destino = etiquetas.get(operandos[-1])
+            if destino is None:
+                raise Exception(f"Etiqueta no definida: {operandos[-1]}")
+            if mnemonico == 'j':
+                return lambda: destino
+            registro = operandos[0]
+            return lambda: destino if r.get(registro, 0) == 0 else siguiente
+
+        if mnemonico == 'call':
+            return self._llamada(operandos[0], siguiente, r, salida)
+
+        raise Exception(f"Instrucción no soportada: {mnemonico}")
+
+    def _llamada(self, nombre, siguiente, r, salida):
+        redondear = self.redondear
+
+        if nombre == 'leer_float':
+            leer = self.leer
+
+            def paso():
+                try:
+                    r['fa0'] = redondear(float(leer("")))
+                except ValueError:
+                    raise Exception("Valor inválido ingresado")
+                return siguiente
+            return paso
+
+        if nombre == 'leer_entero':
+            leer = self.leer
+            truncar = self.truncar
+
+            def paso():
+                try:
+                    r['a0'] = truncar(entero_leido(leer("")))
+                except ValueError:
+                    raise Exception("Valor inválido ingresado")
+                return siguiente
+            return paso
+
+        if nombre == 'imprimir_entero':
+            def paso():
+                salida.append(r.get('a0', 0))
+                return siguiente
+            return paso
+
+        if nombre == 'imprimir_float':
+            def paso():
+                salida.append(r.get('fa0', 0.0))
+                return siguiente
+            return paso
+
+        if nombre == 'imprimir_salto_linea':
+            def paso():
+                salida.append("\n")
+                return siguiente
+            return paso
+
+        if nombre == 'pow':
+            def paso():
+                r['fa0'] = redondear(_potencia(r.get('fa0', 0.0), r.get('fa1', 0.0)))
+                return siguiente
+            return paso
+
+        if nombre in FUNCIONES:
+            funcion = _funcion(nombre)
+
+            def paso():
+                r['fa0'] = redondear(funcion(r.get('fa0', 0.0)))
+                return siguiente
+            return paso
+
+        raise Exception(f"Función no soportada: {nombre}")
+
+
+def simular(codigo, entradas=(), costos=None, limite=LIMITE_INSTRUCCIONES, precision_simple=False,
+            enteros_32=False):
+    """Simula el código ensamblador con las entradas dadas"""
+    return SimuladorRiscV(entradas, costos, limite, precision_simple, enteros_32).ejecutar(codigo)
+
+
+def _iguales(a, b, tolerancia):
+    if a is None or b is None or isinstance(a, complex) or isinstance(b, complex):
+        return a == b
+    if isinstance(a, int) and isinstance(b, int):
+        return a == b
+    if a != a and b != b:
+        return True
+    return a == b or abs(a - b) <= tolerancia * max(1.0, abs(a))
+
+
+def comparar_variables(variables, ubicaciones, simulacion, tolerancia=1e-9):
+    """Variables cuyo valor simulado no coincide con el del intérprete: {nombre: (esperado, obtenido)}.
+
+    Las variables sin valor en el intérprete o sin ubicación ('-') no se comparan.
+    """
+    diferencias = {}
+    for nombre, esperado in variables.items():
+        ubicacion = ubicaciones.get(nombre, '-')
+        if esperado is None or ubicacion == '-':
+            continue
+        obtenido = simulacion.valor(ubicacion)
+        if not _iguales(esperado, obtenido, tolerancia):
+            diferencias[nombre] = (esperado, obtenido)
+    return diferencias
+
+
+class Validacion:
+    """Resultado de simular el ensamblador de un programa y compararlo con el intérprete"""
+
+    def __init__(self, resultado, simulacion, diferencias, salida_coincide):
+        self.resultado = resultado
+        self.simulacion = simulacion
+        # None cuando no se pudo comparar (el intérprete o la simulación fallaron)
+        self.diferencias = diferencias
+        self.salida_coincide = salida_coincide
+
+    @property
+    def correcta(self):
+        return self.diferencias == {} and self.salida_coincide is not False
+
+    def como_diccionario(self):
+        return {
+            'correcta': self.correcta,
+            'errores': self.resultado.errores,
+            'diferencias': self.diferencias,
+            'salida_coincide': self.salida_coincide,
+            'simulacion': self.simulacion.como_diccionario(),
+        }
+
+
+def validar_programa(codigo, entradas=(), optimizar=False, fragmentos=False, costos=None,
+                     tolerancia=1e-9, tiempo_limite=None, limite=LIMITE_INSTRUCCIONES):
+    """Ejecuta el programa en el intérprete, simula su ensamblador y compara los resultados.
+
+    Al generar todo el programa de una vez, el asignador reutiliza el
+    registro de una variable después de su último uso, así que los valores
+    finales se comparan simulando el código virtual (cada variable en su
+    registro virtual, %nombre o %$nombre) y el código con registros físicos se valida comparando lo que
+    imprime con lo que imprime el virtual. Con fragmentos=True el código se
+    genera por fragmentos y cada variable termina guardada en su lugar del
+    marco, que se compara directamente.
+
+    Los enteros del intérprete no tienen tamaño y los del ensamblador son
+    de 32 bits, así que la simulación los trunca: un entero que se desborda
+    aparece como diferencia.
+
+    tiempo_limite (segundos) se aplica al intérprete y limite (instrucciones)
+    a cada simulación, para no quedar atrapados en ciclos sin fin.
+    """
+    entradas = list(entradas)
+    interprete = InterpreteUnificado(entrada=entradas, optimizar=optimizar,
+                                     sumidero_ensamblador=SumideroLista([]) if fragmentos else None)
+    resultado = interprete.ejecutar_programa(codigo, tiempo_limite=tiempo_limite)
+    simulacion = simular(interprete.codigo_ensamblador, entradas, costos, limite, enteros_32=True)
+
+    diferencias = None
+    salida_coincide = None
+    if not resultado.errores and simulacion.error is None:
+        if interprete.codigo_virtual is not None:
+            virtual = simular(interprete.codigo_virtual, entradas, costos, limite, enteros_32=True)
+            ubicaciones = {nombre: interprete.registros_virtuales.get(nombre, f"%{nombre}")
+                           for nombre in resultado.variables}
+            diferencias = comparar_variables(resultado.variables, ubicaciones, virtual, tolerancia)
+            salida_coincide = (len(simulacion.salida) == len(virtual.salida)
+                               and all(_iguales(a, b, tolerancia) for a, b in zip(simulacion.salida, virtual.salida)))
+        else:
+            diferencias = comparar_variables(resultado.variables, interprete.asignacion_registros,
+                                             simulacion, tolerancia)
+    return Validacion(resultado, simulacion, diferencias, salida_coincide)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Simula el ensamblador RISC-V generado para un programa Pascal")
+    parser.add_argument('programa', help="archivo con el código fuente")
+    parser.add_argument('--entradas', nargs='*', default=[], help="valores para read()")
+    parser.add_argument('--optimizar', action='store_true', help="generar el ensamblador con el optimizador")
+    parser.add_argument('--fragmentos', action='store_true', help="generar el ensamblador por fragmentos")
+    parser.add_argument('--costos', help="archivo JSON con ciclos por instrucción o llamada")
+    parser.add_argument('--json', action='store_true', help="mostrar el reporte como JSON")
+    opciones = parser.parse_args(argumentos)
+
+    with open(opciones.programa, encoding='utf-8') as archivo:
+        codigo = archivo.read()
+    costos = None
+    if opciones.costos:
+        with open(opciones.costos, encoding='utf-8') as archivo:
+            costos = json.load(archivo)
+
+    validacion = validar_programa(codigo, opciones.entradas, opciones.optimizar, opciones.fragmentos, costos)
+    if opciones.json:
+        sys.stdout.write(json.dumps(validacion.como_diccionario(), ensure_ascii=False, default=str, indent=2) + "\n")
+        return 0 if validacion.correcta else 1
+
+    simulacion = validacion.simulacion
+    print(f"Instrucciones ejecutadas: {simulacion.instrucciones}")
+    print(f"Ciclos estimados:         {simulacion.ciclos}")
+    print(f"Saltos tomados:           {simulacion.saltos_tomados}")
+    print(f"\n{'Mnemónico':<30} {'Ejecuciones':>11}")
+    for mnemonico, conteo in sorted(simulacion.por_mnemonico.items(), key=lambda par: -par[1]):
+        print(f"{mnemonico:<30} {conteo:>11}")
+    for nombre, conteo in simulacion.llamadas.items():
+        print(f"  {'call ' + nombre:<28} {conteo:>11}")
+    if simulacion.error:
+        print(f"\nLa simulación falló: {simulacion.error}")
+    for error in validacion.resultado.errores:
+        print(f"\nEl intérprete falló, no se comparan los valores: {error}")
+    if validacion.diferencias:
+        print("\nVariables que no coinciden con el intérprete:")
+        for nombre, (esperado, obtenido) in validacion.diferencias.items():
+            print(f"  {nombre}: intérprete {esperado}, simulación {obtenido}")
+    elif validacion.diferencias == {}:
+        print("\nLos valores finales coinciden con la tabla de símbolos del intérprete")
+    if validacion.salida_coincide is False:
+        print("La salida del código con registros físicos no coincide con la del código virtual")
+    return 0 if validacion.correcta else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import builtins
+import io
+
+import pytest
+
+from interpretepascal import InterpreteUnificado, ejecutar_programa
+
+SUMA = "var x, y, s;\nread(x);\nread(y);\ns := x y +;\nprintln(s);"
+
+
+@pytest.fixture(autouse=True)
+def sin_terminal(monkeypatch):
+    def prohibido(*argumentos):
+        raise AssertionError("la API no debe usar input()")
+    monkeypatch.setattr(builtins, 'input', prohibido)
+
+
+@pytest.mark.parametrize('entradas', [
+    ['2', '3'],
+    iter(['2', '3']),
+    io.StringIO("2\n3\n"),
+])
+def test_fuentes_de_entrada(entradas, capsys):
+    resultado = ejecutar_programa(SUMA, entradas)
+    assert resultado.salida == "5.0\n"
+    assert resultado.variables == {'x': 2.0, 'y': 3.0, 's': 5.0}
+    assert resultado.errores == []
+    assert capsys.readouterr().out == ""
+
+
+def test_funcion_de_lectura_recibe_el_mensaje():
+    mensajes = []
+
+    def leer(mensaje=''):
+        mensajes.append(mensaje)
+        return str(len(mensajes))
+
+    assert ejecutar_programa(SUMA, leer).salida == "3.0\n"
+    assert len(mensajes) == 2
+
+
+def test_salida_a_un_objeto_propio():
+    salida = io.StringIO()
+    resultado = ejecutar_programa(SUMA, ['1', '2'], salida=salida)
+    assert salida.getvalue() == "3.0\n"
+    assert resultado.salida is None
+
+
+def test_errores_en_el_resultado():
+    assert ejecutar_programa(SUMA, ['1']).errores == ["Error en línea 3: No hay más valores de entrada"]
+    assert ejecutar_programa(SUMA, ['a', '2']).errores == ["Error en línea 2: Valor inválido ingresado"]
+
+
+def test_ensamblador_en_el_resultado():
+    assert ejecutar_programa(SUMA, ['1', '2']).ensamblador[:2] == ["# leer x", "call leer_float"]
+    assert ejecutar_programa(SUMA, ['1', '2'], generar_ensamblador=False).ensamblador == []
+
+
+def test_interpretes_independientes():
+    primero = InterpreteUnificado(entrada=['1', '1'])
+    segundo = InterpreteUnificado(entrada=['10', '20'])
+    assert primero.ejecutar_programa(SUMA).salida == "2.0\n"
+    assert segundo.ejecutar_programa(SUMA).salida == "30.0\n"
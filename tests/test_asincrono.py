@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+import servidor_sesiones
+from interpretepascal import ejecutar_programa, ejecutar_programa_asincrono
+
+PROGRAMA = """var n, i, s;
+read(n);
+s := 0;
+for i := 1 to n do
+    s := s i +;
+endfor
+println(s);"""
+
+
+class Salida:
+    def __init__(self):
+        self.partes = []
+
+    def write(self, texto):
+        self.partes.append(texto)
+
+    @property
+    def texto(self):
+        return "".join(self.partes)
+
+
+def sesion(texto, salida):
+    """Atiende una sesión cuyo cliente envía 'texto' completo"""
+    async def principal():
+        lector = asyncio.StreamReader()
+        lector.feed_data(texto.encode('utf-8'))
+        lector.feed_eof()
+        return await servidor_sesiones.atender_sesion(lector, salida)
+    return asyncio.run(principal())
+
+
+def test_mismo_resultado_que_el_modo_sincrono():
+    sincrono = ejecutar_programa(PROGRAMA, ['10'], generar_ensamblador=False)
+    for ceder_cada in (1, 1000):
+        asincrono = asyncio.run(ejecutar_programa_asincrono(PROGRAMA, ['10'], ceder_cada=ceder_cada))
+        assert (asincrono.salida, asincrono.variables, asincrono.errores) == \
+            (sincrono.salida, sincrono.variables, sincrono.errores)
+
+
+def test_una_sesion_no_bloquea_a_otra_que_espera_read():
+    async def principal():
+        liberar = asyncio.Event()
+
+        async def lenta(mensaje):
+            await liberar.wait()
+            return "3"
+
+        espera = asyncio.create_task(ejecutar_programa_asincrono(PROGRAMA, lenta))
+        rapida = await ejecutar_programa_asincrono(PROGRAMA, ['4'])
+        assert not espera.done()
+        liberar.set()
+        return rapida, await espera
+
+    rapida, lenta = asyncio.run(principal())
+    assert rapida.variables['s'] == 10.0
+    assert lenta.variables['s'] == 6.0
+
+
+def test_sesion_completa():
+    salida = Salida()
+    resultado = sesion(PROGRAMA + "\nFIN\n5\n", salida)
+    assert resultado.errores == []
+    assert "Ingrese valor para n: " in salida.texto
+    assert salida.texto.endswith("15.0\nn = 5.0\ni = 6.0\ns = 15.0\n")
+
+
+def test_sesion_con_error_de_compilacion():
+    salida = Salida()
+    codigo = "var a, b;\nwhile a b < do\na := 1;\nFIN\n"
+    resultado = sesion(codigo, salida)
+    directo = asyncio.run(ejecutar_programa_asincrono(codigo.replace("FIN\n", ""), []))
+    assert resultado.errores == directo.errores
+    assert "Bloques desbalanceados" in salida.texto
+
+
+def test_la_compilacion_no_corre_en_el_ciclo_de_eventos(monkeypatch):
+    hilos = []
+    compilar = servidor_sesiones.compilar_programa
+
+    def registrar(*argumentos):
+        hilos.append(threading.current_thread())
+        return compilar(*argumentos)
+
+    monkeypatch.setattr(servidor_sesiones, 'compilar_programa', registrar)
+    monkeypatch.setattr(servidor_sesiones, '_PROGRAMAS', {})
+    programa = asyncio.run(servidor_sesiones.programa_compartido(PROGRAMA))
+    assert hilos and hilos[0] is not threading.main_thread()
+    # La segunda vez sale de la caché compartida
+    assert asyncio.run(servidor_sesiones.programa_compartido(PROGRAMA)) is programa
+    assert len(hilos) == 1
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import benchmarks
+from interpretepascal import ejecutar_programa
+
+CASOS_PEQUENOS = [
+    benchmarks.caso_for(10),
+    benchmarks.caso_while(10),
+    benchmarks.caso_entero(10),
+    benchmarks.caso_completo(10),
+    benchmarks.caso_anidado(3, 3),
+    benchmarks.caso_variables(16, 5),
+    benchmarks.caso_expresion(16, 5),
+    benchmarks.caso_largo(50),
+]
+
+
+@pytest.mark.parametrize('caso', CASOS_PEQUENOS, ids=lambda caso: caso.clave)
+def test_casos_generados_se_ejecutan_sin_errores(caso):
+    resultado = ejecutar_programa(caso.codigo, caso.entradas)
+    assert resultado.errores == []
+
+
+def test_casos_reproducibles():
+    assert [caso.codigo for caso in benchmarks.suite(rapido=True)] == \
+        [caso.codigo for caso in benchmarks.suite(rapido=True)]
+    claves = [caso.clave for caso in benchmarks.suite(rapido=True)]
+    assert len(claves) == len(set(claves))
+
+
+def test_medir_caso():
+    metricas = benchmarks.medir_caso(benchmarks.caso_for(20), repeticiones=1, simular_ensamblador=True)
+    assert metricas['errores'] == []
+    assert metricas['caso'] == 'for' and metricas['parametros'] == {'n': 20}
+    assert metricas['instrucciones_ensamblador'] > 0
+    assert metricas['instrucciones_dinamicas'] > metricas['instrucciones_ensamblador']
+    for metrica in ('compilacion', 'ensamblador', 'ejecucion', 'memoria_pico', 'sentencias'):
+        assert metricas[metrica] >= 0
+
+
+def reporte(**metricas):
+    return {'casos': [dict({'caso': 'for', 'parametros': {'n': 10}}, **metricas)]}
+
+
+def test_comparar_marca_regresiones():
+    base = reporte(ejecucion=1.0, sentencias_por_segundo=100.0, memoria_pico=1000)
+    actual = reporte(ejecucion=1.5, sentencias_por_segundo=150.0, memoria_pico=1050)
+    filas, regresiones = benchmarks.comparar(base, actual, umbral=0.1)
+    cambios = {metrica: cambio for _, metrica, _, _, cambio in filas}
+    assert cambios['ejecucion'] == pytest.approx(0.5)
+    # Más sentencias por segundo es mejor: el cambio es negativo
+    assert cambios['sentencias_por_segundo'] == pytest.approx(-0.5)
+    assert [fila[1] for fila in regresiones] == ['ejecucion']
+
+
+def test_comparar_desde_la_linea_de_comandos(tmp_path, capsys):
+    rutas = []
+    for nombre, datos in [('base', reporte(ejecucion=1.0)), ('actual', reporte(ejecucion=1.05))]:
+        ruta = tmp_path / f"{nombre}.json"
+        ruta.write_text(json.dumps(datos), encoding='utf-8')
+        rutas.append(str(ruta))
+    assert benchmarks.main(['--comparar', *rutas]) == 0
+    assert benchmarks.main(['--comparar', *rutas, '--umbral', '0.01']) == 1
+    assert "1 regresiones" in capsys.readouterr().out
@@ -0,0 +1,52 @@
+from interpretepascal import compilar_programa, ejecutar_programa, emparejar_bloques
+
+ANIDADOS = """var n, i, j, s;
+read(n);
+s := 0;
+for i := 1 to n do
+    j := 0;
+    while j i < do
+        if j 2 < then
+            s := s 1 +;
+        endif
+        j := j 1 +;
+    endwhile
+endfor
+println(s);"""
+
+
+def test_tabla_de_bloques_anidados():
+    lineas = ['var i, j, s;', 'for i := 1 to n do', 'while s 3 < do', 'if s 1 > then',
+              'endif', 'endwhile', 'endfor']
+    tabla, errores = emparejar_bloques(lineas)
+    assert tabla == {1: 6, 2: 5, 3: 4}
+    assert errores == []
+
+
+def test_bloques_desbalanceados():
+    _, errores = emparejar_bloques(['for i := 1 to n do', 'endwhile', 'if a b < then'])
+    assert [(error.linea, error.mensaje) for error in errores] == [
+        (2, "se esperaba 'endfor' para cerrar 'for' de la línea 1, se encontró 'endwhile'"),
+        (3, "'if' sin 'endif'"),
+    ]
+    _, errores = emparejar_bloques(['endif'])
+    assert str(errores[0]) == "línea 1: 'endif' sin 'if' correspondiente"
+
+
+def test_saltos_resueltos_al_compilar():
+    programa = compilar_programa(ANIDADOS, False)
+    assert programa.tabla_bloques == {3: 11, 5: 10, 6: 8}
+    assert all(instruccion.salto is not None for instruccion in programa.instrucciones
+               if instruccion.numero_linea - 1 in programa.tabla_bloques)
+
+
+def test_bloques_anidados_se_ejecutan_bien():
+    for n, esperado in [(0, 0.0), (1, 1.0), (2, 3.0), (5, 9.0)]:
+        resultado = ejecutar_programa(ANIDADOS, [str(n)], generar_ensamblador=False)
+        assert resultado.salida == f"{esperado}\n", n
+
+
+def test_programa_con_bloque_sin_cerrar():
+    resultado = ejecutar_programa("var x;\nx := 1;\nwhile x 3 < do\nx := x 1 +;", generar_ensamblador=False)
+    assert resultado.errores
+    assert "while" in resultado.errores[0]
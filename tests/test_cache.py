@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from cache_programas import CacheProgramas
+from interpretepascal import Presupuesto, PresupuestoExcedido, ejecutar_programa
+
+PROGRAMA = """var i, n, s;
+n := 10;
+s := 0;
+for i := 1 to n do
+    s := s i i * +;
+endfor
+println(s);"""
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheProgramas(str(tmp_path))
+
+
+def test_ida_y_vuelta(cache):
+    esperado = ejecutar_programa(PROGRAMA)
+    primero = cache.compilar(PROGRAMA)
+    segundo = cache.compilar(PROGRAMA)
+    assert (cache.fallos, cache.aciertos) == (1, 1)
+    assert segundo is not primero
+    resultado = ejecutar_programa(segundo)
+    assert resultado.salida == esperado.salida == "385.0\n"
+    assert resultado.ensamblador == esperado.ensamblador
+
+
+def test_entrada_danada_se_recompila(cache):
+    cache.compilar(PROGRAMA)
+    ruta = cache.ruta(cache.clave(PROGRAMA))
+    with open(ruta, 'wb') as archivo:
+        archivo.write(b"no es un pickle")
+    programa = cache.compilar(PROGRAMA)
+    assert cache.aciertos == 0
+    assert ejecutar_programa(programa, generar_ensamblador=False).salida == "385.0\n"
+    # La entrada se volvió a escribir completa
+    assert cache.obtener(cache.clave(PROGRAMA)) is not None
+
+
+def test_opciones_distintas_no_comparten_entrada(cache):
+    cache.compilar(PROGRAMA, incluir_ensamblador=False)
+    programa = cache.compilar(PROGRAMA, incluir_ensamblador=True)
+    assert cache.aciertos == 0
+    assert programa.ensamblador is not None
+
+
+def test_presupuesto_de_ensamblador_con_la_cache_caliente(cache):
+    cache.compilar(PROGRAMA)
+    with pytest.raises(PresupuestoExcedido) as error:
+        cache.compilar(PROGRAMA, presupuesto=Presupuesto(ensamblador=5))
+    assert error.value.recurso == 'ensamblador'
+    # Y también después de haberlo compilado con un límite suficiente
+    cache.compilar(PROGRAMA, presupuesto=Presupuesto(ensamblador=10_000))
+    cache.compilar(PROGRAMA, presupuesto=Presupuesto(ensamblador=10_000))
+    assert cache.aciertos == 1
+    with pytest.raises(PresupuestoExcedido):
+        cache.compilar(PROGRAMA, presupuesto=Presupuesto(ensamblador=5))
+
+
+def test_desaloja_las_entradas_mas_viejas(tmp_path):
+    cache = CacheProgramas(str(tmp_path), tamano_maximo=0)
+    cache.compilar(PROGRAMA)
+    assert cache.entradas() == []
+    assert not [nombre for nombre in os.listdir(tmp_path) if nombre.endswith('.tmp')]
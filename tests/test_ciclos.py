@@ -0,0 +1,106 @@
+import pytest
+
+from interpretepascal import (OP_ASIGNAR_INVARIANTE, OP_FOR, OP_FOR_CERRADO, InterpreteUnificado,
+                              compilar_programa, ejecutar_programa)
+
+REDUCCIONES = """var n, i, s, r, p, c, k;
+read(n);
+s := 0;
+r := 100;
+p := 1;
+k := 3;
+for i := 1 to n do
+    s := s i 2 * 1 + +;
+    r := r k -;
+    p := p 2 *;
+    c := k 4 *;
+endfor
+println(s);"""
+
+# El if vacío no cambia el resultado pero obliga a recorrer el ciclo
+ITERADO = REDUCCIONES.replace("    c := k 4 *;\n", "    c := k 4 *;\n    if i 0 < then\n    endif\n")
+
+INVARIANTE = """var n, m, a, b, j, t;
+read(n);
+read(m);
+t := 0;
+a := 0;
+while a n < do
+    a := a 1 +;
+    b := 2;
+    j := 0;
+    while j m < do
+        t := t a b * a b + / +;
+        j := j 1 +;
+    endwhile
+endwhile
+println(t);"""
+
+
+def opcodes(codigo):
+    return [instruccion.opcode for instruccion in compilar_programa(codigo, False).instrucciones]
+
+
+def ejecutar(codigo, entradas, **opciones):
+    return ejecutar_programa(codigo, entradas, generar_ensamblador=False, **opciones)
+
+
+def vueltas(codigo, entradas, monkeypatch):
+    """Ejecuta el programa y cuenta las veces que se llegó al endfor"""
+    cuenta = []
+    original = InterpreteUnificado._ejecutar_endfor
+
+    def contar(self, instr, pc):
+        cuenta.append(pc)
+        return original(self, instr, pc)
+
+    monkeypatch.setattr(InterpreteUnificado, '_ejecutar_endfor', contar)
+    return ejecutar(codigo, entradas), len(cuenta)
+
+
+def test_for_con_reducciones_pasa_a_forma_cerrada():
+    assert OP_FOR_CERRADO in opcodes(REDUCCIONES)
+    assert OP_FOR_CERRADO not in opcodes(ITERADO) and OP_FOR in opcodes(ITERADO)
+
+
+@pytest.mark.parametrize('n', ['0', '1', '2', '3.5', '10', '-2', '40'])
+def test_forma_cerrada_igual_que_iterar(n):
+    cerrado = ejecutar(REDUCCIONES, [n])
+    iterado = ejecutar(ITERADO, [n])
+    assert cerrado.errores == iterado.errores == []
+    assert cerrado.variables == iterado.variables
+    assert cerrado.salida == iterado.salida
+
+
+def test_forma_cerrada_no_recorre_el_ciclo(monkeypatch):
+    resultado, cuenta = vueltas(REDUCCIONES, ['50'], monkeypatch)
+    assert resultado.errores == [] and cuenta == 0
+    assert resultado.variables['s'] == 50 * 51 + 50.0
+    assert resultado.variables['r'] == 100 - 3 * 50
+    assert resultado.variables['p'] == 2.0 ** 50
+    assert vueltas(ITERADO, ['50'], monkeypatch)[1] == 50
+
+
+def test_sin_forma_cerrada_exacta_se_itera(monkeypatch):
+    # 2^60 pasa de 53 bits: la forma cerrada no puede garantizar el mismo resultado
+    assert vueltas(REDUCCIONES, ['60'], monkeypatch)[1] == 60
+    assert ejecutar(REDUCCIONES, ['2000']).variables == ejecutar(ITERADO, ['2000']).variables
+
+
+def test_enteros_exactos_en_forma_cerrada():
+    codigo = "var n, i, s : integer;\nread(n);\ns := 0;\nfor i := 1 to n do\n    s := s i +;\nendfor"
+    assert OP_FOR_CERRADO in opcodes(codigo)
+    resultado = ejecutar(codigo, ['100000000000'])
+    assert resultado.variables['s'] == 100000000000 * 100000000001 // 2
+
+
+def test_subexpresiones_invariantes():
+    assert OP_ASIGNAR_INVARIANTE in opcodes(INVARIANTE)
+    for n, m in [(0, 3), (1, 1), (3, 4)]:
+        esperado = 0.0
+        for a in range(1, n + 1):
+            for _ in range(m):
+                esperado += a * 2.0 / (a + 2.0)
+        resultado = ejecutar(INVARIANTE, [str(n), str(m)])
+        assert resultado.errores == []
+        assert resultado.variables['t'] == pytest.approx(esperado, rel=1e-12)
@@ -0,0 +1,229 @@
+import gzip
+import io
+import re
+
+import pytest
+
+from interpretepascal import (AsignadorRegistros, LineaEnsamblador, OptimizadorMirilla, ResultadoEjecucion,
+                              SumideroArchivo, SumideroLista, asm, comentario, compilar_programa,
+                              definiciones_y_usos, ejecutar_programa, etiqueta)
+from simulador_riscv import simular, validar_programa
+
+CICLOS = """var n, i, s;
+read(n);
+s := 0;
+for i := 1 to n do
+    s := s i +;
+    println(s);
+endfor
+while s 0 > do
+    s := s 10 -;
+endwhile
+if s 0 < then
+    println(s);
+endif"""
+
+
+def ensamblador(codigo, entradas=(), **opciones):
+    return ejecutar_programa(codigo, entradas, **opciones).ensamblador
+
+
+def test_no_depende_de_las_vueltas_de_los_ciclos():
+    pocas = ensamblador(CICLOS, ['2'])
+    muchas = ensamblador(CICLOS, ['300'])
+    assert pocas == muchas
+    assert sum(linea == "call imprimir_float" for linea in muchas) == 2
+
+
+def test_genera_ramas_y_cuerpos_que_no_se_ejecutan():
+    # Con n = 0 no se entra al for, el while no da vueltas y el if no se cumple
+    codigo = ensamblador(CICLOS, ['0'])
+    assert codigo == ensamblador(CICLOS, ['4'])
+    assert "# Inicio del for" in codigo and "# Inicio del while" in codigo and "# Inicio del if" in codigo
+
+
+def test_cada_ciclo_tiene_su_salto_de_vuelta():
+    codigo = ensamblador(CICLOS, ['3'])
+    etiquetas = [linea[:-1] for linea in codigo if linea.endswith(':')]
+    assert len(etiquetas) == len(set(etiquetas)) == 5
+    saltos = [linea.split()[1] for linea in codigo if linea.startswith("j ")]
+    assert saltos == ["L1", "L3"]
+
+
+def test_compilar_sin_ejecutar_da_el_mismo_codigo():
+    compilado = [str(linea) for linea in compilar_programa(CICLOS).ensamblador]
+    assert compilado == ensamblador(CICLOS, ['7'])
+
+
+def muchas_variables(cantidad, tipo=""):
+    nombres = [f"v{i}" for i in range(cantidad)]
+    lineas = [f"var {', '.join(nombres)}, s{tipo};"]
+    lineas += [f"read({nombre});" for nombre in nombres]
+    lineas.append("s := 0;")
+    lineas += [f"s := s {nombre} +;" for nombre in nombres]
+    lineas += [f"println({nombre});" for nombre in nombres]
+    lineas.append("println(s);")
+    return "\n".join(lineas), [str(i) for i in range(cantidad)]
+
+
+def test_asignador_reutiliza_registros_libres():
+    codigo = [asm('li.s', '%a', '1.0'), asm('fadd.s', '%b', '%a', '%a'), asm('li.s', '%c', '2.0'),
+              asm('fmul.s', '%d', '%b', '%c'), asm('fmv.s', 'fa0', '%d')]
+    _, ubicaciones = AsignadorRegistros(tuple(f"ft{i}" for i in range(8))).asignar(codigo)
+    # %a muere al calcular %b, así que %c puede usar su registro
+    assert ubicaciones['%c'] == ubicaciones['%a']
+    assert ubicaciones['%b'] != ubicaciones['%a']
+
+
+def test_asignador_derrama_cuando_no_alcanzan():
+    codigo = [asm('li.s', f'%v{i}', f'{i}.0') for i in range(5)]
+    codigo.append(asm('fadd.s', '%s', '%v0', '%v1'))
+    codigo += [asm('fadd.s', '%s', '%s', f'%v{i}') for i in range(2, 5)]
+    codigo.append(asm('fmv.s', 'fa0', '%s'))
+    fisico, ubicaciones = AsignadorRegistros(('ft0', 'ft1', 'ft2', 'ft3')).asignar(codigo)
+    derramados = [ubicacion for ubicacion in ubicaciones.values() if ubicacion.endswith('(sp)')]
+    assert len(derramados) == 4
+    texto = [str(linea) for linea in fisico]
+    assert texto[0] == 'addi sp, sp, -16' and texto[-1] == 'addi sp, sp, 16'
+    # Los derramados se cargan en los dos registros auxiliares
+    assert 'flw ft3, 0(sp)' in texto
+    assert not any('%' in linea for linea in texto)
+    assert simular(fisico).valor('fa0') == 10.0
+
+
+@pytest.mark.parametrize('tipo, guardar', [("", "fsw"), (" : integer", "sw")])
+def test_mas_variables_vivas_que_registros(tipo, guardar):
+    codigo, entradas = muchas_variables(40, tipo)
+    resultado = ejecutar_programa(codigo, entradas)
+    assert float(resultado.salida.splitlines()[-1]) == 780
+    generado = resultado.ensamblador
+    assert not any('%' in linea for linea in generado)
+    assert any(linea.startswith(guardar + " ") and "(sp)" in linea for linea in generado)
+    registros = {int(numero) for linea in generado for numero in re.findall(r"\bft(\d+)", linea)}
+    assert max(registros, default=0) <= 31
+    validacion = validar_programa(codigo, entradas)
+    assert validacion.correcta
+    assert validacion.simulacion.salida[-2] == 780
+
+
+def cuerpo_del_ciclo(codigo, inicio):
+    desde = codigo.index(f"{inicio}:")
+    hasta = codigo.index(f"j {inicio}")
+    return codigo[desde:hasta]
+
+
+def test_mirilla_escribe_en_el_destino():
+    codigo = [asm('fadd.s', '%.t1', '%a', '%b'), asm('fmv.s', '%c', '%.t1')]
+    assert [str(linea) for linea in OptimizadorMirilla().escribir_en_destino(codigo)] == ["fadd.s %c, %a, %b"]
+
+
+def test_mirilla_saca_constantes_de_los_ciclos():
+    normal = ensamblador(CICLOS, ['5'])
+    optimizado = ensamblador(CICLOS, ['5'], optimizar=True)
+    assert any(linea.startswith("li.s") for linea in cuerpo_del_ciclo(normal, "L3"))
+    assert not any(linea.startswith("li.s") for linea in cuerpo_del_ciclo(optimizado, "L3"))
+    assert not any(linea.startswith("fmv.s ft") for linea in cuerpo_del_ciclo(optimizado, "L1"))
+
+
+@pytest.mark.parametrize('codigo, entradas', [
+    (CICLOS, ['50']),
+    muchas_variables(40),
+])
+def test_mirilla_conserva_el_resultado_con_menos_instrucciones(codigo, entradas):
+    normal = ejecutar_programa(codigo, entradas)
+    optimizado = ejecutar_programa(codigo, entradas, optimizar=True)
+    assert optimizado.salida == normal.salida
+    assert len(optimizado.ensamblador) < len(normal.ensamblador)
+
+
+@pytest.mark.parametrize('codigo, entradas', [
+    (CICLOS, ['50']),
+    muchas_variables(40),
+    muchas_variables(20, " : integer"),
+])
+def test_mirilla_ejecuta_menos_instrucciones(codigo, entradas):
+    normal = validar_programa(codigo, entradas)
+    optimizado = validar_programa(codigo, entradas, optimizar=True)
+    assert normal.correcta and optimizado.correcta
+    assert optimizado.simulacion.salida == normal.simulacion.salida
+    assert optimizado.simulacion.instrucciones < normal.simulacion.instrucciones
+
+
+def largo(lineas):
+    cuerpo = [f"x := x {k % 7 + 1} * {k % 5 + 1} +;" for k in range(lineas)]
+    return "\n".join(["var x;", "x := 0;", *cuerpo, "println(x);"])
+
+
+def test_sumidero_archivo_escribe_lo_mismo_que_la_lista(tmp_path):
+    codigo = largo(600)
+    lista = SumideroLista()
+    esperado = ejecutar_programa(codigo, sumidero_ensamblador=lista)
+    ruta = tmp_path / "programa.s"
+    resultado = ejecutar_programa(codigo, sumidero_ensamblador=SumideroArchivo(str(ruta), tam_buffer=256))
+    assert resultado.salida == esperado.salida
+    assert ruta.read_text(encoding='utf-8') == "".join(f"{linea}\n" for linea in lista.lineas)
+
+
+def test_sumidero_comprimido(tmp_path):
+    lista = SumideroLista()
+    ejecutar_programa(CICLOS, ['2'], sumidero_ensamblador=lista)
+    ruta = tmp_path / "programa.s.gz"
+    ejecutar_programa(CICLOS, ['2'], sumidero_ensamblador=SumideroArchivo(str(ruta)))
+    with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+        assert archivo.read().splitlines() == [str(linea) for linea in lista.lineas]
+
+
+def test_sumidero_no_cierra_un_flujo_ajeno():
+    flujo = io.StringIO()
+    ejecutar_programa(CICLOS, ['2'], sumidero_ensamblador=SumideroArchivo(flujo))
+    assert not flujo.closed
+    assert flujo.getvalue().startswith("addi sp, sp, -")
+
+
+@pytest.mark.parametrize('optimizar', [False, True])
+def test_codigo_por_fragmentos_con_su_marco(optimizar):
+    for codigo, entradas in [(CICLOS, ['6']), (largo(600), []), muchas_variables(40)]:
+        lista = SumideroLista()
+        resultado = ejecutar_programa(codigo, entradas, optimizar=optimizar, sumidero_ensamblador=lista)
+        assert resultado.salida == ejecutar_programa(codigo, entradas, generar_ensamblador=False).salida
+        generado = [str(linea) for linea in lista.lineas]
+        tamano = generado[0].split()[-1]
+        assert generado[:2] == [f"addi sp, sp, {tamano}", "mv s0, sp"]
+        assert generado[-1] == f"addi sp, sp, {tamano[1:]}"
+        assert not any('%' in linea for linea in generado)
+
+
+@pytest.mark.parametrize('optimizar', [False, True])
+def test_codigo_por_fragmentos_coincide_con_el_interprete(optimizar):
+    for codigo, entradas in [(CICLOS, ['6']), (largo(600), []), muchas_variables(40)]:
+        validacion = validar_programa(codigo, entradas, optimizar=optimizar, fragmentos=True)
+        assert validacion.correcta
+
+
+def test_lineas_se_convierten_a_texto_al_pedirlas():
+    assert str(asm('li.s', 'ft0', 1.5)) == "li.s ft0, 1.5"
+    assert str(asm('ret')) == "ret"
+    assert str(etiqueta('L1')) == "L1:"
+    assert str(comentario('Inicio del', 'for')) == "# Inicio del for"
+
+
+@pytest.mark.parametrize('texto', ["fadd.s ft2, ft0, ft1", "L7:", "# leer x", "call imprimir_float", "ret"])
+def test_lineas_desde_texto(texto):
+    linea = LineaEnsamblador.desde_texto(texto)
+    assert str(linea) == texto
+    assert linea == LineaEnsamblador.desde_texto(texto)
+    assert hash(linea) == hash(LineaEnsamblador.desde_texto(texto))
+
+
+def test_definiciones_y_usos_de_registros_virtuales():
+    assert definiciones_y_usos('fadd.s', ('%a', '%b', 'ft0')) == (['%a'], ['%b'])
+    assert definiciones_y_usos('fsw', ('%a', '0(sp)')) == ([], ['%a'])
+    assert definiciones_y_usos('beqz', ('t0', 'L1')) == ([], [])
+
+
+def test_resultado_arma_el_texto_una_vez():
+    lineas = [asm('li.s', 'ft0', 2.0), asm('call', 'imprimir_float')]
+    resultado = ResultadoEjecucion("", {}, lineas, [])
+    texto = resultado.ensamblador
+    assert texto == ["li.s ft0, 2.0", "call imprimir_float"]
+    assert resultado.ensamblador is texto
@@ -0,0 +1,89 @@
+import math
+
+import pytest
+
+from interpretepascal import (CON_VALOR, DECLARADA, SIN_DECLARAR, compilar_condicion, compilar_postfija,
+                              construir_dag, ejecutar_programa)
+
+RANURAS = (('a', 0), ('b', 1))
+
+
+def evaluar(expresion):
+    return compilar_postfija(expresion)([], [])
+
+
+def test_pliega_operaciones_entre_literales():
+    dag = construir_dag("2 3 * 4 + sin")
+    assert dag.nodos[dag.raiz] == ('lit', math.sin(10.0))
+
+
+def test_comparte_subexpresiones_repetidas():
+    dag = construir_dag("a b + a b + *")
+    operaciones = [nodo for nodo in dag.nodos if nodo[0] == 'op']
+    assert len(operaciones) == 2
+    assert dag.nodos[dag.raiz][2] == dag.nodos[dag.raiz][3]
+
+
+def test_identidades_exactas():
+    for expresion in ("x 0 -", "x 1 *", "1 x *", "x 1 /", "x 1 ^"):
+        dag = construir_dag(expresion)
+        assert dag.nodos[dag.raiz] == ('var', 'x'), expresion
+
+
+def test_sumar_cero_no_se_simplifica():
+    # -0.0 + 0 da 0.0: no es una identidad
+    for expresion in ("x 0 +", "0 x +"):
+        dag = construir_dag(expresion)
+        assert dag.nodos[dag.raiz][0] == 'op', expresion
+
+
+def test_menos_cero_mas_cero_da_cero():
+    resultado = ejecutar_programa("var x, y;\nx := 0 -1 *;\nx := x 0 *;\ny := x 0 +;\nprintln(x);\nprintln(y);",
+                                  generar_ensamblador=False)
+    assert resultado.salida == "-0.0\n0.0\n"
+
+
+def test_no_pliega_lo_que_fallaria():
+    dag = construir_dag("1 0 /")
+    assert dag.nodos[dag.raiz][0] == 'op'
+
+
+def test_evaluador_con_literales():
+    assert evaluar("2 3 ^ 1 -") == 7.0
+    assert evaluar("") == 0
+
+
+def test_evaluador_con_variables_en_ranuras():
+    funcion = compilar_postfija("a b + a *", RANURAS)
+    assert funcion([2.0, 3.0], [CON_VALOR, CON_VALOR]) == 10.0
+    assert funcion([-1.0, 0.5], [CON_VALOR, CON_VALOR]) == 0.5
+
+
+def test_evaluador_se_compila_una_vez():
+    assert compilar_postfija("a b + a *", RANURAS) is compilar_postfija("a b + a *", RANURAS)
+    assert compilar_condicion("a b <", RANURAS) is compilar_condicion("a b <", RANURAS)
+
+
+@pytest.mark.parametrize('estado, mensaje', [
+    ([DECLARADA, CON_VALOR], "Error: Variable 'a' no tiene valor."),
+    ([SIN_DECLARAR, CON_VALOR], "Token no reconocido: a"),
+])
+def test_evaluador_con_variables_sin_valor(estado, mensaje):
+    with pytest.raises(Exception, match=mensaje):
+        compilar_postfija("a b +", RANURAS)([1.0, 2.0], estado)
+
+
+def test_evaluador_division_por_cero():
+    with pytest.raises(Exception, match="División por cero"):
+        compilar_postfija("a b /", RANURAS)([1.0, 0.0], [CON_VALOR, CON_VALOR])
+
+
+def test_evaluador_con_operandos_faltantes():
+    with pytest.raises(IndexError):
+        compilar_postfija("a +", RANURAS)([1.0, 2.0], [CON_VALOR, CON_VALOR])
+
+
+def test_condicion():
+    condicion = compilar_condicion("a 3 <=", RANURAS)
+    assert condicion([3.0, 0.0], [CON_VALOR, CON_VALOR]) is True
+    assert condicion([3.5, 0.0], [CON_VALOR, CON_VALOR]) is False
@@ -0,0 +1,70 @@
+import math
+
+import pytest
+
+from interpretepascal import a_postfija, ejecutar_programa, es_infija
+
+
+def ejecutar(codigo, entradas=()):
+    return ejecutar_programa(codigo, entradas, generar_ensamblador=False)
+
+
+@pytest.mark.parametrize("infija, postfija", [
+    ("a + b * 2", "a b 2 * +"),
+    ("(a + b) * 2", "a b + 2 *"),
+    ("a - b - c", "a b - c -"),
+    ("2 ^ 3 ^ 2", "2 3 2 ^ ^"),
+    ("-a ^ 2", "a 2 ^ -1 *"),
+    ("a - -b", "a b -1 * -"),
+    ("sin(a + b) * 2", "a b + sin 2 *"),
+    ("SIN(a)", "a sin"),
+])
+def test_traduccion_a_postfija(infija, postfija):
+    assert a_postfija(infija) == postfija
+
+
+def test_distingue_postfijas_de_infijas():
+    assert es_infija("a + b")
+    assert es_infija("(a)")
+    assert not es_infija("a b +")
+    assert not es_infija("a sin")
+    assert es_infija("-a")
+    # Sin operadores es una postfija mal formada, no una infija
+    assert not es_infija("x y foo")
+
+
+@pytest.mark.parametrize("funcion", ["sin", "SIN", "Sin", "cOs"])
+def test_postfija_con_funcion_en_mayusculas(funcion):
+    # Antes de aceptar infijas, 'a SIN' ya era una postfija válida
+    assert not es_infija(f"a {funcion}")
+    resultado = ejecutar(f"var a, s;\na := 0.5;\ns := a {funcion};\nprintln(s);")
+    assert resultado.errores == []
+    esperado = math.sin(0.5) if funcion.lower() == 'sin' else math.cos(0.5)
+    assert resultado.variables['s'] == esperado
+
+
+def test_infija_y_postfija_dan_lo_mismo():
+    infija = ejecutar("var a, b, r;\na := 3;\nb := 4;\nr := (a + b) * -a / 2 ^ 2;")
+    postfija = ejecutar("var a, b, r;\na := 3;\nb := 4;\nr := a b + 0 a - * 2 2 ^ /;")
+    assert infija.variables['r'] == postfija.variables['r'] == -5.25
+
+
+@pytest.mark.parametrize("expresion, mensaje", [
+    ("(a + b", "Paréntesis desbalanceados"),
+    ("a + * b", "Expresión inválida"),
+    ("raiz(a) + 1", "Función no reconocida: raiz"),
+])
+def test_errores_de_infijas(expresion, mensaje):
+    resultado = ejecutar(f"var a, b, r;\na := 1;\nb := 2;\nr := {expresion};")
+    assert len(resultado.errores) == 1
+    assert mensaje in resultado.errores[0]
+
+
+def test_menos_unario_conserva_el_signo_del_cero():
+    resultado = ejecutar("var a, b, c;\na := 0;\nb := -a;\na := b;\nc := -a;\nprintln(b);\nprintln(c);")
+    assert resultado.salida == "-0.0\n0.0\n"
+
+
+def test_postfija_con_token_desconocido():
+    resultado = ejecutar("var x, y, z;\nx := 1;\ny := 2;\nz := x y foo;")
+    assert resultado.errores == ["Error en línea 4: Token no reconocido: foo"]
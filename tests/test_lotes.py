@@ -0,0 +1,107 @@
+import itertools
+
+import ejecutor_lotes
+from ejecutor_lotes import Trabajo, clave_programa, ejecutar_trabajos
+from interpretepascal import Presupuesto, compilar_programa, ejecutar_programa
+
+SUMA = "var x, y, s;\nread(x);\nread(y);\ns := x y +;\nprintln(s);"
+CUADRADOS = """var n, i, s;
+read(n);
+s := 0;
+for i := 1 to n do
+    s := s i i * +;
+endfor
+println(s);"""
+LENTO = """var n, i;
+read(n);
+i := 0;
+while i n < do
+    i := i 1 +;
+endwhile
+println(i);"""
+
+
+def trabajos_mezclados(cantidad):
+    for numero in range(cantidad):
+        if numero % 2:
+            yield Trabajo(numero, SUMA, [str(numero), "1"])
+        else:
+            yield Trabajo(numero, CUADRADOS, [str(numero)])
+
+
+def test_resultados_en_orden_iguales_a_ejecutar_directo():
+    trabajos = list(trabajos_mezclados(40))
+    resultados = list(ejecutar_trabajos(iter(trabajos), procesos=2, tam_bloque=3))
+    assert [id for id, _ in resultados] == list(range(40))
+    for trabajo, (_, resultado) in zip(trabajos, resultados):
+        esperado = ejecutar_programa(trabajo.codigo, trabajo.entradas, generar_ensamblador=False)
+        assert resultado.salida == esperado.salida
+        assert resultado.variables == esperado.variables
+
+
+def test_sin_orden_entrega_todos():
+    resultados = dict(ejecutar_trabajos(trabajos_mezclados(30), procesos=3, tam_bloque=1, en_orden=False))
+    assert sorted(resultados) == list(range(30))
+    assert resultados[7].salida == "8.0\n"
+
+
+def test_errores_de_compilacion_por_trabajo():
+    trabajos = [Trabajo('a', SUMA, ["1", "2"]),
+                Trabajo('b', "var x;\nwhile x 1 < do\nx := x 1 +;"),
+                Trabajo('c', CUADRADOS, ["3"])]
+    resultados = dict(ejecutar_trabajos(trabajos, procesos=2, incluir_ensamblador=True,
+                                        presupuesto=Presupuesto(ensamblador=10)))
+    assert resultados['a'].salida == "3.0\n"
+    assert resultados['b'].errores[0].startswith("Error:")
+    assert resultados['c'].errores[0].startswith("Error en línea")
+    assert "instrucciones de ensamblador" in resultados['c'].errores[0]
+
+
+def test_consume_los_trabajos_a_medida_que_avanza():
+    leidos = []
+
+    def sin_fin():
+        for numero in itertools.count():
+            leidos.append(numero)
+            yield Trabajo(numero, SUMA, [str(numero), "0"])
+
+    resultados = ejecutar_trabajos(sin_fin(), procesos=2, tam_bloque=2)
+    primeros = list(itertools.islice(resultados, 10))
+    resultados.close()
+    assert [resultado.salida for _, resultado in primeros] == [f"{float(n)}\n" for n in range(10)]
+    assert len(leidos) <= 10 + 2 * 4 * 2 * 2
+
+
+def test_un_trabajo_lento_no_acumula_resultados_sin_limite():
+    leidos = []
+
+    def trabajos():
+        leidos.append(0)
+        yield Trabajo('lento', LENTO, ["300000"])
+        for numero in itertools.count(1):
+            leidos.append(numero)
+            yield Trabajo(numero, SUMA, [str(numero), "0"])
+
+    resultados = ejecutar_trabajos(trabajos(), procesos=2, tam_bloque=1)
+    id, resultado = next(resultados)
+    leidos_al_primero = len(leidos)
+    resultados.close()
+    assert (id, resultado.salida) == ('lento', "300000.0\n")
+    # En vuelo como mucho 8 bloques y retenidos como mucho 8 resultados
+    assert leidos_al_primero <= 8 + 8 + 2
+
+
+def test_trabajador_devuelve_los_trabajos_sin_programa(monkeypatch):
+    monkeypatch.setattr(ejecutor_lotes, '_PROGRAMAS', {})
+    clave = clave_programa(SUMA)
+    bloque = [(0, clave, ["1", "2"]), (1, clave, ["3", "4"])]
+    resultados, faltantes = ejecutor_lotes._ejecutar_bloque(bloque, {}, None, False)
+    assert (resultados, faltantes) == ([], bloque)
+
+    programa = compilar_programa(SUMA, False)
+    resultados, faltantes = ejecutor_lotes._ejecutar_bloque(bloque, {clave: programa}, None, False)
+    assert faltantes == []
+    assert [resultado.salida for _, resultado in resultados] == ["3.0\n", "7.0\n"]
+    # El programa queda guardado para los bloques siguientes
+    resultados, faltantes = ejecutor_lotes._ejecutar_bloque(bloque[:1], {}, None, False)
+    assert faltantes == [] and len(resultados) == 1
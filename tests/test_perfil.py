@@ -0,0 +1,80 @@
+import json
+
+from interpretepascal import Perfil, ejecutar_programa
+
+ANIDADOS = """var n, m, a, j, t;
+read(n);
+read(m);
+t := 0;
+a := 0;
+while a n < do
+    a := a 1 +;
+    j := 0;
+    while j m < do
+        t := t a +;
+        j := j 1 +;
+    endwhile
+endwhile
+println(t);"""
+
+
+def perfilar(codigo, entradas, **opciones):
+    perfil = Perfil()
+    resultado = ejecutar_programa(codigo, entradas, perfil=perfil, **opciones)
+    return perfil, resultado
+
+
+def test_cuenta_ejecuciones_por_linea():
+    perfil, resultado = perfilar(ANIDADOS, ['2', '3'])
+    assert resultado.salida == "9.0\n"
+    veces = {linea['linea']: linea['veces'] for linea in perfil.como_diccionario()['lineas']}
+    assert veces[1] == 1
+    assert veces[7] == 2
+    assert veces[10] == 6
+    assert veces[14] == 1
+
+
+def test_cuenta_entradas_e_iteraciones_de_ciclos():
+    perfil, _ = perfilar(ANIDADOS, ['2', '3'])
+    assert perfil.como_diccionario()['ciclos'] == [
+        {'linea': 6, 'entradas': 1, 'iteraciones': 2},
+        {'linea': 9, 'entradas': 2, 'iteraciones': 6},
+    ]
+
+
+def test_ensamblador_y_evaluaciones_por_linea():
+    perfil, _ = perfilar(ANIDADOS, ['1', '1'])
+    lineas = perfil.como_diccionario()['lineas']
+    assert lineas[0]['ensamblador'] == 0 and lineas[0]['evaluaciones'] == 0
+    assert lineas[1]['ensamblador'] == 2
+    assert lineas[9]['evaluaciones'] == 1
+
+
+def test_ganchos_y_reportes():
+    llamadas = []
+    perfil = Perfil([llamadas.append])
+    ejecutar_programa(ANIDADOS, ['1', '2'], perfil=perfil)
+    assert llamadas == [perfil]
+    datos = json.loads(perfil.a_json())
+    assert datos['tiempo_total'] >= 0
+    assert len(datos['lineas']) == 14
+    tabla = perfil.tabla()
+    assert tabla.startswith("Línea")
+    assert "Ciclo  Entradas   Iteraciones  Promedio" in tabla
+
+
+def test_el_perfil_no_cambia_el_resultado():
+    _, perfilado = perfilar(ANIDADOS, ['3', '4'])
+    normal = ejecutar_programa(ANIDADOS, ['3', '4'])
+    assert perfilado.salida == normal.salida
+    assert perfilado.variables == normal.variables
+
+
+def test_for_en_forma_cerrada_cuenta_sus_iteraciones():
+    codigo = "var n, i, s;\nread(n);\ns := 0;\nfor i := 1 to n do\n    s := s i +;\nendfor"
+    perfil, resultado = perfilar(codigo, ['100'], generar_ensamblador=False)
+    assert resultado.variables['s'] == 5050.0
+    datos = perfil.como_diccionario()
+    assert datos['ciclos'] == [{'linea': 4, 'entradas': 1, 'iteraciones': 100}]
+    # El cuerpo no se ejecutó: el resultado se calculó sin iterar
+    assert datos['lineas'][4]['veces'] == 0
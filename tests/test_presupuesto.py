@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from interpretepascal import (Presupuesto, PresupuestoExcedido, TiempoLimiteExcedido, compilar_programa,
+                              ejecutar_programa, ejecutar_programa_asincrono)
+
+CONTAR = """var n, i;
+read(n);
+i := 0;
+while i n < do
+    i := i 1 +;
+endwhile
+println(i);"""
+
+
+def ejecutar(entradas, **opciones):
+    return ejecutar_programa(CONTAR, entradas, generar_ensamblador=False, **opciones)
+
+
+def test_sin_presupuesto_no_hay_limites():
+    resultado = ejecutar(['10'], presupuesto=Presupuesto())
+    assert resultado.errores == [] and resultado.salida == "10.0\n"
+
+
+def test_sentencias():
+    assert ejecutar(['10'], presupuesto=Presupuesto(sentencias=100)).errores == []
+    resultado = ejecutar(['10'], presupuesto=Presupuesto(sentencias=20))
+    assert resultado.errores == ["Error en línea 5: Presupuesto excedido: más de 20 sentencias ejecutadas"]
+    assert resultado.salida == ""
+
+
+def test_iteraciones():
+    assert ejecutar(['10'], presupuesto=Presupuesto(iteraciones=10)).errores == []
+    assert ejecutar(['10'], presupuesto=Presupuesto(iteraciones=9)).errores == [
+        "Error en línea 6: Presupuesto excedido: más de 9 iteraciones de ciclos"]
+
+
+@pytest.mark.parametrize('opciones', [{'presupuesto': Presupuesto(tiempo=0.05)}, {'tiempo_limite': 0.05}])
+def test_tiempo(opciones):
+    assert ejecutar(['1e12'], **opciones).errores == ["Error en línea 5: Tiempo límite excedido (0.05 s)"]
+
+
+def test_tiempo_limite_es_un_presupuesto():
+    error = TiempoLimiteExcedido(2, 7)
+    assert isinstance(error, PresupuestoExcedido)
+    assert error.recurso == 'tiempo' and error.linea == 7
+    assert str(error) == "Tiempo límite excedido (2 s)"
+
+
+def test_ensamblador():
+    with pytest.raises(PresupuestoExcedido) as excepcion:
+        compilar_programa(CONTAR, presupuesto=Presupuesto(ensamblador=5))
+    assert excepcion.value.recurso == 'ensamblador' and excepcion.value.linea == 5
+    # Sin generar ensamblador el límite no aplica
+    compilar_programa(CONTAR, False, presupuesto=Presupuesto(ensamblador=5))
+    assert ejecutar_programa(CONTAR, ['3'], presupuesto=Presupuesto(ensamblador=5)).errores == [
+        "Error en línea 5: Presupuesto excedido: más de 5 instrucciones de ensamblador"]
+
+
+def test_modo_asincrono():
+    for presupuesto, error in [
+        (Presupuesto(sentencias=20), "Error en línea 5: Presupuesto excedido: más de 20 sentencias ejecutadas"),
+        (Presupuesto(iteraciones=3), "Error en línea 6: Presupuesto excedido: más de 3 iteraciones de ciclos"),
+    ]:
+        resultado = asyncio.run(ejecutar_programa_asincrono(CONTAR, iter(['10']), presupuesto=presupuesto))
+        assert resultado.errores == [error]
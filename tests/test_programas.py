@@ -0,0 +1,146 @@
+import pytest
+
+from interpretepascal import OP_ASIGNAR, OP_PRINTLN, OP_READ, OP_VAR, compilar_programa, ejecutar_programa
+
+BASICO = """var x, y, suma, resta, multiplicacion, division;
+read(x);
+read(y);
+suma := x y +;
+resta := x y -;
+multiplicacion := x y *;
+division := x y /;
+println("Resultados:");
+print("Suma: ");
+println(suma);
+print("Resta: ");
+println(resta);
+print("Multiplicación: ");
+println(multiplicacion);
+print("División: ");
+println(division);"""
+
+TRIGONOMETRICO = """var angulo, seno, coseno, tangente;
+read(angulo);
+seno := angulo sin;
+coseno := angulo cos;
+tangente := angulo tan;
+println("Resultados trigonométricos:");
+print("Seno: ");
+println(seno);
+print("Coseno: ");
+println(coseno);
+print("Tangente: ");
+println(tangente);"""
+
+FOR = """var n, i, suma, factorial;
+read(n);
+suma := 0;
+factorial := 1;
+println("Calculando suma y factorial...");
+for i := 1 to n do
+    suma := suma i +;
+    factorial := factorial i *;
+    print("i=");
+    print(i);
+    print(" suma=");
+    print(suma);
+    print(" factorial=");
+    println(factorial);
+endfor
+println("Resultados finales:");
+print("Suma total: ");
+println(suma);
+print("Factorial: ");
+println(factorial);"""
+
+WHILE = """var n, contador, potencia;
+read(n);
+contador := 1;
+potencia := 1;
+println("Calculando potencias de 2...");
+while contador n <= do
+    potencia := potencia 2 *;
+    print("2^");
+    print(contador);
+    print(" = ");
+    println(potencia);
+    contador := contador 1 +;
+endwhile"""
+
+COMPLETO = """var a, b, c, discriminante, x, resultado, i;
+println("Calculadora de ecuación cuadrática y análisis");
+println("Ingresa los coeficientes a, b, c:");
+read(a);
+read(b);
+read(c);
+discriminante := b b * 4 a * c * -;
+print("Discriminante: ");
+println(discriminante);
+println("Evaluando la función en varios puntos:");
+for i := 1 to 3 do
+    x := i;
+    resultado := a x * x * b x * + c +;
+    print("f(");
+    print(x);
+    print(") = ");
+    println(resultado);
+endfor"""
+
+# Salidas del intérprete original, que re-separaba cada línea al ejecutarla
+CASOS = [
+    (BASICO, ['7', '2'],
+     "Resultados:\nSuma: 9.0\nResta: 5.0\nMultiplicación: 14.0\nDivisión: 3.5\n", []),
+    (TRIGONOMETRICO, ['0.5'],
+     "Resultados trigonométricos:\nSeno: 0.479425538604203\nCoseno: 0.8775825618903728\n"
+     "Tangente: 0.5463024898437905\n", []),
+    (FOR, ['5'],
+     "Calculando suma y factorial...\n"
+     "i=1.0 suma=1.0 factorial=1.0\ni=2.0 suma=3.0 factorial=2.0\ni=3.0 suma=6.0 factorial=6.0\n"
+     "i=4.0 suma=10.0 factorial=24.0\ni=5.0 suma=15.0 factorial=120.0\n"
+     "Resultados finales:\nSuma total: 15.0\nFactorial: 120.0\n", []),
+    (WHILE, ['5'],
+     "Calculando potencias de 2...\n2^1.0 = 2.0\n2^2.0 = 4.0\n2^3.0 = 8.0\n2^4.0 = 16.0\n2^5.0 = 32.0\n", []),
+    (COMPLETO, ['1', '5', '2'],
+     "Calculadora de ecuación cuadrática y análisis\nIngresa los coeficientes a, b, c:\n"
+     "Discriminante: 17.0\nEvaluando la función en varios puntos:\n",
+     ["Error en línea 11: Variable '3' no declarada en el for"]),
+    ("var x, y, d;\nread(x);\nread(y);\nd := x y /;\nprintln(d);", ['7', '0'],
+     "", ["Error en línea 4: Error: División por cero"]),
+    ("var x, y;\nx := 5\nprint(x);", [],
+     "", ["Error en línea 2: Error en línea 2: Falta punto y coma (;)"]),
+    ("var x;\nvar x;", [],
+     "", ["Error en línea 2: Error: Variable 'x' ya está declarada"]),
+    ("var x;\nx := 1 z +;", [],
+     "", ["Error en línea 2: Token no reconocido: z"]),
+    ("var x, y;\nx := y 1 +;", [],
+     "", ["Error en línea 2: Error: Variable 'y' no tiene valor."]),
+    ('var x;\nx := 2 10 ^;\nwrite(x);\nwrite("hola");', [],
+     'x: 1024.0\n"hola"\n', []),
+    ("var x, y;\nx := 2 3 * 4 +;\ny := x 2 * 1 -;\nprintln(y);", [],
+     "19.0\n", []),
+]
+
+
+@pytest.mark.parametrize('codigo, entradas, salida, errores', CASOS)
+def test_igual_que_el_interprete_original(codigo, entradas, salida, errores):
+    resultado = ejecutar_programa(codigo, entradas, generar_ensamblador=False)
+    assert resultado.salida == salida
+    assert resultado.errores == errores
+
+
+def test_compila_una_vez_y_ejecuta_muchas():
+    programa = compilar_programa(BASICO, False)
+    opcodes = [instruccion.opcode for instruccion in programa.instrucciones]
+    assert opcodes[:4] == [OP_VAR, OP_READ, OP_READ, OP_ASIGNAR]
+    assert opcodes.count(OP_PRINTLN) == 5
+    for x, y in [(7, 2), (1, 4), (-3, 0.5)]:
+        resultado = ejecutar_programa(programa, [str(x), str(y)], generar_ensamblador=False)
+        assert resultado.errores == []
+        assert resultado.variables['suma'] == x + y
+        assert resultado.variables['division'] == x / y
+
+
+def test_el_ciclo_se_ejecuta_sin_volver_a_compilar():
+    resultado = ejecutar_programa(FOR, ['200'], generar_ensamblador=False)
+    assert resultado.variables['suma'] == 20100.0
+    assert resultado.salida.count("\n") == 1 + 200 + 3
@@ -0,0 +1,83 @@
+import io
+
+import pytest
+
+from interpretepascal import SesionIncremental
+
+SUMA = ['var x, i, s;', 'read(x);', 's := 0;', 'for i := 1 to x do', 's := s i +;', 'endfor']
+
+
+def sesion_con(lineas, entradas):
+    sesion = SesionIncremental(entrada=iter(entradas))
+    for linea in lineas:
+        sesion.agregar(linea)
+    return sesion
+
+
+def valor(sesion, nombre):
+    return sesion.variables[nombre]['valor']
+
+
+def test_cada_sentencia_se_ejecuta_al_completarse():
+    sesion = SesionIncremental(entrada=iter(['3']))
+    assert [sesion.agregar(linea) for linea in SUMA[:5]] == [1, 2, 3, None, None]
+    assert 's' in sesion.variables and valor(sesion, 's') == 0.0
+    assert sesion.agregar('endfor') == 4
+    assert valor(sesion, 's') == 6.0
+
+
+def test_editar_vuelve_a_ejecutar_desde_el_cambio():
+    sesion = sesion_con(['var x, y;', 'read(x);', 'y := x 2 *;', 'println(y);'], ['3'])
+    assert sesion.texto_salida == "6.0\n"
+    compilada = sesion.interprete.instrucciones[1]
+    assert sesion.reemplazar(3, 'y := x 3 *;') == 3
+    assert sesion.texto_salida == "9.0\n"
+    # Las sentencias anteriores al cambio no se recompilan ni se vuelve a pedir el valor
+    assert sesion.interprete.instrucciones[1] is compilada
+    assert sesion.entradas == ['3']
+
+
+def test_insertar_y_borrar():
+    sesion = sesion_con(SUMA, ['3'])
+    assert sesion.insertar(3, 'println(x);') == 3
+    assert sesion.texto_salida == "3.0\n"
+    assert sesion.borrar(3) == 3
+    assert sesion.texto_salida == ""
+    assert valor(sesion, 's') == 6.0
+    with pytest.raises(Exception, match="No existe la línea 40"):
+        sesion.borrar(40)
+    with pytest.raises(Exception, match="No existe la línea 9"):
+        sesion.insertar(9, 'println(x);')
+
+
+def test_errores_y_correccion():
+    sesion = sesion_con(SUMA, ['3'])
+    assert sesion.agregar('z := 1;') == 7
+    assert sesion.error == "Error en línea 7: Error: Variable 'z' no declarada."
+    assert sesion.borrar(7) == 7
+    assert sesion.error is None
+    assert sesion.agregar('x := 5') == 7
+    assert sesion.error == "Error en línea 7: Error en línea 7: Falta punto y coma (;)"
+
+
+def test_valores_invalidos_se_vuelven_a_pedir():
+    pedidos = []
+    valores = iter(['abc', '2', '7.5', '5'])
+
+    def leer(mensaje=''):
+        pedidos.append(mensaje)
+        return next(valores)
+
+    eco = io.StringIO()
+    sesion = SesionIncremental(entrada=leer, eco=eco)
+    sesion.agregar('var x : integer;')
+    sesion.agregar('read(x);')
+    assert sesion.error == "Error en línea 2: Valor inválido ingresado" and sesion.entradas == []
+    sesion.agregar('read(x);')
+    # 7.5 no es un integer válido: no se guarda
+    assert sesion.error == "Error en línea 3: Valor inválido ingresado" and sesion.entradas == ['2']
+    assert sesion.reemplazar(2, 'read(x);') == 3
+    assert sesion.error is None and sesion.entradas == ['2', '5']
+    sesion.agregar('println(x);')
+    assert len(pedidos) == 4
+    assert eco.getvalue() == sesion.texto_salida == "5\n"
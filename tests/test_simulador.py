@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from simulador_riscv import COSTOS_CICLOS, main, simular, validar_programa
+
+# Suma 1 + 2 + 3 con un ciclo y la imprime
+CICLO = """li.s ft0, 0.0
+li.s ft1, 1.0
+li.s ft2, 3.0
+L1:
+fle.s t0, ft1, ft2
+beqz t0, L2
+fadd.s ft0, ft0, ft1
+li.s ft3, 1.0
+fadd.s ft1, ft1, ft3
+j L1
+L2:
+fmv.s fa0, ft0
+call imprimir_float
+call imprimir_salto_linea""".split("\n")
+
+FACTORIAL = """var n, i, f;
+read(n);
+f := 1;
+for i := 1 to n do
+    f := f i *;
+endfor
+println(f);"""
+
+
+def test_conteos_de_un_ciclo():
+    resultado = simular(CICLO)
+    assert resultado.error is None
+    assert resultado.salida == [6.0, '\n']
+    assert resultado.valor('ft0') == 6.0
+    assert resultado.instrucciones == 26
+    assert resultado.saltos_tomados == 4
+    assert resultado.por_mnemonico == {'li.s': 6, 'fle.s': 4, 'beqz': 4, 'fadd.s': 6, 'j': 3, 'fmv.s': 1,
+                                       'call': 2}
+    assert resultado.llamadas == {'imprimir_float': 1, 'imprimir_salto_linea': 1}
+    assert resultado.ciclos == (sum(COSTOS_CICLOS[mnemonico] * conteo
+                                    for mnemonico, conteo in resultado.por_mnemonico.items())
+                                + 4 * COSTOS_CICLOS['salto_tomado'])
+    assert resultado.como_diccionario()['instrucciones'] == 26
+
+
+def test_costos_propios():
+    resultado = simular(['li.s ft1, 5.0', 'li.s ft2, 3.0', 'fadd.s ft3, ft1, ft2'], costos={'fadd.s': 10})
+    assert resultado.valor('ft3') == 8.0
+    assert resultado.ciclos == 2 * COSTOS_CICLOS['li.s'] + 10
+
+
+def test_entradas_y_precision():
+    codigo = ['call leer_float', 'fmv.s ft0, fa0', 'li.s ft1, 3.0', 'fdiv.s ft2, ft0, ft1']
+    assert simular(codigo, ['1']).valor('ft2') == 1 / 3
+    assert simular(codigo, ['1'], precision_simple=True).valor('ft2') == pytest.approx(1 / 3, rel=1e-7)
+    assert simular(codigo, ['1'], precision_simple=True).valor('ft2') != 1 / 3
+
+
+def test_registros_enteros():
+    resultado = simular(['li s1, 5', 'li s2, 3', 'add s3, s1, s2'], costos={'add': 10})
+    assert resultado.valor('s3') == 8
+    assert resultado.ciclos == 12
+    codigo = ['li s1, 2147483647', 'addi s1, s1, 1']
+    assert simular(codigo).valor('s1') == 2147483648
+    assert simular(codigo, enteros_32=True).valor('s1') == -2147483648
+
+
+@pytest.mark.parametrize('codigo, error', [
+    (CICLO, None),
+    (['frob ft0'], "Instrucción no soportada: frob"),
+    (['call misterio'], "Función no soportada: misterio"),
+])
+def test_errores(codigo, error):
+    assert simular(codigo).error == error
+
+
+def test_limite_de_instrucciones():
+    assert simular(CICLO, limite=10).error == "Límite de 10 instrucciones excedido"
+
+
+def test_validar_programa():
+    validacion = validar_programa(FACTORIAL, ['5'])
+    assert validacion.correcta
+    assert validacion.diferencias == {}
+    assert validacion.salida_coincide
+    assert validacion.simulacion.salida == [120.0, '\n']
+
+
+def test_linea_de_comandos(tmp_path, capsys):
+    programa = tmp_path / "factorial.pas"
+    programa.write_text(FACTORIAL, encoding='utf-8')
+    assert main([str(programa), '--entradas', '4', '--json']) == 0
+    datos = json.loads(capsys.readouterr().out)
+    assert datos['simulacion']['instrucciones'] > 0
+    assert main([str(programa), '--entradas', '4']) == 0
+    assert "Los valores finales coinciden" in capsys.readouterr().out
@@ -0,0 +1,72 @@
+import pytest
+
+from interpretepascal import ejecutar_programa
+from simulador_riscv import validar_programa
+
+FACTORIAL = """var n, i, f : integer;
+var r;
+read(n);
+f := 1;
+for i := 1 to n do
+    f := f i *;
+endfor
+r := f 2 /;
+println(f);
+println(r);"""
+
+
+def ejecutar(codigo, entradas=()):
+    return ejecutar_programa(codigo, entradas, generar_ensamblador=False)
+
+
+def test_enteros_exactos_y_reales_por_omision():
+    resultado = ejecutar(FACTORIAL, ['25'])
+    assert resultado.errores == []
+    assert resultado.variables['f'] == 15511210043330985984000000
+    assert type(resultado.variables['f']) is int
+    assert type(resultado.variables['r']) is float
+    assert resultado.salida.splitlines()[0] == "15511210043330985984000000"
+
+
+def test_entero_a_real_se_convierte():
+    resultado = ejecutar("var a : integer;\nvar x;\na := 7;\nx := a;\nprintln(x);")
+    assert resultado.salida == "7.0\n"
+
+
+def test_real_en_variable_entera_es_error():
+    resultado = ejecutar("var a : integer;\nvar x;\nx := 1.5;\na := x 2 *;")
+    assert len(resultado.errores) == 1
+    assert "Tipos incompatibles" in resultado.errores[0]
+    assert "'a'" in resultado.errores[0]
+
+
+def test_literal_no_entero_en_variable_entera_es_error():
+    resultado = ejecutar("var a : integer;\na := 2.5;")
+    assert "Tipos incompatibles" in resultado.errores[0]
+
+
+def test_redeclarar_con_otro_tipo_es_error():
+    resultado = ejecutar("var a : integer;\nvar a;")
+    assert "ya está declarada" in resultado.errores[0]
+
+
+def test_leer_real_en_variable_entera_es_error():
+    resultado = ejecutar("var a : integer;\nread(a);", ['2.5'])
+    assert resultado.errores
+
+
+@pytest.mark.parametrize('optimizar', [False, True])
+@pytest.mark.parametrize('fragmentos', [False, True])
+def test_ensamblador_coincide_sin_desborde(optimizar, fragmentos):
+    validacion = validar_programa(FACTORIAL, ['12'], optimizar=optimizar, fragmentos=fragmentos)
+    assert validacion.correcta
+    assert validacion.simulacion.salida[0] == 479001600
+
+
+@pytest.mark.parametrize('fragmentos', [False, True])
+def test_desborde_de_32_bits_se_reporta(fragmentos):
+    validacion = validar_programa(FACTORIAL, ['40'], fragmentos=fragmentos)
+    assert not validacion.correcta
+    esperado, obtenido = validacion.diferencias['f']
+    assert esperado == 815915283247897734345611269596115894272000000000
+    assert -2**31 <= obtenido < 2**31
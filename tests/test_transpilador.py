@@ -0,0 +1,84 @@
+import io
+
+import pytest
+
+from interpretepascal import ejecutar_programa
+from transpilador import NoTranspilable, ejecutar_transpilado, transpilar
+
+PROGRAMAS = [
+    ("""var n, i, suma, factorial;
+read(n);
+suma := 0;
+factorial := 1;
+for i := 1 to n do
+    suma := suma i +;
+    factorial := factorial i *;
+    print(i);
+    print(" ");
+    println(factorial);
+endfor
+println(suma);""", ['6']),
+    ("""var n, contador, potencia;
+read(n);
+contador := 1;
+potencia := 1;
+while contador n <= do
+    potencia := potencia 2 *;
+    if potencia 10 > then
+        println(potencia);
+    endif
+    contador := contador 1 +;
+endwhile""", ['7']),
+    ("""var a, b : integer;
+var x;
+read(a);
+read(x);
+b := a a * 3 -;
+x := x b * a 2 ^ +;
+write(b);
+println(x);""", ['4', '0.5']),
+    ("var x, y;\nread(x);\ny := 1 x /;\nprintln(y);", ['0']),
+    ("var x, y;\nx := y 1 +;", []),
+    ("var x;\nx := 1 z +;", []),
+    ("var x;\nx := (2 + 3) * sin(0.5);\nprintln(x);", []),
+]
+
+
+@pytest.mark.parametrize('codigo, entradas', PROGRAMAS)
+def test_igual_que_el_interprete(codigo, entradas):
+    esperado = ejecutar_programa(codigo, entradas, generar_ensamblador=False)
+    resultado = ejecutar_transpilado(codigo, entradas, respaldo=False)
+    assert resultado.salida == esperado.salida
+    assert resultado.errores == esperado.errores
+    assert resultado.variables == esperado.variables
+
+
+def test_traduce_una_sola_vez():
+    codigo, _ = PROGRAMAS[0]
+    assert transpilar(codigo) is transpilar(codigo)
+    programa = transpilar(codigo)
+    assert "def _programa" in programa.fuente
+    assert programa.ejecutar(['3']).variables['suma'] == 6.0
+    assert programa.ejecutar(['4']).variables['suma'] == 10.0
+
+
+def test_salida_a_un_objeto_propio():
+    salida = io.StringIO()
+    resultado = ejecutar_transpilado(*PROGRAMAS[1], salida=salida)
+    assert resultado.salida is None
+    assert salida.getvalue() == "16.0\n32.0\n64.0\n128.0\n"
+
+
+def test_declaracion_en_un_bloque_usa_el_interprete():
+    codigo = "var n, i;\nread(n);\nfor i := 1 to n do\n    var t;\n    t := i;\nendfor"
+    with pytest.raises(NoTranspilable):
+        transpilar(codigo)
+    with pytest.raises(NoTranspilable):
+        ejecutar_transpilado(codigo, ['2'], respaldo=False)
+    resultado = ejecutar_transpilado(codigo, ['2'])
+    assert resultado.errores == ejecutar_programa(codigo, ['2'], generar_ensamblador=False).errores
+
+
+def test_error_de_compilacion():
+    resultado = ejecutar_transpilado("var x, y;\nx := 5\nprint(x);")
+    assert resultado.errores == ["Error en línea 2: Error en línea 2: Falta punto y coma (;)"]
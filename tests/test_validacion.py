@@ -0,0 +1,52 @@
+from interpretepascal import Diagnostico, ejecutar_programa, validar_codigo
+
+VARIOS_ERRORES = """var x, y;
+x := 5
+y := x sen;
+for i := 1 to y do
+z := x y + +;
+endfor"""
+
+
+def test_todos_los_errores_con_su_linea():
+    assert [(diagnostico.linea, diagnostico.mensaje) for diagnostico in validar_codigo(VARIOS_ERRORES)] == [
+        (2, "Falta punto y coma (;)"),
+        (3, "Expresión inválida: quedan 2 valores sin operar en 'x sen'"),
+        (3, "Función no reconocida: sen (¿quiso decir 'sin'?)"),
+        (4, "Variable 'i' no declarada"),
+        (5, "Expresión inválida: al operador '+' le faltan operandos en 'x y + +'"),
+        (5, "Variable 'z' no declarada"),
+    ]
+
+
+def test_programa_valido():
+    assert validar_codigo("var a;\na := 1;\nprintln(a);") == []
+
+
+def test_declaraciones_y_bloques():
+    assert [str(diagnostico) for diagnostico in validar_codigo("var a;\nvar a;\nif a 1 > then\nprintln(a);")] == [
+        "línea 2: Variable 'a' ya está declarada", "línea 3: 'if' sin 'endif'"]
+    assert [str(diagnostico) for diagnostico in validar_codigo("var a;\nendwhile\nb := a;")] == [
+        "línea 2: 'endwhile' sin 'while' correspondiente", "línea 3: Variable 'b' no declarada"]
+    assert repr(Diagnostico(1, "x")) == "Diagnostico(1, 'x')"
+
+
+def test_validar_antes_de_ejecutar(monkeypatch):
+    monkeypatch.setattr('builtins.input', lambda mensaje='': (_ for _ in ()).throw(AssertionError(mensaje)))
+    codigo = "var x;\nread(x);\nx := x sen;\ny := x;"
+    resultado = ejecutar_programa(codigo, validar=True, generar_ensamblador=False)
+    # No se ejecutó nada: no se pidió el valor de read()
+    assert resultado.salida == ""
+    assert resultado.errores == ["Error en línea 3: Expresión inválida: quedan 2 valores sin operar en 'x sen'",
+                                 "Error en línea 3: Función no reconocida: sen (¿quiso decir 'sin'?)",
+                                 "Error en línea 4: Variable 'y' no declarada"]
+    # Sin validar, el programa se detiene en el primer error
+    assert len(ejecutar_programa(codigo, ['2'], generar_ensamblador=False).errores) == 1
+
+
+def test_validar_no_cambia_un_programa_correcto():
+    codigo = "var n, i, s;\nread(n);\ns := 0;\nfor i := 1 to n do\n    s := s i +;\nendfor\nprintln(s);"
+    validado = ejecutar_programa(codigo, ['4'], validar=True)
+    normal = ejecutar_programa(codigo, ['4'])
+    assert validado.errores == normal.errores == []
+    assert validado.salida == normal.salida == "10.0\n"
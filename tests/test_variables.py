@@ -0,0 +1,34 @@
+from interpretepascal import CON_VALOR, DECLARADA, InterpreteUnificado, compilar_programa, ejecutar_programa
+
+PROGRAMA = "var a, b;\nvar c : integer;\na := 1;\nc := 2;\nprintln(a);"
+
+
+def test_cada_variable_tiene_su_ranura():
+    assert compilar_programa(PROGRAMA, False).indices == {'a': 0, 'b': 1, 'c': 2}
+
+
+def test_valores_y_estado_por_ranura():
+    interprete = InterpreteUnificado(generar_ensamblador=False)
+    resultado = interprete.ejecutar_programa(PROGRAMA)
+    assert interprete.valores == [1.0, None, 2]
+    assert list(interprete.estado) == [CON_VALOR, DECLARADA, CON_VALOR]
+    assert [(simbolo.nombre, simbolo.tipo) for simbolo in interprete.simbolos] == [
+        ('a', 'real'), ('b', 'real'), ('c', 'integer')]
+    assert resultado.variables == {'a': 1.0, 'b': None, 'c': 2}
+
+
+def test_tabla_de_simbolos(capsys):
+    ejecutar_programa(PROGRAMA, mostrar=True, generar_ensamblador=False)
+    filas = [linea.split() for linea in capsys.readouterr().out.splitlines()]
+    assert ['a', 'real', '-', '1.0'] in filas
+    assert ['b', 'real', '-', 'None'] in filas
+    assert ['c', 'integer', '-', '2'] in filas
+
+
+def test_errores_de_variables():
+    assert ejecutar_programa("var a;\nb := 1;", generar_ensamblador=False).errores == [
+        "Error en línea 2: Error: Variable 'b' no declarada."]
+    assert ejecutar_programa("var a;\nprintln(a);", generar_ensamblador=False).errores == [
+        "Error en línea 2: Error: Variable 'a' no tiene valor."]
+    assert ejecutar_programa("var a;\nvar a;", generar_ensamblador=False).errores == [
+        "Error en línea 2: Error: Variable 'a' ya está declarada"]
@@ -0,0 +1,71 @@
+import pytest
+
+from interpretepascal import ejecutar_programa
+
+pytest.importorskip('numpy')
+from interprete_vectorial import ejecutar_lote  # noqa: E402
+
+POTENCIAS = """var n, contador, potencia;
+read(n);
+contador := 1;
+potencia := 1;
+while contador n <= do
+    potencia := potencia 2 *;
+    print(contador);
+    print(" ");
+    println(potencia);
+    contador := contador 1 +;
+endwhile"""
+
+DIVISION = """var x, y, d;
+read(x);
+read(y);
+if y 0 > then
+    x := x 1 +;
+endif
+d := x y /;
+println(d);"""
+
+
+def comparar_con_el_interprete(codigo, filas):
+    lote = ejecutar_lote(codigo, filas)
+    assert len(lote) == len(filas)
+    for i, entradas in enumerate(filas):
+        esperado = ejecutar_programa(codigo, [str(valor) for valor in entradas], generar_ensamblador=False)
+        fila = lote.fila(i)
+        assert fila['salida'] == esperado.salida, entradas
+        assert fila['variables'] == {nombre: valor for nombre, valor in esperado.variables.items()
+                                     if valor is not None}, entradas
+        if esperado.errores:
+            assert fila['error'] == esperado.errores[0]
+        else:
+            assert fila['error'] is None
+
+
+def test_ciclos_con_distinto_numero_de_vueltas():
+    comparar_con_el_interprete(POTENCIAS, [[0], [1], [3], [6]])
+
+
+def test_un_error_no_detiene_las_demas_filas():
+    comparar_con_el_interprete(DIVISION, [[1, 2], [5, 0], [3, -4], [0, 0]])
+    lote = ejecutar_lote(DIVISION, [[1, 2], [5, 0]])
+    assert lote.errores[0] is None
+    assert "División por cero" in lote.errores[1]
+
+
+def test_entradas_por_nombre():
+    lote = ejecutar_lote(DIVISION, {'x': [1, 6], 'y': [2, 3]})
+    assert [lote.fila(i)['salida'] for i in range(2)] == ["1.0\n", "2.3333333333333335\n"]
+
+
+def test_sin_capturar_salida():
+    lote = ejecutar_lote(POTENCIAS, [[2], [4]], capturar_salida=False)
+    assert lote.salidas is None
+    assert list(lote.variables['potencia']) == [4.0, 16.0]
+
+
+@pytest.mark.parametrize('paso', ["n := n 0.5 -;", "n := n 1 +;"])
+def test_el_cuerpo_no_cambia_el_limite_del_for(paso):
+    codigo = f"var n, i, s;\nread(n);\ns := 0;\nfor i := 1 to n do\n    s := s i +;\n    {paso}\nendfor\nprintln(s);"
+    comparar_con_el_interprete(codigo, [[6], [3], [0]])
+    assert ejecutar_lote(codigo, [[6]]).fila(0)['salida'] == "21.0\n"
@@ -0,0 +1,387 @@
+"""Traduce un programa completo a una sola función de Python.
+
+Las variables del programa pasan a ser variables locales (v_<nombre>), los
+for y while pasan a ciclos de Python y cada expresión se genera con el
+mismo código que usa el intérprete para sus evaluadores, así que los errores
+(variables sin valor, división por cero, tokens no reconocidos) salen con el
+mismo mensaje y en la misma línea que con ejecutar_programa. La función se
+compila una sola vez con compile() y se guarda según el hash del código.
+
+Sólo se traducen programas con las declaraciones var fuera de los bloques;
+para el resto transpilar() lanza NoTranspilable y ejecutar_transpilado()
+usa el intérprete.
+"""
+import hashlib
+import re
+
+from interpretepascal import (
+    FUNCIONES,
+    GeneradorFuente,
+    InterpreteUnificado,
+    ResultadoEjecucion,
+    _literal_python,
+    crear_lector,
+    emitir_condicion,
+    emitir_postfija,
+    ejecutar_programa,
+    entero_leido,
+    OP_VAR, OP_READ, OP_PRINT, OP_PRINTLN, OP_WRITE,
+    OP_ASIGNAR_LITERAL, OP_ASIGNAR, OP_FOR, OP_WHILE, OP_IF,
+    OP_ERROR, OP_ASIGNAR_INVARIANTE, OP_FOR_CERRADO, OP_NOP,
+    TIPO_ENTERO,
+)
+
+
+# Programas traducidos que se conservan, indexados por el hash del código
+TAMANO_CACHE_PROGRAMAS = 128
+
+_PROGRAMAS = {}
+
+# Una local del programa leída antes de asignarse (UnboundLocalError o NameError)
+_LOCAL_SIN_VALOR = re.compile(r"'v_(\w+)'")
+
+
+class NoTranspilable(Exception):
+    """El programa usa algo que la traducción a Python no cubre"""
+
+
+def local(nombre):
+    """Nombre de la variable local de Python que guarda una variable del programa"""
+    return f"v_{nombre}"
+
+
+class _GeneradorPrograma(GeneradorFuente):
+    """Generador de la función del programa: las variables son locales, no ranuras.
+
+    Las declaraciones se conocen al traducir, así que sólo se emite código
+    para las verificaciones que pueden fallar: una variable que ya tiene
+    valor en todos los caminos se usa directamente y las demás se copian
+    en el mismo punto donde el intérprete revisaría su estado, de modo que
+    la lectura de una local sin asignar falla en el mismo orden.
+    """
+
+    def __init__(self):
+        super().__init__("def _programa(_leer, _escribir):")
+        self.origen = [None]
+        self.nivel = 1
+        self.linea = None
+        self.declaradas = set()
+        self.asignadas = set()
+        self.enteras = set()
+
+    def emitir(self, linea):
+        self.lineas.append("    " * self.nivel + linea)
+        self.origen.append(self.linea)
+
+    def sentencia(self, pc):
+        """Empieza el código de la línea pc: las verificaciones no se comparten entre líneas"""
+        self.linea = pc + 1
+        self.simbolos = {}
+        self.valores = {}
+
+    def simbolo(self, nombre, mensaje):
+        if nombre not in self.simbolos:
+            if nombre not in self.declaradas:
+                self.emitir(f"raise {mensaje}")
+            self.simbolos[nombre] = True
+
+    def valor(self, operando):
+        tipo, dato = operando
+        if tipo != 'var':
+            return dato
+        if dato not in self.valores:
+            if dato in self.asignadas:
+                codigo = local(dato)
+            elif dato not in self.declaradas:
+                codigo = "None"
+            else:
+                codigo = self.temporal()
+                self.emitir(f"{codigo} = {local(dato)}")
+            self.valores[dato] = codigo
+        return self.valores[dato]
+
+
+class ProgramaTranspilado:
+    """Función de Python generada para un programa y lo necesario para reportar sus errores"""
+
+    def __init__(self, fuente, funcion, origen, declaraciones):
+        self.fuente = fuente
+        self.funcion = funcion
+        self.origen = origen
+        # (línea, nombres) de cada var, en orden; los nombres son los que
+        # quedan declarados aunque la línea falle por una redeclaración
+        self.declaraciones = declaraciones
+
+    def declaradas_hasta(self, linea):
+        """Variables declaradas cuando la ejecución se detiene en 'linea' (None: al terminar)"""
+        nombres = []
+        for linea_var, declaradas in self.declaraciones:
+            if linea is not None and linea_var > linea:
+                break
+            nombres.extend(declaradas)
+        return nombres
+
+    def ejecutar(self, entradas=(), salida=None):
+        """Ejecuta el programa y devuelve un ResultadoEjecucion como el de ejecutar_programa"""
+        buffer = None
+        if salida is None:
+            buffer = []
+            escribir = buffer.append
+        else:
+            escribir = salida.write
+
+        errores = []
+        linea = None
+        try:
+            locales = self.funcion(crear_lector(entradas) or input, escribir)
+        except Exception as e:
+            locales, numero = self._marco_del_error(e)
+            linea = self.origen[numero - 1]
+            sin_valor = _LOCAL_SIN_VALOR.search(str(e)) if isinstance(e, NameError) else None
+            if sin_valor:
+                e = Exception(f"Error: Variable '{sin_valor.group(1)}' no tiene valor.")
+            errores.append(f"Error en línea {linea}: {e}")
+
+        variables = {nombre: locales.get(local(nombre)) for nombre in self.declaradas_hasta(linea)}
+        return ResultadoEjecucion("".join(buffer) if buffer is not None else None,
+                                  variables, None, errores)
+
+    def _marco_del_error(self, error):
+        """Variables locales y línea generada de la función del programa cuando falló"""
+        codigo = self.funcion.__code__
+        locales, numero = {}, 1
+        rastro = error.__traceback__
+        while rastro is not None:
+            if rastro.tb_frame.f_code is codigo:
+                locales, numero = rastro.tb_frame.f_locals, rastro.tb_lineno
+            rastro = rastro.tb_next
+        return locales, numero
+
+
+class _Traductor:
+    """Recorre las instrucciones compiladas y emite la función del programa"""
+
+    def __init__(self, instrucciones):
+        self.instrucciones = instrucciones
+        self.generador = _GeneradorPrograma()
+        self.declaraciones = []
+
+    def traducir(self):
+        self.bloque(0, len(self.instrucciones))
+        generador = self.generador
+        generador.linea = None
+        generador.emitir("return locals()")
+        return generador
+
+    def bloque(self, inicio, fin):
+        generador = self.generador
+        antes = len(generador.lineas)
+        pc = inicio
+        while pc < fin:
+            instr = self.instrucciones[pc]
+            generador.sentencia(pc)
+            if instr.opcode in (OP_FOR, OP_FOR_CERRADO, OP_WHILE, OP_IF):
+                cierre = instr.salto
+                if cierre is None or not pc < cierre < fin:
+                    raise NoTranspilable(f"Bloque sin cierre en la línea {pc + 1}")
+                asignadas = set(generador.asignadas)
+                if instr.opcode == OP_IF:
+                    self.si(instr, pc, cierre)
+                elif instr.opcode == OP_WHILE:
+                    self.mientras(instr, pc, cierre)
+                else:
+                    self.para(instr, pc, cierre)
+                    asignadas.add(instr.operandos[0])
+                # Lo asignado dentro del bloque puede no haberse ejecutado
+                generador.asignadas = asignadas & generador.declaradas
+                pc = cierre + 1
+            else:
+                self.simple(instr, pc, inicio == 0 and fin == len(self.instrucciones))
+                pc += 1
+        if len(generador.lineas) == antes:
+            generador.emitir("pass")
+
+    def simple(self, instr, pc, nivel_superior):
+        generador = self.generador
+        opcode = instr.opcode
+
+        if opcode == OP_VAR:
+            if not nivel_superior:
+                raise NoTranspilable(f"Declaración dentro de un bloque en la línea {pc + 1}")
+            nombres = []
+            declaradas, tipo = instr.operandos
+            for nombre in declaradas:
+                if not nombre.isidentifier():
+                    raise NoTranspilable(f"Nombre de variable no traducible: {nombre}")
+                if nombre in generador.declaradas:
+                    generador.emitir(f"raise Exception({f'Error: Variable {nombre!r} ya está declarada'!r})")
+                    break
+                generador.declaradas.add(nombre)
+                if tipo == TIPO_ENTERO:
+                    generador.enteras.add(nombre)
+                nombres.append(nombre)
+            self.declaraciones.append((pc + 1, nombres))
+
+        elif opcode == OP_READ:
+            nombre = instr.operandos[0]
+            if nombre not in generador.declaradas:
+                self.no_declarada(nombre)
+                return
+            conversion = "float"
+            if nombre in generador.enteras:
+                conversion = "_entero_leido"
+                generador.funciones[conversion] = entero_leido
+            generador.emitir("try:")
+            generador.emitir(f"    {local(nombre)} = {conversion}(_leer({f'Ingrese valor para {nombre}: '!r}))")
+            generador.emitir("except ValueError:")
+            generador.emitir("    raise Exception('Valor inválido ingresado')")
+            generador.asignadas.add(nombre)
+
+        elif opcode == OP_PRINT:
+            nombre, texto = instr.operandos
+            if nombre in generador.declaradas:
+                generador.emitir(f"_escribir(str({local(nombre)}))")
+            else:
+                generador.emitir(f"_escribir({texto!r})")
+
+        elif opcode == OP_PRINTLN:
+            nombre, texto = instr.operandos
+            if nombre in generador.declaradas:
+                generador.emitir(f"_escribir(f'{{{local(nombre)}}}\\n')")
+            else:
+                linea = f"{texto}\n"
+                generador.emitir(f"_escribir({linea!r})")
+
+        elif opcode == OP_WRITE:
+            nombre = instr.operandos[0]
+            if nombre in generador.declaradas:
+                generador.emitir(f"_escribir(f'{nombre}: {{{local(nombre)}}}\\n')")
+            else:
+                linea = f"{nombre}\n"
+                generador.emitir(f"_escribir({linea!r})")
+
+        elif opcode == OP_ASIGNAR_LITERAL:
+            nombre, valor = instr.operandos[:2]
+            if nombre not in generador.declaradas:
+                self.no_declarada(nombre)
+                return
+            generador.emitir(f"{local(nombre)} = {_literal_python(valor)}")
+            generador.asignadas.add(nombre)
+
+        elif opcode in (OP_ASIGNAR, OP_ASIGNAR_INVARIANTE):
+            nombre, expresion = instr.operandos[:2]
+            resultado = emitir_postfija(generador, expresion, (), *instr.operandos[-2])
+            if nombre not in generador.declaradas:
+                self.no_declarada(nombre)
+                return
+            generador.emitir(f"{local(nombre)} = {resultado}")
+            generador.asignadas.add(nombre)
+
+        elif opcode == OP_ERROR:
+            error = f"_error{len(generador.funciones)}"
+            generador.funciones[error] = instr.operandos[0]
+            generador.emitir(f"raise {error}.with_traceback(None)")
+
+        elif opcode != OP_NOP:
+            raise NoTranspilable(f"Instrucción no traducible en la línea {pc + 1}")
+
+    def no_declarada(self, nombre):
+        self.generador.emitir(f"raise Exception({f'Error: Variable {nombre!r} no declarada.'!r})")
+
+    def para(self, instr, pc, cierre):
+        generador = self.generador
+        var, inicio, fin_var = instr.operandos[:3]
+        if var not in generador.declaradas:
+            self.no_declarada(var)
+            return
+        variable = local(var)
+        generador.emitir(f"{variable} = {_literal_python(inicio)}")
+        generador.asignadas.add(var)
+        if fin_var not in generador.declaradas:
+            generador.emitir(f"raise Exception({f'Variable {fin_var!r} no declarada en el for'!r})")
+            return
+
+        # El límite se lee una sola vez, al entrar al ciclo
+        fin = generador.temporal()
+        generador.emitir(f"{fin} = {local(fin_var)}")
+        generador.emitir(f"if {variable} <= {fin}:")
+        generador.nivel += 1
+        generador.emitir("while True:")
+        generador.nivel += 1
+        self.bloque(pc + 1, cierre)
+        generador.sentencia(cierre)
+        generador.emitir(f"{variable} = {variable} + 1")
+        generador.emitir(f"if not {variable} <= {fin}:")
+        generador.emitir("    break")
+        generador.nivel -= 2
+
+    def mientras(self, instr, pc, cierre):
+        generador = self.generador
+        condicion = instr.operandos[0]
+        generador.emitir(f"if {emitir_condicion(generador, condicion)}:")
+        generador.nivel += 1
+        generador.emitir("while True:")
+        generador.nivel += 1
+        self.bloque(pc + 1, cierre)
+        generador.sentencia(cierre)
+        generador.emitir(f"if not ({emitir_condicion(generador, condicion)}):")
+        generador.emitir("    break")
+        generador.nivel -= 2
+
+    def si(self, instr, pc, cierre):
+        generador = self.generador
+        generador.emitir(f"if {emitir_condicion(generador, instr.operandos[0])}:")
+        generador.nivel += 1
+        self.bloque(pc + 1, cierre)
+        generador.nivel -= 1
+
+
+def clave_fuente(codigo):
+    return hashlib.sha256(codigo.encode('utf-8')).hexdigest()
+
+
+def transpilar(codigo):
+    """Traduce el código fuente a un ProgramaTranspilado, reutilizando el de la caché si existe.
+
+    Los errores de compilación del programa se propagan como excepciones;
+    si el programa usa algo que no se traduce, lanza NoTranspilable.
+    """
+    clave = clave_fuente(codigo)
+    programa = _PROGRAMAS.get(clave)
+    if programa is not None:
+        return programa
+
+    traductor = _Traductor(InterpreteUnificado().compilar_codigo(codigo))
+    generador = traductor.traducir()
+    fuente = "\n".join(generador.lineas)
+    espacio = {f"_{nombre}": funcion for nombre, funcion in FUNCIONES.items()}
+    espacio.update(generador.funciones)
+    try:
+        exec(compile(fuente, f"<programa {clave[:12]}>", 'exec'), espacio)
+    except (SyntaxError, RecursionError, MemoryError) as e:
+        # Por ejemplo, demasiados bloques anidados para el compilador de Python
+        raise NoTranspilable(f"La función generada no compila: {e}")
+
+    programa = ProgramaTranspilado(fuente, espacio['_programa'], generador.origen, traductor.declaraciones)
+    if len(_PROGRAMAS) >= TAMANO_CACHE_PROGRAMAS:
+        del _PROGRAMAS[next(iter(_PROGRAMAS))]
+    _PROGRAMAS[clave] = programa
+    return programa
+
+
+def ejecutar_transpilado(codigo, entradas=(), salida=None, respaldo=True):
+    """Ejecuta el programa traducido a Python; devuelve un ResultadoEjecucion.
+
+    Si el programa no se puede traducir y respaldo=True se ejecuta con el
+    intérprete (sin generar ensamblador); si respaldo=False se propaga
+    NoTranspilable.
+    """
+    try:
+        programa = transpilar(codigo)
+    except NoTranspilable:
+        if not respaldo:
+            raise
+        return ejecutar_programa(codigo, entradas, salida, generar_ensamblador=False)
+    except Exception as e:
+        return ResultadoEjecucion("" if salida is None else None, {}, None, [f"Error: {e}"])
+    return programa.ejecutar(entradas, salida)